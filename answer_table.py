@@ -0,0 +1,167 @@
+"""
+Tabella Precalcolata dello Spazio delle Risposte
+Valuta una volta tutte le combinazioni del questionario e le salva in forma compatta:
+la posizione di ogni combinazione è un indice a base mista sulle nove domande
+"""
+
+import hashlib
+import inspect
+import os
+
+import numpy as np
+
+import batch_engine
+import catalog
+import engine
+import horizon_index
+from catalog import get_catalog, iter_portfolios
+from engine import LEVERAGE_RISK, TOP_N, WIZARD_QUESTIONS
+
+# Directory dei file .npz (uno per versione di catalogo e regole)
+TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+TABLE_PREFIX = 'answer_table_'
+
+# Slot vuoto nella tabella dei top portafogli
+EMPTY_SLOT = np.iinfo(np.uint16).max
+
+# Oltre questa dimensione la costruzione (combinazioni x portafogli) diventa troppo lenta e
+# pesante in memoria: il wizard calcola allora le raccomandazioni direttamente
+MAX_TABLE_PORTFOLIOS = 1_000
+
+# Bit dei flag per combinazione
+FLAG_SINGLE_ONLY = 1
+FLAG_ESG_ONLY = 2
+
+RADICES = tuple(len(options) for options in WIZARD_QUESTIONS.values())
+N_COMBINATIONS = int(np.prod(RADICES))
+
+
+def table_version(catalog_version=None):
+    """Chiave della tabella: cambia se cambiano i dati del catalogo o il codice delle regole"""
+    if catalog_version is None:
+        catalog_version = catalog.CATALOG_VERSION
+    digest = hashlib.sha1(catalog_version.encode('utf-8'))
+    for module in (catalog, engine, horizon_index, batch_engine):
+        digest.update(inspect.getsource(module).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def build_answer_table(portfolios):
+    """Valuta l'intero spazio delle risposte con il motore batch (ValueError oltre MAX_TABLE_PORTFOLIOS)"""
+    ids = [p.id for p in iter_portfolios(portfolios)]
+    if len(ids) > MAX_TABLE_PORTFOLIOS:
+        raise ValueError(f"Catalogo troppo grande per la tabella delle risposte ({len(ids)} portafogli, "
+                         f"massimo {MAX_TABLE_PORTFOLIOS})")
+
+    # Codici di tutte le combinazioni, in ordine di indice a base mista
+    digits = np.unravel_index(np.arange(N_COMBINATIONS), RADICES)
+    codes = dict(zip(WIZARD_QUESTIONS, digits))
+
+    top, valid, risk_masks, single_only, esg_only, max_etfs = batch_engine.score_codes(codes, portfolios)
+
+    table = np.full((N_COMBINATIONS, TOP_N), EMPTY_SLOT, dtype=np.uint16)
+    table[:, :top.shape[1]] = np.where(valid, top, EMPTY_SLOT)
+
+    # Livelli di rischio 1..8 come bitmask (bit 0 = livello 1)
+    risk_bits = np.packbits(risk_masks[:, 1:LEVERAGE_RISK + 1], axis=1, bitorder='little')[:, 0]
+    flags = (FLAG_SINGLE_ONLY * single_only + FLAG_ESG_ONLY * esg_only).astype(np.uint8)
+
+    return AnswerTable(ids, table, risk_bits, flags, max_etfs.astype(np.uint8))
+
+
+class AnswerTable:
+    """Risultati del wizard per ogni combinazione di risposte, consultabili in O(1)"""
+    __slots__ = ('ids', 'top', 'risk_bits', 'flags', 'max_etfs', '_codes', '_resolved')
+
+    def __init__(self, ids, top, risk_bits, flags, max_etfs):
+        self.ids = list(ids)
+        self.top = top
+        self.risk_bits = risk_bits
+        self.flags = flags
+        self.max_etfs = max_etfs
+        self._codes = [{option: code for code, option in enumerate(options)}
+                       for options in WIZARD_QUESTIONS.values()]
+        self._resolved = (None, ())
+
+    def index_of(self, answers):
+        """Indice a base mista di una combinazione di risposte (KeyError se una risposta è sconosciuta)"""
+        index = 0
+        for question, radix, codes in zip(WIZARD_QUESTIONS, RADICES, self._codes):
+            index = index * radix + codes[answers[question]]
+        return index
+
+    def lookup(self, portfolios, **answers):
+        """Stesso risultato di calculate_recommendations, letto dalla tabella"""
+        index = self.index_of(answers)
+        # Elenco piatto del catalogo, ricalcolato solo se cambia l'oggetto catalogo
+        if self._resolved[0] is not portfolios:
+            self._resolved = (portfolios, iter_portfolios(portfolios))
+        flat = self._resolved[1]
+        bits = int(self.risk_bits[index])
+        flags = int(self.flags[index])
+
+        criteria = {question: answers[question] for question in WIZARD_QUESTIONS}
+        criteria.update({
+            'single_only': bool(flags & FLAG_SINGLE_ONLY),
+            'esg_only': bool(flags & FLAG_ESG_ONLY),
+            'max_etfs': int(self.max_etfs[index])
+        })
+
+        return {
+            'portfolios': [flat[slot] for slot in self.top[index] if slot != EMPTY_SLOT],
+            'recommended_risks': [level for level in range(1, LEVERAGE_RISK + 1) if bits >> (level - 1) & 1],
+            'criteria': criteria
+        }
+
+    def save(self, path):
+        """Salva la tabella in formato .npz compresso (scrittura atomica)"""
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, ids=np.array(self.ids), top=self.top, risk_bits=self.risk_bits,
+                                flags=self.flags, max_etfs=self.max_etfs)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Carica una tabella salvata con save()"""
+        with np.load(path) as data:
+            return cls(data['ids'].tolist(), data['top'], data['risk_bits'], data['flags'], data['max_etfs'])
+
+
+def get_answer_table(portfolios=None, version=None, table_dir=TABLE_DIR):
+    """
+    Restituisce la tabella per la versione corrente di catalogo e regole:
+    la carica dal disco se presente, altrimenti la ricostruisce e rimuove le versioni obsolete
+    """
+    if portfolios is None:
+        portfolios = get_catalog()
+    if version is None:
+        version = table_version()
+
+    path = os.path.join(table_dir, f'{TABLE_PREFIX}{version}.npz')
+    if os.path.exists(path):
+        table = AnswerTable.load(path)
+        if table.ids == [p.id for p in iter_portfolios(portfolios)]:
+            return table
+
+    table = build_answer_table(portfolios)
+    try:
+        os.makedirs(table_dir, exist_ok=True)
+        for name in os.listdir(table_dir):
+            if name.startswith(TABLE_PREFIX) and name.endswith('.npz'):
+                os.remove(os.path.join(table_dir, name))
+        table.save(path)
+    except OSError:
+        # Directory in sola lettura (es. deploy su cloud): la tabella resta solo in memoria
+        pass
+    return table
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    answer_table = build_answer_table(get_catalog())
+    elapsed = time.perf_counter() - start
+    size = sum(a.nbytes for a in (answer_table.top, answer_table.risk_bits, answer_table.flags, answer_table.max_etfs))
+    print(f"✅ Tabella costruita: {N_COMBINATIONS:,} combinazioni in {elapsed:.2f}s ({size / 1024:.0f} KiB)")
@@ -1,6 +1,37 @@
+import math
 import streamlit as st
+import numpy as np
 import pandas as pd
-from portfolios_data import get_all_portfolios, get_statistics
+from portfolios_data import get_statistics
+from answer_table import get_answer_table, table_version
+from catalog import CATALOG_VERSION, get_catalog
+from engine import (
+    AGE_OPTIONS, COMPLEXITY_OPTIONS, ESG_OPTIONS, EXPERIENCE_OPTIONS, GOAL_OPTIONS, HORIZON_OPTIONS,
+    INCOME_OPTIONS, TOLERANCE_OPTIONS, WEALTH_OPTIONS, calculate_recommendations, filter_portfolios,
+    get_risk_category
+)
+from exposures import FACTOR_LABELS, REGIONS, get_exposure_model
+from montecarlo import DEFAULT_PATHS, PERCENTILES, percentile_table, simulate_portfolio
+from calibration import STATUS_MISSING, STATUS_OK, get_calibration
+from covariance import get_covariance, portfolio_volatilities
+from optimizer import SOURCE_HISTORY, efficient_frontier, portfolio_positions, universe_moments
+from price_store import store_version
+from profiling import (PROFILE_LOG, debug_token_matches, phase, profile_rerun, profiling_enabled_by_env,
+                       summarize_log)
+from range_index import get_range_index
+from search_index import SearchIndex
+
+# Portafogli per pagina nelle viste di esplorazione
+PAGE_SIZE = 10
+
+# Portafogli di cui tenere in cache tabelle, link e simulazioni (i più recenti)
+PORTFOLIO_CACHE_ENTRIES = 256
+
+# Risultati di ricerca mostrati al massimo (i più pertinenti)
+SEARCH_LIMIT = 200
+
+# Esecuzioni profilate conservate nella sessione per il pannello di debug
+PROFILE_HISTORY = 20
 
 # Configurazione della pagina
 st.set_page_config(
@@ -43,6 +74,14 @@ st.markdown("""
         background-color: #8B0000;
         color: #FFFFFF;
     }
+    .calibration-ok {
+        background-color: #e8f5e9;
+        color: #1b5e20;
+    }
+    .calibration-warning {
+        background-color: #fff3cd;
+        color: #8B4500;
+    }
     .info-box {
         background-color: #f0f8ff;
         padding: 1rem;
@@ -61,11 +100,120 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+# ============================================================================
+# CACHE CONDIVISA TRA LE SESSIONI
+# ============================================================================
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def load_catalog(version):
+    """Catalogo e statistiche, condivisi da tutte le sessioni (una copia per versione dei dati)"""
+    # Una nuova versione del catalogo rende obsolete le tabelle già in cache
+    get_component_table.clear()
+    get_links_markdown.clear()
+    get_montecarlo.clear()
+    return get_catalog(), get_statistics()
+
+
+@st.cache_data(show_spinner=False, max_entries=PORTFOLIO_CACHE_ENTRIES)
+def get_component_table(portfolio_id, version, _portfolio):
+    """
+    Tabella dei componenti di un portafoglio, memorizzata per ID e versione del catalogo.
+    Ogni sessione ne riceve una copia, quindi può modificarla senza toccare la cache
+    """
+    return pd.DataFrame([
+        {
+            'Allocazione': f"{comp.percentage:g}%",
+            'Nome ETF': comp.name,
+            'ISIN': comp.isin,
+            'TER': f"{comp.ter:.2f}%"
+        }
+        for comp in _portfolio.components
+    ])
+
+
+@st.cache_data(show_spinner=False, max_entries=PORTFOLIO_CACHE_ENTRIES)
+def get_links_markdown(portfolio_id, version, _portfolio):
+    """Elenco markdown dei link JustETF di un portafoglio, memorizzato per ID e versione"""
+    return "\n".join(
+        f"- [{comp.name}](https://www.justetf.com/it/etf-profile.html?isin={comp.isin})"
+        for comp in _portfolio.components
+    )
+
+
+@st.cache_resource(show_spinner=False, max_entries=PORTFOLIO_CACHE_ENTRIES)
+def get_montecarlo(portfolio_id, version, _portfolio):
+    """
+    Simulazione Monte Carlo di un portafoglio, memorizzata per ID e versione. Il risultato
+    è immutabile (bande in sola lettura), quindi è condiviso senza copie tra le sessioni
+    """
+    return simulate_portfolio(_portfolio)
+
+
+def get_montecarlo_bands(result):
+    """Tabella delle bande per il grafico, ricostruita ad ogni esecuzione (poche righe)"""
+    return pd.DataFrame(
+        percentile_table(result),
+        columns=['Anno'] + [f"{q}° percentile" for q in PERCENTILES]
+    ).set_index('Anno')
+
+
+@st.cache_resource(show_spinner="⏳ Preparazione delle raccomandazioni...", max_entries=1)
+def load_answer_table(version):
+    """Tabella precalcolata delle risposte del wizard, condivisa e ricostruita ad ogni nuova versione"""
+    return get_answer_table(version=version)
+
+
+@st.cache_resource(show_spinner="⏳ Calibrazione dei livelli di rischio...", max_entries=1)
+def load_calibration(version, catalog_version):
+    """Report di calibrazione dei livelli di rischio, condiviso per versione dell'archivio prezzi e del catalogo"""
+    return get_calibration()
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def load_portfolio_volatilities(version, catalog_version, _portfolios):
+    """Volatilità storica di tutti i portafogli dalla covarianza condivisa, per versione dell'archivio prezzi e del catalogo"""
+    model = get_covariance()
+    return {} if model is None else portfolio_volatilities(model, _portfolios)
+
+
+@st.cache_resource(show_spinner="⏳ Preparazione dell'indice di ricerca...", max_entries=1)
+def load_search_index(catalog_version, _portfolios):
+    """Indice di ricerca del catalogo, condiviso da tutte le sessioni e costruito una volta per versione"""
+    return SearchIndex(_portfolios)
+
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def load_universe_moments(version, catalog_version, _portfolios):
+    """Rendimenti attesi e covarianza dell'universo ETF, per versione dell'archivio prezzi e del catalogo"""
+    return universe_moments(_portfolios)
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def solve_frontier(cap, version, catalog_version, _portfolios):
+    """Frontiera efficiente e posizione dei portafogli modello per un peso massimo per ETF"""
+    isins, mean, cov, _ = load_universe_moments(version, catalog_version, _portfolios)
+    frontier = efficient_frontier(mean, cov, isins, cap=cap)
+    return frontier, portfolio_positions(frontier, mean, cov, _portfolios)
+
+
+def invalidate_caches():
+    """Svuota esplicitamente tutte le cache condivise (es. dopo un aggiornamento dei dati)"""
+    load_catalog.clear()
+    load_answer_table.clear()
+    get_component_table.clear()
+    get_links_markdown.clear()
+    get_montecarlo.clear()
+    load_calibration.clear()
+    load_portfolio_volatilities.clear()
+    load_search_index.clear()
+    load_universe_moments.clear()
+    solve_frontier.clear()
+
+
 def load_portfolios():
-    """Carica i portafogli dal modulo portfolios_data"""
+    """Carica il catalogo compilato dei portafogli dalla cache condivisa"""
     try:
-        portfolios = get_all_portfolios()
-        stats = get_statistics()
+        portfolios, stats = load_catalog(CATALOG_VERSION)
         st.success(f"✅ Caricati **{stats['total_portfolios']} portafogli** con successo! ({stats['unique_etfs']} ETF unici)")
         return portfolios
     except Exception as e:
@@ -73,18 +221,6 @@ def load_portfolios():
         return {'multi': [], 'single': [], 'esg': []}
 
 
-def get_risk_category(risk_level):
-    """Restituisce la categoria di rischio basata sul livello"""
-    if risk_level <= 2:
-        return 'Basso'
-    elif risk_level <= 5:
-        return 'Medio'
-    elif risk_level <= 7:
-        return 'Alto'
-    else:  # risk_level == 8
-        return 'Molto Alto'
-
-
 def get_risk_badge_html(risk_level):
     """Genera HTML per il badge del rischio"""
     category = get_risk_category(risk_level)
@@ -105,99 +241,203 @@ def get_risk_badge_html(risk_level):
     return f'<span class="risk-badge {css_class}">{icon} Rischio {risk_level} - {category}</span>'
 
 
+def get_calibration_badge_html(row):
+    """Genera HTML per il badge di confronto con la volatilità storica"""
+    details = f"volatilità {row['volatility']:.1%}, max drawdown {row['max_drawdown']:.1%}"
+    if row['flagged']:
+        statuses = []
+        if row['volatility_status'] != STATUS_OK:
+            statuses.append(f"volatilità {row['volatility_status']}")
+        if row['drawdown_status'] != STATUS_OK:
+            statuses.append(f"drawdown {row['drawdown_status']}")
+        return (f'<span class="risk-badge calibration-warning">⚠️ Storico fuori fascia: {details} '
+                f'({", ".join(statuses)} la fascia del livello)</span>')
+    return f'<span class="risk-badge calibration-ok">📏 Storico in linea: {details}</span>'
+
+
+def display_calibration_badge(portfolio):
+    """Badge di calibrazione, mostrato solo se esiste un archivio prezzi con dati sufficienti"""
+    version = store_version()
+    if version is None:
+        return
+    calibration = load_calibration(version, CATALOG_VERSION)
+    if calibration is None or portfolio.id not in calibration.index:
+        return
+    row = calibration.loc[portfolio.id]
+    if row['volatility_status'] != STATUS_MISSING:
+        st.markdown(get_calibration_badge_html(row), unsafe_allow_html=True)
+
+
+def get_historical_volatility(portfolio):
+    """Volatilità annua storica ai pesi obiettivo; None senza archivio prezzi o con dati insufficienti"""
+    version = store_version()
+    if version is None:
+        return None
+    volatilities = load_portfolio_volatilities(version, CATALOG_VERSION, get_catalog())
+    volatility = volatilities.get(portfolio.id, math.nan)
+    return None if math.isnan(volatility) else volatility
+
+
+def get_portfolio_title(portfolio):
+    """Titolo del portafoglio con nome friendly e badge ESG se applicabile"""
+    title = f"{portfolio.name}"
+    if portfolio.esg == 1:
+        title += " 🌱"
+    return title
+
+
 def display_portfolio(portfolio, show_expanded=False):
     """Visualizza un singolo portafoglio in un expander"""
+    with st.expander(get_portfolio_title(portfolio), expanded=show_expanded):
+        display_portfolio_body(portfolio)
+
+
+def display_portfolio_body(portfolio):
+    """Dettaglio completo di un portafoglio: badge, strategia, metriche, composizione e simulazione"""
+    # ID tecnico piccolo in alto
+    st.caption(f"ID Tecnico: {portfolio.id} | Orizzonte minimo: {portfolio.min_duration} anni")
     
-    # Titolo del portafoglio con nome friendly
-    title = f"{portfolio['name']}"
+    # Badge rischio
+    st.markdown(get_risk_badge_html(portfolio.risk_level), unsafe_allow_html=True)
+    display_calibration_badge(portfolio)
     
-    # Badge ESG se applicabile
-    if portfolio['esg'] == 1:
-        title += " 🌱"
+    # Descrizione strategia
+    st.markdown("### 🎯 Strategia")
+    st.info(portfolio.strategy_description)
     
-    with st.expander(title, expanded=show_expanded):
-        # ID tecnico piccolo in alto
-        st.caption(f"ID Tecnico: {portfolio['id']} | Orizzonte minimo: {portfolio['min_duration']} anni")
-        
-        # Badge rischio
-        st.markdown(get_risk_badge_html(portfolio['risk_level']), unsafe_allow_html=True)
-        
-        # Descrizione strategia
-        st.markdown("### 🎯 Strategia")
-        st.info(portfolio['strategy_description'])
-        
-        # Warning speciale per rischio 8
-        if portfolio['risk_level'] == 8:
-            st.error("""
-            ⚠️ **ATTENZIONE: PORTAFOGLIO CON LEVERAGE (2x)**
-            
-            Questo portafoglio utilizza strumenti con leva finanziaria che amplificano sia i guadagni che le perdite.
-            
-            **Rischi Principali:**
-            - ❌ NON adatto a principianti
-            - ❌ Richiede esperienza e monitoraggio costante
-            - ⚠️ Rischio di perdite superiori al 50% in brevi periodi
-            - ⚠️ Effetto "decay" in mercati laterali
-            - ⚠️ Ribilanciamento trimestrale obbligatorio
-            
-            **Consigliato SOLO per investitori esperti che comprendono completamente i rischi del leverage.**
-            """)
+    # Warning speciale per rischio 8
+    if portfolio.risk_level == 8:
+        st.error("""
+        ⚠️ **ATTENZIONE: PORTAFOGLIO CON LEVERAGE (2x)**
         
-        st.markdown("---")
+        Questo portafoglio utilizza strumenti con leva finanziaria che amplificano sia i guadagni che le perdite.
         
-        # Informazioni generali
-        col1, col2, col3 = st.columns(3)
+        **Rischi Principali:**
+        - ❌ NON adatto a principianti
+        - ❌ Richiede esperienza e monitoraggio costante
+        - ⚠️ Rischio di perdite superiori al 50% in brevi periodi
+        - ⚠️ Effetto "decay" in mercati laterali
+        - ⚠️ Ribilanciamento trimestrale obbligatorio
         
-        with col1:
-            st.metric("Orizzonte Minimo", f"{portfolio['min_duration']} anni")
+        **Consigliato SOLO per investitori esperti che comprendono completamente i rischi del leverage.**
+        """)
+    
+    st.markdown("---")
+    
+    # Informazioni generali (più la volatilità storica, se ci sono prezzi in archivio)
+    volatility = get_historical_volatility(portfolio)
+    col1, col2, col3, *extra = st.columns(3 if volatility is None else 4)
+    
+    with col1:
+        st.metric("Orizzonte Minimo", f"{portfolio.min_duration} anni")
+    
+    with col2:
+        st.metric("Ribilanciamento", portfolio.rebalance)
+    
+    with col3:
+        st.metric("N° ETF", portfolio.n_components)
+    
+    if extra:
+        with extra[0]:
+            st.metric("Volatilità storica", f"{volatility:.1%}",
+                      help="Annua, ai pesi obiettivo, dalla covarianza dei prezzi in archivio")
+    
+    # Note se presenti
+    if portfolio.note and portfolio.note != portfolio.strategy_description:
+        st.info(f"ℹ️ {portfolio.note}")
+    
+    # Tabella componenti
+    if portfolio.components:
+        st.markdown("**📋 Composizione del Portafoglio:**")
         
-        with col2:
-            st.metric("Ribilanciamento", portfolio['rebalance'])
+        # Tabella dalla cache condivisa
+        df = get_component_table(portfolio.id, CATALOG_VERSION, portfolio)
+        st.dataframe(df, use_container_width=True, hide_index=True)
         
-        with col3:
-            n_components = len(portfolio['components'])
-            st.metric("N° ETF", n_components)
+        # TER medio ponderato (precalcolato nel catalogo)
+        if portfolio.alternatives:
+            st.success(f"💰 **TER (ETF a scelta, primo dell'elenco):** {portfolio.weighted_ter:.3f}%")
+        elif not portfolio.is_single:
+            st.success(f"💰 **TER medio ponderato:** {portfolio.weighted_ter:.3f}%")
+        else:
+            st.success(f"💰 **TER:** {portfolio.weighted_ter:.2f}%")
         
-        # Note se presenti
-        if portfolio['note'] and portfolio['note'] != portfolio.get('strategy_description', ''):
-            st.info(f"ℹ️ {portfolio['note']}")
+        # Link JustETF per ogni componente
+        st.markdown("**🔗 Link di approfondimento:**")
+        st.markdown(get_links_markdown(portfolio.id, CATALOG_VERSION, portfolio))
         
-        # Tabella componenti
-        if portfolio['components']:
-            st.markdown("**📋 Composizione del Portafoglio:**")
-            
-            # Prepara i dati per la tabella
-            df_data = []
-            for comp in portfolio['components']:
-                df_data.append({
-                    'Allocazione': f"{comp['percentage']}%",
-                    'Nome ETF': comp['name'],
-                    'ISIN': comp['isin'],
-                    'TER': f"{comp['ter']}%"
-                })
-            
-            df = pd.DataFrame(df_data)
-            st.dataframe(df, use_container_width=True, hide_index=True)
-            
-            # Calcola TER medio ponderato
-            if len(portfolio['components']) > 1:
-                ter_medio = sum(
-                    float(comp['ter']) * float(comp['percentage']) / 100
-                    for comp in portfolio['components']
-                )
-                st.success(f"💰 **TER medio ponderato:** {ter_medio:.3f}%")
-            else:
-                st.success(f"💰 **TER:** {portfolio['components'][0]['ter']}%")
-            
-            # Link JustETF per ogni componente
-            st.markdown("**🔗 Link di approfondimento:**")
-            for comp in portfolio['components']:
-                link = f"https://www.justetf.com/it/etf-profile.html?isin={comp['isin']}"
-                st.markdown(f"- [{comp['name']}]({link})")
+        display_exposure(portfolio)
+        display_montecarlo(portfolio)
+
+
+def display_exposure(portfolio):
+    """Esposizione aggregata per classe di attivo e area (look-through) e portafogli simili"""
+    model = get_exposure_model(get_catalog())
+    try:
+        exposure = model.exposure(portfolio.id)
+    except KeyError:
+        return
+    
+    st.markdown("**🧭 Esposizione effettiva (look-through):**")
+    col1, col2 = st.columns(2)
+    for column, factors in ((col1, [f for f in exposure if f not in REGIONS]), (col2, REGIONS)):
+        with column:
+            for factor in factors:
+                if exposure[factor] > 1e-6:
+                    st.write(f"{FACTOR_LABELS[factor]}: **{exposure[factor]:.1%}**")
+    
+    similar = model.similar(portfolio.id)
+    if similar:
+        st.caption("Portafogli simili per esposizione: " + " · ".join(
+            f"{other.name} ({other.id})" for other, _ in similar
+        ))
+
+
+def display_montecarlo(portfolio):
+    """Bande di percentili e probabilità di perdita simulate sull'orizzonte minimo"""
+    result = get_montecarlo(portfolio.id, CATALOG_VERSION, portfolio)
+    bands = get_montecarlo_bands(result)
+    
+    st.markdown(f"**🎲 Simulazione Monte Carlo ({DEFAULT_PATHS:,} scenari su {result.years} anni):**")
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Capitale finale mediano", f"{result.percentile(50)[-1] * 100:.0f}")
+    with col2:
+        st.metric("Scenario sfavorevole (5%)", f"{result.percentile(5)[-1] * 100:.0f}")
+    with col3:
+        st.metric("Probabilità di perdita", f"{result.probability_of_loss:.1%}")
+    
+    st.line_chart(bands * 100)
+    st.caption(
+        "Valori per 100 € investiti, al netto dei TER. Ipotesi di rendimento e volatilità "
+        "illustrative per classe di attivo: non sono una previsione né una garanzia di risultato."
+    )
+
 
+def reset_wizard():
+    """Callback del bottone "Ricomincia": azzera i risultati prima della riesecuzione"""
+    st.session_state.wizard_completed = False
+    st.session_state.wizard_results = None
 
+
+@st.fragment
 def portfolio_wizard(portfolios):
-    """Wizard interattivo per trovare il portafoglio ideale"""
+    """
+    Wizard interattivo per trovare il portafoglio ideale.
+    Eseguito come fragment: rispondere a una domanda riesegue solo il wizard,
+    non il caricamento dei dati, la sidebar, la sezione educativa e il footer
+    """
+    # Nelle riesecuzioni del solo fragment la profilazione parte da qui
+    with profile_rerun('wizard', enabled=debug_enabled(),
+                       profile=st.session_state.pop('profile_next_rerun', False)) as profiler:
+        display_wizard(portfolios)
+    if profiler is not None and profiler.record is not None:
+        remember_profile(profiler.record)
+
+
+def display_wizard(portfolios):
+    """Domande del wizard, calcolo dei suggerimenti e risultati"""
     
     st.header("🎯 Trova il Tuo Portafoglio Ideale")
     
@@ -221,12 +461,7 @@ def portfolio_wizard(portfolios):
     
     age_range = st.radio(
         "Seleziona la tua età:",
-        [
-            "Meno di 30 anni - Inizio carriera",
-            "30-45 anni - Consolidamento professionale",
-            "45-60 anni - Picco carriera, pre-pensione",
-            "Più di 60 anni - Pensione o vicino alla pensione"
-        ],
+        AGE_OPTIONS,
         index=None,
         help="L'età influenza sia l'orizzonte temporale che la tolleranza al rischio appropriata"
     )
@@ -239,13 +474,7 @@ def portfolio_wizard(portfolios):
     
     time_horizon = st.radio(
         "Seleziona l'orizzonte:",
-        [
-            "Meno di 3 anni - Breve termine",
-            "3-7 anni - Medio termine",
-            "7-10 anni - Medio-lungo termine",
-            "10-15 anni - Lungo termine",
-            "Più di 15 anni - Molto lungo termine"
-        ],
+        HORIZON_OPTIONS,
         index=None,
         help="L'orizzonte temporale è fondamentale per determinare il livello di rischio appropriato"
     )
@@ -258,13 +487,7 @@ def portfolio_wizard(portfolios):
     
     investment_goal = st.radio(
         "Seleziona l'obiettivo:",
-        [
-            "Pensione - Costruire capitale per il futuro",
-            "Grande acquisto - Casa, auto, educazione figli",
-            "Crescita patrimonio - Aumentare il capitale nel tempo",
-            "Preservazione capitale - Proteggere dall'inflazione",
-            "Libertà finanziaria - Rendita passiva"
-        ],
+        GOAL_OPTIONS,
         index=None,
         help="L'obiettivo aiuta a determinare il profilo rischio/rendimento appropriato"
     )
@@ -277,12 +500,7 @@ def portfolio_wizard(portfolios):
     
     portfolio_percentage = st.radio(
         "Seleziona la proporzione:",
-        [
-            "Tutto o quasi tutto (80-100%)",
-            "Parte maggiore (50-80%)",
-            "Parte significativa (20-50%)",
-            "Parte minore (meno del 20%)"
-        ],
+        WEALTH_OPTIONS,
         index=None,
         help="Se rappresenta tutto il tuo patrimonio, servono scelte più prudenti"
     )
@@ -295,12 +513,7 @@ def portfolio_wizard(portfolios):
     
     experience = st.radio(
         "Seleziona il tuo livello:",
-        [
-            "Principiante - È la mia prima volta con investimenti",
-            "Base - Ho letto e studiato, ma poca pratica",
-            "Intermedio - Ho già investito in ETF o fondi",
-            "Esperto - Investo regolarmente e comprendo i mercati"
-        ],
+        EXPERIENCE_OPTIONS,
         index=None,
         help="Questo ci aiuta a suggerirti portafogli con la complessità appropriata"
     )
@@ -313,13 +526,7 @@ def portfolio_wizard(portfolios):
     
     risk_tolerance = st.radio(
         "Seleziona la risposta più vicina al tuo comportamento:",
-        [
-            "😰 Venderei immediatamente - Non sopporto le perdite",
-            "😟 Sarei molto preoccupato - Probabilmente venderei",
-            "😐 Sarei preoccupato ma manterrei - Capisco la volatilità",
-            "😊 Lo vedrei come opportunità - Comprerei di più se possibile",
-            "🚀 Sono tranquillo - È normale, compro ancora"
-        ],
+        TOLERANCE_OPTIONS,
         index=None,
         help="La tolleranza al rischio è soggettiva - sii onesto con te stesso"
     )
@@ -332,12 +539,7 @@ def portfolio_wizard(portfolios):
     
     income_stability = st.radio(
         "Seleziona la tua situazione:",
-        [
-            "Reddito stabile e sicuro - Posso investire regolarmente",
-            "Reddito variabile - Preferisco flessibilità",
-            "Reddito incerto - Potrei aver bisogno dei soldi",
-            "Pensionato/a - Vivo di rendite o pensione"
-        ],
+        INCOME_OPTIONS,
         index=None,
         help="La stabilità del reddito influenza quanto rischio puoi permetterti"
     )
@@ -350,11 +552,7 @@ def portfolio_wizard(portfolios):
     
     esg_preference = st.radio(
         "Seleziona la tua preferenza:",
-        [
-            "Sì, voglio solo portafogli ESG - È una priorità",
-            "Mi interessa ma non è essenziale - Bonus se disponibile",
-            "No, non è importante - Focus solo su rendimento/rischio"
-        ],
+        ESG_OPTIONS,
         index=None,
         help="I portafogli ESG investono in aziende con migliori pratiche ambientali e sociali"
     )
@@ -367,12 +565,7 @@ def portfolio_wizard(portfolios):
     
     complexity = st.radio(
         "Seleziona la tua disponibilità:",
-        [
-            "Zero - Voglio investire e dimenticare (set & forget)",
-            "Minima - Al massimo un controllo annuale",
-            "Moderata - Posso ribilanciare ogni 3-6 mesi se necessario",
-            "Alta - Mi piace monitorare e gestire attivamente"
-        ],
+        COMPLEXITY_OPTIONS,
         index=None,
         help="I portafogli single ETF non richiedono ribilanciamento"
     )
@@ -383,276 +576,58 @@ def portfolio_wizard(portfolios):
     if st.button("🎯 Trova i Miei Portafogli Ideali", type="primary", use_container_width=True):
         if all([age_range, time_horizon, investment_goal, portfolio_percentage, 
                 experience, risk_tolerance, income_stability, esg_preference, complexity]):
-            # Calcola i suggerimenti
-            results = calculate_recommendations(
-                portfolios,
-                age_range,
-                time_horizon,
-                investment_goal,
-                portfolio_percentage,
-                experience,
-                risk_tolerance,
-                income_stability,
-                esg_preference,
-                complexity
-            )
+            # Calcola i suggerimenti (lookup O(1) nella tabella precalcolata)
+            with phase('wizard_scoring'):
+                results = lookup_recommendations(
+                    portfolios,
+                    age_range,
+                    time_horizon,
+                    investment_goal,
+                    portfolio_percentage,
+                    experience,
+                    risk_tolerance,
+                    income_stability,
+                    esg_preference,
+                    complexity
+                )
+            # I risultati vengono mostrati più sotto nella stessa esecuzione del fragment
             st.session_state.wizard_results = results
             st.session_state.wizard_completed = True
-            st.rerun()
         else:
             st.error("⚠️ Per favore, rispondi a tutte le domande prima di continuare.")
     
     # Mostra risultati se disponibili
     if st.session_state.wizard_completed and st.session_state.wizard_results:
         st.divider()
-        display_wizard_results(st.session_state.wizard_results, portfolios)
+        with phase('wizard_results'):
+            display_wizard_results(st.session_state.wizard_results, portfolios)
         
         # Bottone per ricominciare
-        if st.button("🔄 Ricomincia il Questionario", use_container_width=True):
-            st.session_state.wizard_completed = False
-            st.session_state.wizard_results = None
-            st.rerun()
+        st.button("🔄 Ricomincia il Questionario", use_container_width=True, on_click=reset_wizard)
 
 
-def calculate_recommendations(portfolios, age_range, time_horizon, investment_goal, 
-                             portfolio_percentage, experience, risk_tolerance, income_stability, 
-                             esg_preference, complexity):
-    """Calcola i portafogli raccomandati in base alle risposte del wizard"""
-    
-    # STEP 1: Determina livello di rischio base
-    
-    # Mapping età → influenza rischio base
-    age_risk_modifier = {
-        "Meno di 30 anni - Inizio carriera": +1,
-        "30-45 anni - Consolidamento professionale": 0,
-        "45-60 anni - Picco carriera, pre-pensione": -1,
-        "Più di 60 anni - Pensione o vicino alla pensione": -2
-    }
-    
-    # Mapping orizzonte temporale → range di rischio base
-    time_risk_mapping = {
-        "Meno di 3 anni - Breve termine": [1, 2],
-        "3-7 anni - Medio termine": [2, 3],
-        "7-10 anni - Medio-lungo termine": [3, 4, 5],
-        "10-15 anni - Lungo termine": [4, 5, 6],
-        "Più di 15 anni - Molto lungo termine": [5, 6, 7]
-    }
-    
-    # Mapping obiettivo → preferenza rischio
-    goal_risk_modifier = {
-        "Pensione - Costruire capitale per il futuro": 0,
-        "Grande acquisto - Casa, auto, educazione figli": -1,
-        "Crescita patrimonio - Aumentare il capitale nel tempo": +1,
-        "Preservazione capitale - Proteggere dall'inflazione": -2,
-        "Libertà finanziaria - Rendita passiva": 0
-    }
-    
-    # Mapping percentuale patrimonio → prudenza
-    wealth_risk_modifier = {
-        "Tutto o quasi tutto (80-100%)": -2,
-        "Parte maggiore (50-80%)": -1,
-        "Parte significativa (20-50%)": 0,
-        "Parte minore (meno del 20%)": +1
-    }
-    
-    # Mapping tolleranza emotiva → aggiustamento rischio
-    tolerance_adjustment = {
-        "😰 Venderei immediatamente - Non sopporto le perdite": -2,
-        "😟 Sarei molto preoccupato - Probabilmente venderei": -1,
-        "😐 Sarei preoccupato ma manterrei - Capisco la volatilità": 0,
-        "😊 Lo vedrei come opportunità - Comprerei di più se possibile": +1,
-        "🚀 Sono tranquillo - È normale, compro ancora": +1
-    }
-    
-    # Mapping stabilità reddito → prudenza
-    income_risk_modifier = {
-        "Reddito stabile e sicuro - Posso investire regolarmente": +1,
-        "Reddito variabile - Preferisco flessibilità": 0,
-        "Reddito incerto - Potrei aver bisogno dei soldi": -2,
-        "Pensionato/a - Vivo di rendite o pensione": -1
-    }
-    
-    # Calcola rischio base dall'orizzonte temporale
-    base_risks = time_risk_mapping.get(time_horizon, [3, 4, 5])
-    
-    # Applica tutti i modificatori
-    total_adjustment = (
-        age_risk_modifier.get(age_range, 0) +
-        goal_risk_modifier.get(investment_goal, 0) +
-        wealth_risk_modifier.get(portfolio_percentage, 0) +
-        tolerance_adjustment.get(risk_tolerance, 0) +
-        income_risk_modifier.get(income_stability, 0)
-    )
-    
-    # Applica aggiustamento al range
-    recommended_risks = []
-    for risk in base_risks:
-        adjusted = risk + total_adjustment
-        adjusted = max(1, min(7, adjusted))
-        recommended_risks.append(adjusted)
-    
-    # Rimuovi duplicati e ordina
-    recommended_risks = sorted(set(recommended_risks))
-    
-    # ============================================================================
-    # ⚠️ CRITICAL FIX: HARD LIMITS BASATI SULLA TOLLERANZA AL RISCHIO
-    # ============================================================================
-    risk_tolerance_hard_caps = {
-        "😰 Venderei immediatamente - Non sopporto le perdite": 2,
-        "😟 Sarei molto preoccupato - Probabilmente venderei": 3,
-        "😐 Sarei preoccupato ma manterrei - Capisco la volatilità": 5,
-        "😊 Lo vedrei come opportunità - Comprerei di più se possibile": 7,
-        "🚀 Sono tranquillo - È normale, compro ancora": 7
-    }
-    
-    max_risk_allowed = risk_tolerance_hard_caps.get(risk_tolerance, 5)
-    
-    # APPLICA IL LIMITE INVALICABILE
-    recommended_risks = [r for r in recommended_risks if r <= max_risk_allowed]
-    
-    # Se il filtro ha eliminato tutto, usa il massimo consentito e quello sotto
-    if not recommended_risks:
-        recommended_risks = [max(1, max_risk_allowed - 1), max_risk_allowed]
-    
-    # STEP 2: Determina preferenze di complessità
-    
-    # Single ETF SOLO se: complessità Zero OR esperienza Principiante
-    single_only = (
-        complexity == "Zero - Voglio investire e dimenticare (set & forget)" or
-        experience == "Principiante - È la mia prima volta con investimenti"
-    )
-    
-    # Preferenza per single (ma non obbligatorio)
-    prefer_single = (
-        complexity in ["Zero - Voglio investire e dimenticare (set & forget)", 
-                      "Minima - Al massimo un controllo annuale"]
-    )
-    
-    # STEP 3: Determina preferenza ESG
-    
-    esg_only = esg_preference == "Sì, voglio solo portafogli ESG - È una priorità"
-    prefer_esg = esg_preference == "Mi interessa ma non è essenziale - Bonus se disponibile"
-    
-    # STEP 4: Determina complessità massima basata su esperienza
-    # ⚠️ CRITICAL FIX: Aumentato limite per "Base" da 3 a 5
-    max_components = {
-        "Principiante - È la mia prima volta con investimenti": 1,
-        "Base - Ho letto e studiato, ma poca pratica": 5,  # 🔧 AUMENTATO DA 3 A 5
-        "Intermedio - Ho già investito in ETF o fondi": 7,  # 🔧 AUMENTATO DA 6 A 7
-        "Esperto - Investo regolarmente e comprendo i mercati": 10
-    }
-    max_etfs = max_components.get(experience, 5)
-    
-    # 🔧 BONUS CRITICO: Se l'utente è disposto a gestire complessità moderata/alta
-    # e NON vuole solo single ETF, aumenta ulteriormente il limite
-    if not single_only and complexity in ["Moderata - Posso ribilanciare ogni 3-6 mesi se necessario",
-                                          "Alta - Mi piace monitorare e gestire attivamente"]:
-        max_etfs += 2  # Permetti portafogli un po' più complessi
-    
-    # STEP 5: Filtra e punteggia i portafogli
-    
-    # Raccogli tutti i portafogli
-    all_portfolios = []
-    for section in portfolios.values():
-        all_portfolios.extend(section)
-    
-    # Filtra i portafogli
-    candidates = []
-    for portfolio in all_portfolios:
-        # FILTRO CRITICO: Escludi sempre rischio 8
-        if portfolio['risk_level'] == 8:
-            continue
-        
-        # Filtro rischio
-        if portfolio['risk_level'] not in recommended_risks:
-            continue
-        
-        # Filtro ESG
-        if esg_only and portfolio['esg'] != 1:
-            continue
-        
-        # Filtro numero componenti
-        if len(portfolio['components']) > max_etfs:
-            continue
-        
-        # Filtro single ETF
-        if single_only and len(portfolio['components']) > 1:
-            continue
-        
-        # CALCOLA SCORE
-        score = 0
-        
-        # Bonus per preferenza single
-        if prefer_single and len(portfolio['components']) == 1:
-            score += 12
-        
-        # Bonus per ESG
-        if prefer_esg and portfolio['esg'] == 1:
-            score += 6
-        
-        # Bonus forte per ESG only
-        if esg_only and portfolio['esg'] == 1:
-            score += 10
-        
-        # Bonus per nessun ribilanciamento
-        if complexity in ["Zero - Voglio investire e dimenticare (set & forget)", 
-                         "Minima - Al massimo un controllo annuale"]:
-            if portfolio['rebalance'] == 'NO':
-                score += 18
-        
-        # Bonus moderato per ribilanciamento annuale
-        if complexity == "Moderata - Posso ribilanciare ogni 3-6 mesi se necessario":
-            if portfolio['rebalance'] in ['NO', '1y']:
-                score += 8
-        
-        # 🔧 PENALITÀ PER SINGLE ETF se NON è preferito
-        # Questo aiuta a far emergere i multi-ETF quando l'utente è disposto a gestirli
-        if not prefer_single and not single_only and len(portfolio['components']) == 1:
-            score -= 5
-        
-        # Bonus per match con obiettivo
-        if investment_goal == "Preservazione capitale - Proteggere dall'inflazione":
-            if portfolio['risk_level'] <= 3:
-                score += 8
-        
-        if investment_goal == "Crescita patrimonio - Aumentare il capitale nel tempo":
-            if portfolio['risk_level'] >= 5:
-                score += 8
-        
-        # Vicinanza al rischio ideale
-        ideal_risk = recommended_risks[len(recommended_risks)//2] if recommended_risks else 4
-        risk_distance = abs(portfolio['risk_level'] - ideal_risk)
-        score -= risk_distance * 3
-        
-        candidates.append({
-            'portfolio': portfolio,
-            'score': score
-        })
-    
-    # Ordina per score
-    candidates.sort(key=lambda x: x['score'], reverse=True)
-    
-    # Prendi i top 3
-    top_portfolios = [c['portfolio'] for c in candidates[:3]]
-    
-    return {
-        'portfolios': top_portfolios,
-        'recommended_risks': recommended_risks,
-        'criteria': {
-            'age_range': age_range,
-            'time_horizon': time_horizon,
-            'investment_goal': investment_goal,
-            'portfolio_percentage': portfolio_percentage,
-            'experience': experience,
-            'risk_tolerance': risk_tolerance,
-            'income_stability': income_stability,
-            'esg_preference': esg_preference,
-            'complexity': complexity,
-            'single_only': single_only,
-            'esg_only': esg_only,
-            'max_etfs': max_etfs
-        }
+def lookup_recommendations(portfolios, age_range, time_horizon, investment_goal,
+                           portfolio_percentage, experience, risk_tolerance, income_stability,
+                           esg_preference, complexity):
+    """
+    Raccomandazioni lette dalla tabella precalcolata; calcolo diretto se la risposta non è in tabella
+    o se il catalogo è troppo grande per averne una
+    """
+    answers = {
+        'age_range': age_range,
+        'time_horizon': time_horizon,
+        'investment_goal': investment_goal,
+        'portfolio_percentage': portfolio_percentage,
+        'experience': experience,
+        'risk_tolerance': risk_tolerance,
+        'income_stability': income_stability,
+        'esg_preference': esg_preference,
+        'complexity': complexity
     }
+    try:
+        return load_answer_table(table_version(CATALOG_VERSION)).lookup(portfolios, **answers)
+    except (KeyError, ValueError):
+        return calculate_recommendations(portfolios, **answers)
 
 
 def display_wizard_results(results, all_portfolios):
@@ -713,41 +688,35 @@ def display_wizard_results(results, all_portfolios):
                 emoji = "🥉"
                 medal = "Opzione Aggiuntiva"
             
-            st.markdown(f"### {emoji} {medal} - {portfolio['name']}")
-            st.caption(f"ID Tecnico: {portfolio['id']}")
+            st.markdown(f"### {emoji} {medal} - {portfolio.name}")
+            st.caption(f"ID Tecnico: {portfolio.id}")
             
             # Spiega perché è stato raccomandato
             reasons = []
             
-            if len(portfolio['components']) == 1:
+            if portfolio.is_single:
                 reasons.append("✅ **Semplicità massima** - Un solo ETF, gestione minima")
-            elif len(portfolio['components']) <= 4:
+            elif portfolio.n_components <= 4:
                 reasons.append("📊 **Facile da gestire** - Numero limitato di componenti")
             
-            if portfolio['esg'] == 1:
+            if portfolio.esg == 1:
                 reasons.append("🌱 **ESG compliant** - Investe secondo criteri sostenibili")
             
-            if portfolio['rebalance'] == 'NO':
+            if portfolio.rebalance == 'NO':
                 reasons.append("⏰ **Zero manutenzione** - Non richiede ribilanciamento")
-            elif portfolio['rebalance'] == '1y':
+            elif portfolio.rebalance == '1y':
                 reasons.append("📅 **Manutenzione annuale** - Ribilanciamento una volta l'anno")
             
-            if portfolio['risk_level'] in results['recommended_risks']:
-                risk_cat = get_risk_category(portfolio['risk_level'])
-                reasons.append(f"⚖️ **Rischio appropriato** - Livello {portfolio['risk_level']} ({risk_cat}) adatto al tuo profilo")
+            if portfolio.risk_level in results['recommended_risks']:
+                risk_cat = get_risk_category(portfolio.risk_level)
+                reasons.append(f"⚖️ **Rischio appropriato** - Livello {portfolio.risk_level} ({risk_cat}) adatto al tuo profilo")
             
-            # Calcola TER medio
-            if len(portfolio['components']) > 1:
-                ter_medio = sum(
-                    float(comp['ter']) * float(comp['percentage']) / 100
-                    for comp in portfolio['components']
-                )
-                if ter_medio <= 0.15:
-                    reasons.append(f"💰 **Costi bassi** - TER medio {ter_medio:.2f}%")
-            else:
-                ter_single = float(portfolio['components'][0]['ter'])
-                if ter_single <= 0.15:
-                    reasons.append(f"💰 **Costi bassi** - TER {ter_single}%")
+            # TER medio precalcolato nel catalogo
+            if portfolio.weighted_ter <= 0.15:
+                if portfolio.is_single:
+                    reasons.append(f"💰 **Costi bassi** - TER {portfolio.weighted_ter:.2f}%")
+                else:
+                    reasons.append(f"💰 **Costi bassi** - TER medio {portfolio.weighted_ter:.2f}%")
             
             if reasons:
                 st.markdown("**Perché questo portafoglio:**")
@@ -812,34 +781,47 @@ def display_wizard_results(results, all_portfolios):
     """)
 
 
-def filter_portfolios(portfolios, risk_filter, esg_filter, single_only):
-    """Applica i filtri ai portafogli"""
-    filtered = {'multi': [], 'single': [], 'esg': []}
-    
-    for section, portfolio_list in portfolios.items():
-        for portfolio in portfolio_list:
-            # Filtro rischio
-            if portfolio['risk_level'] not in risk_filter:
-                continue
-            
-            # Filtro ESG
-            if esg_filter and portfolio['esg'] != 1:
-                continue
-            
-            # Filtro single ETF
-            if single_only and len(portfolio['components']) > 1:
-                continue
-            
-            filtered[section].append(portfolio)
-    
-    return filtered
+def get_portfolio_summary(portfolio):
+    """Riga di riepilogo di un portafoglio: nome, rischio, numero di ETF e TER"""
+    n_etf = "1 ETF" if portfolio.n_components == 1 else f"{portfolio.n_components} ETF"
+    return (f"{get_portfolio_title(portfolio)} · Rischio {portfolio.risk_level} "
+            f"({get_risk_category(portfolio.risk_level)}) · {n_etf} · TER {portfolio.weighted_ter:.2f}%")
 
 
-def display_by_risk(portfolios, risk_filter, esg_filter, single_only):
+def paginate(items, key):
+    """Restituisce gli elementi della pagina scelta, con il selettore solo se servono più pagine"""
+    n_pages = -(-len(items) // PAGE_SIZE)
+    if n_pages <= 1:
+        return items
+    page = st.number_input(
+        f"Pagina (1-{n_pages})",
+        min_value=1,
+        max_value=n_pages,
+        value=1,
+        step=1,
+        key=f"page_{key}"
+    )
+    start = (page - 1) * PAGE_SIZE
+    st.caption(f"Portafogli {start + 1}-{min(start + PAGE_SIZE, len(items))} di {len(items)}")
+    return items[start:start + PAGE_SIZE]
+
+
+def display_portfolio_list(portfolios, key):
+    """
+    Elenco paginato di portafogli: per ognuno viene costruita solo la riga di riepilogo,
+    il dettaglio completo (tabelle, metriche, link, simulazione) solo quando viene aperto
+    """
+    for portfolio in paginate(portfolios, key):
+        if st.toggle(get_portfolio_summary(portfolio), key=f"open_{key}_{portfolio.id}"):
+            with st.container(border=True):
+                display_portfolio_body(portfolio)
+
+
+def display_by_risk(portfolios, risk_filter, esg_filter, single_only, ranges=()):
     """Visualizza portafogli organizzati per livello di rischio"""
     st.header("📊 Portafogli per Livello di Rischio")
     
-    filtered = filter_portfolios(portfolios, risk_filter, esg_filter, single_only)
+    filtered = filter_portfolios(portfolios, risk_filter, esg_filter, single_only, ranges=ranges)
     
     # Combina tutti i portafogli
     all_portfolios = []
@@ -847,7 +829,7 @@ def display_by_risk(portfolios, risk_filter, esg_filter, single_only):
         all_portfolios.extend(section)
     
     # Ordina per livello di rischio
-    all_portfolios.sort(key=lambda x: x['risk_level'])
+    all_portfolios.sort(key=lambda x: x.risk_level)
     
     # Raggruppa per categoria di rischio
     risk_groups = {
@@ -858,7 +840,7 @@ def display_by_risk(portfolios, risk_filter, esg_filter, single_only):
     }
     
     for portfolio in all_portfolios:
-        category = get_risk_category(portfolio['risk_level'])
+        category = get_risk_category(portfolio.risk_level)
         risk_groups[category].append(portfolio)
     
     # Visualizza ogni gruppo
@@ -890,40 +872,36 @@ def display_by_risk(portfolios, risk_filter, esg_filter, single_only):
                 completamente i rischi del leverage, compresi l'effetto decay e la necessità di ribilanciamento frequente.
                 """)
             
-            for portfolio in risk_groups[category]:
-                display_portfolio(portfolio)
+            display_portfolio_list(risk_groups[category], f"risk_{category}")
             
             st.divider()
 
 
-def display_by_category(portfolios, risk_filter, esg_filter, single_only):
+def display_by_category(portfolios, risk_filter, esg_filter, single_only, ranges=()):
     """Visualizza portafogli organizzati per categoria"""
     st.header("📁 Portafogli per Categoria")
     
-    filtered = filter_portfolios(portfolios, risk_filter, esg_filter, single_only)
+    filtered = filter_portfolios(portfolios, risk_filter, esg_filter, single_only, ranges=ranges)
     
     # Portafogli Multi-ETF
     if filtered['multi']:
         st.subheader("🎯 Portafogli Multi-ETF")
         st.markdown("Portafogli diversificati con più componenti ETF")
-        for portfolio in sorted(filtered['multi'], key=lambda x: x['risk_level']):
-            display_portfolio(portfolio)
+        display_portfolio_list(sorted(filtered['multi'], key=lambda x: x.risk_level), "category_multi")
         st.divider()
     
     # Portafogli Single ETF
     if filtered['single']:
         st.subheader("⭐ Portafogli Single ETF")
         st.markdown("Portafogli semplificati con un unico ETF - ideali per principianti")
-        for portfolio in sorted(filtered['single'], key=lambda x: x['risk_level']):
-            display_portfolio(portfolio)
+        display_portfolio_list(sorted(filtered['single'], key=lambda x: x.risk_level), "category_single")
         st.divider()
     
     # Portafogli ESG
     if filtered['esg']:
         st.subheader("🌱 Portafogli ESG")
         st.markdown("Portafogli con focus su criteri ambientali, sociali e di governance")
-        for portfolio in sorted(filtered['esg'], key=lambda x: x['risk_level']):
-            display_portfolio(portfolio)
+        display_portfolio_list(sorted(filtered['esg'], key=lambda x: x.risk_level), "category_esg")
         st.divider()
     
     # Messaggio se nessun portafoglio corrisponde ai filtri
@@ -931,28 +909,133 @@ def display_by_category(portfolios, risk_filter, esg_filter, single_only):
         st.info("Nessun portafoglio corrisponde ai filtri selezionati. Prova a modificare i criteri di ricerca.")
 
 
-def display_all_portfolios(portfolios, risk_filter, esg_filter, single_only):
+def range_filters(portfolios):
+    """Slider di TER, quota azionaria e orizzonte; restituisce le condizioni (colonna, minimo, massimo)"""
+    index = get_range_index(portfolios)
+    ranges = []
+    
+    # Ogni slider compare solo se il catalogo ha valori diversi (Streamlit rifiuta min == max)
+    ter_low = math.floor(index.bounds('ter')[0] * 100) / 100
+    ter_max = math.ceil(index.bounds('ter')[1] * 100) / 100
+    if ter_max > ter_low:
+        max_ter = st.sidebar.slider("TER massimo (%)", ter_low, ter_max, ter_max, step=0.01, format="%.2f%%")
+        if max_ter < ter_max:
+            ranges.append(('ter', None, max_ter))
+    
+    equity_low, equity_high = (int(math.floor(index.bounds('equity')[0])), int(math.ceil(index.bounds('equity')[1])))
+    if equity_high > equity_low:
+        equity = st.sidebar.slider("Quota azionaria (%)", equity_low, equity_high, (equity_low, equity_high),
+                                   step=5, help="Oltre il 100% solo per i portafogli con leva")
+        if equity != (equity_low, equity_high):
+            ranges.append(('equity', equity[0], equity[1]))
+    
+    horizon_low, horizon_high = (int(value) for value in index.bounds('horizon'))
+    if horizon_high > horizon_low:
+        max_horizon = st.sidebar.slider("Orizzonte minimo fino a (anni)", horizon_low, horizon_high, horizon_high)
+        if max_horizon < horizon_high:
+            ranges.append(('horizon', None, max_horizon))
+    return tuple(ranges)
+
+
+def display_search_results(portfolios, query):
+    """Portafogli che corrispondono alla ricerca, dai più pertinenti"""
+    st.header(f"🔎 Risultati per \"{query.strip()}\"")
+    
+    index = load_search_index(CATALOG_VERSION, portfolios)
+    results = index.search(query, limit=SEARCH_LIMIT)
+    if results:
+        total = index.count(query)
+        st.info(f"Trovati **{total} portafogli** che contengono tutte le parole cercate")
+        if total > len(results):
+            st.caption(f"Sono mostrati i {len(results)} più pertinenti: aggiungi parole per restringere la ricerca.")
+        display_portfolio_list(results, "search")
+    else:
+        st.warning("Nessun portafoglio corrisponde alla ricerca. Prova con un nome di ETF, un indice o un ISIN.")
+
+
+def display_all_portfolios(portfolios, risk_filter, esg_filter, single_only, ranges=()):
     """Visualizza tutti i portafogli"""
     st.header("🔍 Tutti i Portafogli")
     
-    filtered = filter_portfolios(portfolios, risk_filter, esg_filter, single_only)
+    filtered = filter_portfolios(portfolios, risk_filter, esg_filter, single_only, ranges=ranges)
     
     # Combina e ordina tutti i portafogli
     all_portfolios = []
     for section in filtered.values():
         all_portfolios.extend(section)
     
-    all_portfolios.sort(key=lambda x: (x['risk_level'], x['id']))
+    all_portfolios.sort(key=lambda x: (x.risk_level, x.id))
     
     if all_portfolios:
         st.info(f"Trovati **{len(all_portfolios)} portafogli** che corrispondono ai filtri selezionati")
         
-        for portfolio in all_portfolios:
-            display_portfolio(portfolio)
+        display_portfolio_list(all_portfolios, "all")
     else:
         st.warning("Nessun portafoglio corrisponde ai filtri selezionati.")
 
 
+def get_allocation_table(frontier, index, names):
+    """Tabella dei pesi di un punto della frontiera"""
+    return pd.DataFrame([
+        {'Peso': f"{weight:.1%}", 'Nome ETF': names.get(isin, isin), 'ISIN': isin}
+        for isin, weight in frontier.allocation(index).items()
+    ])
+
+
+def display_frontier(portfolios):
+    """Frontiera efficiente sull'universo degli ETF del catalogo e posizione dei portafogli modello"""
+    st.header("📈 Frontiera Efficiente")
+    
+    version = store_version()
+    isins, _, _, source = load_universe_moments(version, CATALOG_VERSION, portfolios)
+    if source == SOURCE_HISTORY:
+        st.caption(f"Rendimenti e covarianze stimati dai prezzi storici di {len(isins)} ETF.")
+    else:
+        st.caption(f"Rendimenti e covarianze dalle ipotesi di mercato per classe di attivo ({len(isins)} ETF): "
+                   "importa i prezzi storici per usare i dati reali.")
+    
+    min_cap = int(np.ceil(100 / len(isins) / 5) * 5)
+    cap = st.slider("Peso massimo per singolo ETF (%)", min_value=min_cap, max_value=100, value=100, step=5,
+                    help="Vincolo long-only: nessuna vendita allo scoperto e nessun ETF oltre questo peso")
+    frontier, positions = solve_frontier(cap / 100, version, CATALOG_VERSION, portfolios)
+    
+    points = pd.DataFrame({
+        'Volatilità (%)': frontier.volatilities * 100,
+        'Rendimento atteso (%)': frontier.returns * 100,
+        'Serie': 'Frontiera efficiente'
+    })
+    models = pd.DataFrame({
+        'Volatilità (%)': positions['volatility'] * 100,
+        'Rendimento atteso (%)': positions['expected_return'] * 100,
+        'Serie': 'Portafogli modello'
+    })
+    st.scatter_chart(pd.concat([points, models]), x='Volatilità (%)', y='Rendimento atteso (%)', color='Serie')
+    
+    names = {comp.isin: comp.name for section in portfolios.values() for p in section for comp in p.components}
+    col1, col2 = st.columns(2)
+    with col1:
+        i = frontier.min_variance
+        st.markdown(f"**🛡️ Varianza minima** - volatilità {frontier.volatilities[i]:.2%}, "
+                    f"rendimento atteso {frontier.returns[i]:.2%}")
+        st.dataframe(get_allocation_table(frontier, i, names), use_container_width=True, hide_index=True)
+    with col2:
+        i = frontier.max_sharpe
+        st.markdown(f"**🏆 Sharpe massimo** (risk free {frontier.risk_free:.0%}) - volatilità "
+                    f"{frontier.volatilities[i]:.2%}, rendimento atteso {frontier.returns[i]:.2%}")
+        st.dataframe(get_allocation_table(frontier, i, names), use_container_width=True, hide_index=True)
+    
+    st.markdown("**📍 Portafogli modello rispetto alla frontiera:**")
+    table = pd.DataFrame({
+        'Rischio': positions['risk_level'],
+        'Volatilità': (positions['volatility'] * 100).map('{:.2f}%'.format),
+        'Rendimento atteso': (positions['expected_return'] * 100).map('{:.2f}%'.format),
+        'Distanza dalla frontiera': (positions['gap'] * 100).map('{:.2f}%'.format),
+    }).sort_values('Rischio')
+    st.dataframe(table, use_container_width=True)
+    st.caption("La distanza è il rendimento atteso in meno rispetto al portafoglio di frontiera "
+               "con la stessa volatilità, a parità di vincoli.")
+
+
 def display_educational_section():
     """Visualizza la sezione educativa"""
     st.header("📚 Guida Rapida agli Investimenti")
@@ -1126,7 +1209,70 @@ def display_footer():
     """, unsafe_allow_html=True)
 
 
-def main():
+def debug_enabled():
+    """
+    Pannello di debug e profilazione: con PORTFOLIO_PROFILE=1 per tutti, con ?debug=<token>
+    per la sessione solo se il token è configurato in PORTFOLIO_DEBUG_TOKEN
+    """
+    return profiling_enabled_by_env() or debug_token_matches(st.query_params.get('debug'))
+
+
+def remember_profile(record):
+    """Conserva nella sessione le ultime esecuzioni profilate"""
+    history = st.session_state.setdefault('profile_history', [])
+    history.append(record)
+    del history[:-PROFILE_HISTORY]
+
+
+def request_profile():
+    """Callback: cattura con cProfile l'esecuzione avviata dal click"""
+    st.session_state.profile_next_rerun = True
+
+
+def display_debug_panel():
+    """Pannello nascosto nella sidebar con le fasi delle ultime esecuzioni"""
+    history = st.session_state.get('profile_history', [])
+    if not history:
+        return
+    last = history[-1]
+
+    with st.sidebar.expander("🛠️ Debug: profilazione", expanded=False):
+        st.caption(f"Ultima esecuzione ({last['label']}): {last['total_seconds'] * 1000:.1f} ms"
+                   + (f", memoria tracciata dal processo {last['process_traced_kb']:,.0f} KB"
+                      if 'process_traced_kb' in last else ""))
+        st.dataframe(pd.DataFrame([
+            {'Fase': name, 'ms': stats['seconds'] * 1000, 'Picco processo KB': stats['process_peak_kb'],
+             'Chiamate': stats['calls']}
+            for name, stats in last['phases'].items()
+        ]), hide_index=True, use_container_width=True)
+        st.caption("I picchi di memoria sono dell'intero processo: includono le allocazioni "
+                   "delle altre sessioni attive nello stesso momento.")
+        if last.get('overlapping_runs'):
+            st.warning(f"⚠️ {last['overlapping_runs']} esecuzioni profilate in parallelo a questa: "
+                       "i picchi per fase non sono attribuibili solo a questa sessione.")
+
+        if len(history) > 1:
+            st.markdown(f"**Ultime {len(history)} esecuzioni**")
+            st.dataframe(pd.DataFrame(summarize_log(history)).rename(columns={
+                'phase': 'Fase', 'runs': 'Esecuzioni', 'mean_ms': 'Media ms', 'max_ms': 'Max ms',
+                'process_peak_kb': 'Picco processo KB'
+            }), hide_index=True, use_container_width=True)
+
+        profiled = next((record for record in reversed(history) if 'top_functions' in record), None)
+        if profiled is not None:
+            st.markdown("**cProfile (tempo cumulato)**")
+            st.dataframe(pd.DataFrame(profiled['top_functions'],
+                                      columns=['Funzione', 'Chiamate', 'Tempo proprio s', 'Tempo cumulato s']),
+                         hide_index=True, use_container_width=True)
+            if profiled.get('profile'):
+                st.caption(f"Dump: `{profiled['profile']}`")
+
+        st.button("⏱️ Profila un'esecuzione con cProfile", on_click=request_profile, use_container_width=True)
+        st.caption(f"Log: `{PROFILE_LOG}`")
+
+
+def display_page():
+    """Pagina completa: intestazione, navigazione, vista scelta, sezione educativa e footer"""
     # Intestazione
     st.markdown('<p class="main-header">📊 Portafogli Modello ETF UCITS</p>', unsafe_allow_html=True)
     
@@ -1146,7 +1292,8 @@ def main():
     st.divider()
     
     # Carica i dati
-    portfolios = load_portfolios()
+    with phase('data_load'):
+        portfolios = load_portfolios()
     
     # Controlla se ci sono portafogli caricati
     total_portfolios = sum(len(portfolios[section]) for section in portfolios)
@@ -1161,101 +1308,139 @@ def main():
         return
     
     # Sidebar per la navigazione
-    st.sidebar.title("🧭 Navigazione")
-    st.sidebar.markdown("---")
-    
-    # Selezione modalità principale
-    main_mode = st.sidebar.radio(
-        "Scegli come procedere:",
-        ["🎯 Guidami alla Scelta (Consigliato)", "🔍 Esplora Liberamente"],
-        help="La modalità guidata ti aiuta a trovare il portafoglio ideale con domande mirate"
-    )
-    
-    if main_mode == "🔍 Esplora Liberamente":
-        st.sidebar.markdown("---")
-        
-        # Selezione visualizzazione
-        view_type = st.sidebar.radio(
-            "Modalità di visualizzazione:",
-            ["📊 Per Livello di Rischio", "📁 Per Categoria", "🔍 Tutti i Portafogli"]
+    with phase('sidebar'):
+        st.sidebar.title("🧭 Navigazione")
+        
+        # Ricerca per nome, ETF o ISIN (indice costruito una volta per versione del catalogo)
+        search_query = st.sidebar.text_input(
+            "🔎 Cerca portafoglio, ETF o ISIN",
+            placeholder="es. MSCI World, IE00B4L5Y983, oro",
+            help="Cerca nei nomi dei portafogli, nelle strategie, nei nomi degli ETF e negli ISIN"
         )
-        
         st.sidebar.markdown("---")
         
-        # Filtri
-        st.sidebar.subheader("🎯 Filtri")
-        
-        # Filtro rischio
-        all_risks = sorted(set(
-            p['risk_level'] 
-            for section in portfolios.values() 
-            for p in section
-        ))
-        
-        risk_filter = st.sidebar.multiselect(
-            "Livello di Rischio:",
-            options=all_risks,
-            default=all_risks,
-            format_func=lambda x: f"Rischio {x} - {get_risk_category(x)}"
+        # Selezione modalità principale
+        main_mode = st.sidebar.radio(
+            "Scegli come procedere:",
+            ["🎯 Guidami alla Scelta (Consigliato)", "🔍 Esplora Liberamente"],
+            help="La modalità guidata ti aiuta a trovare il portafoglio ideale con domande mirate"
         )
-        
-        # Filtro ESG
-        esg_filter = st.sidebar.checkbox("Solo portafogli ESG", value=False)
-        
-        # Filtro numero ETF
-        single_only = st.sidebar.checkbox("Solo portafogli single ETF", value=False)
-        
-        st.sidebar.markdown("---")
-        
-        # Info box nella sidebar
-        st.sidebar.info("""
-        **📖 Legenda:**
-        - 🛡️ Rischio Basso (1-2)
-        - ⚖️ Rischio Medio (3-5)
-        - 🚀 Rischio Alto (6-7)
-        - ⚡ Rischio Molto Alto (8 - Leverage)
-        - 🌱 ESG compliant
-        """)
-        
+    
+    if search_query.strip():
+        with phase('search'):
+            display_search_results(portfolios, search_query)
+        st.divider()
+    
+    if main_mode == "🔍 Esplora Liberamente":
+        with phase('sidebar'):
+            st.sidebar.markdown("---")
+            
+            # Selezione visualizzazione
+            view_type = st.sidebar.radio(
+                "Modalità di visualizzazione:",
+                ["📊 Per Livello di Rischio", "📁 Per Categoria", "🔍 Tutti i Portafogli", "📈 Frontiera Efficiente"]
+            )
+            
+            st.sidebar.markdown("---")
+            
+            # Filtri
+            st.sidebar.subheader("🎯 Filtri")
+            
+            # Filtro rischio
+            all_risks = sorted(set(
+                p.risk_level 
+                for section in portfolios.values() 
+                for p in section
+            ))
+            
+            risk_filter = st.sidebar.multiselect(
+                "Livello di Rischio:",
+                options=all_risks,
+                default=all_risks,
+                format_func=lambda x: f"Rischio {x} - {get_risk_category(x)}"
+            )
+            
+            # Filtro ESG
+            esg_filter = st.sidebar.checkbox("Solo portafogli ESG", value=False)
+            
+            # Filtro numero ETF
+            single_only = st.sidebar.checkbox("Solo portafogli single ETF", value=False)
+            
+            # Filtri numerici: si applicano solo se restringono l'intervallo del catalogo
+            ranges = range_filters(portfolios)
+            
+            st.sidebar.markdown("---")
+            
+            # Info box nella sidebar
+            st.sidebar.info("""
+            **📖 Legenda:**
+            - 🛡️ Rischio Basso (1-2)
+            - ⚖️ Rischio Medio (3-5)
+            - 🚀 Rischio Alto (6-7)
+            - ⚡ Rischio Molto Alto (8 - Leverage)
+            - 🌱 ESG compliant
+            """)
+            
         # Contenuto principale - Modalità esplorazione
         if view_type == "📊 Per Livello di Rischio":
-            display_by_risk(portfolios, risk_filter, esg_filter, single_only)
+            with phase('display_by_risk'):
+                display_by_risk(portfolios, risk_filter, esg_filter, single_only, ranges)
         
         elif view_type == "📁 Per Categoria":
-            display_by_category(portfolios, risk_filter, esg_filter, single_only)
+            with phase('display_by_category'):
+                display_by_category(portfolios, risk_filter, esg_filter, single_only, ranges)
+        
+        elif view_type == "📈 Frontiera Efficiente":
+            with phase('display_frontier'):
+                display_frontier(portfolios)
         
         else:  # Tutti i portafogli
-            display_all_portfolios(portfolios, risk_filter, esg_filter, single_only)
+            with phase('display_all_portfolios'):
+                display_all_portfolios(portfolios, risk_filter, esg_filter, single_only, ranges)
     
     else:
         # Modalità wizard guidato
-        st.sidebar.markdown("---")
-        st.sidebar.info("""
-        🎯 **Modalità Guidata**
-        
-        Rispondi a 9 domande approfondite per scoprire i portafogli più adatti a te.
-        
-        ⏱️ Richiede circa 3 minuti
-        
-        📊 Algoritmo avanzato che analizza:
-        - Profilo personale e età
-        - Capitale e patrimonio
-        - Obiettivi e orizzonte
-        - Esperienza e tolleranza
-        - Preferenze ESG e gestione
-        
-        🔧 **Nuova versione 4.1:** Il wizard ora suggerisce correttamente anche portafogli multi-ETF 
-        per utenti con esperienza "Base" che sono disposti a gestire complessità moderata.
-        """)
-        
-        portfolio_wizard(portfolios)
+        with phase('sidebar'):
+            st.sidebar.markdown("---")
+            st.sidebar.info("""
+            🎯 **Modalità Guidata**
+            
+            Rispondi a 9 domande approfondite per scoprire i portafogli più adatti a te.
+            
+            ⏱️ Richiede circa 3 minuti
+            
+            📊 Algoritmo avanzato che analizza:
+            - Profilo personale e età
+            - Capitale e patrimonio
+            - Obiettivi e orizzonte
+            - Esperienza e tolleranza
+            - Preferenze ESG e gestione
+            
+            🔧 **Nuova versione 4.1:** Il wizard ora suggerisce correttamente anche portafogli multi-ETF 
+            per utenti con esperienza "Base" che sono disposti a gestire complessità moderata.
+            """)
+            
+        with phase('wizard'):
+            portfolio_wizard(portfolios)
     
     # Sezione educativa
     st.divider()
-    display_educational_section()
+    with phase('educational_section'):
+        display_educational_section()
     
     # Footer con disclaimer
-    display_footer()
+    with phase('footer'):
+        display_footer()
+
+
+def main():
+    """Punto di ingresso: disegna la pagina, misurandone le fasi se la modalità debug è attiva"""
+    with profile_rerun('app', enabled=debug_enabled(),
+                       profile=st.session_state.pop('profile_next_rerun', False)) as profiler:
+        display_page()
+    if profiler is not None:
+        remember_profile(profiler.record)
+        display_debug_panel()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,143 @@
+"""
+Backtest Storico Vettoriale dei Portafogli
+Simula tutti i portafogli del catalogo su una matrice di prezzi giornalieri (date x ISIN),
+rispettando la politica di ribilanciamento di ciascuno: nessuno, annuale o trimestrale
+"""
+
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from catalog import REBALANCE_CODES, get_catalog, iter_portfolios, target_weights
+
+# Giorni di borsa per anno, per annualizzare la volatilità
+TRADING_DAYS = 252
+
+# Durata media dell'anno solare, per il CAGR
+DAYS_PER_YEAR = 365.25
+
+# Granularità del calendario che fa scattare il ribilanciamento
+REBALANCE_PERIODS = {'NO': None, '1y': 'Y', '3M': 'Q'}
+
+
+@dataclass(frozen=True)
+class BacktestResult:
+    """Curve di equity (base 1) e metriche per portafoglio, più i portafogli non simulabili"""
+    __slots__ = ('equity', 'metrics', 'skipped')
+
+    equity: pd.DataFrame               # Date x ID portafoglio
+    metrics: pd.DataFrame              # ID portafoglio x (cagr, volatility, max_drawdown)
+    skipped: Tuple[str, ...]           # ID senza prezzi per tutti i componenti
+
+
+def weight_matrix(portfolios, isins):
+    """Matrice dei pesi obiettivo (portafogli x ISIN) nell'ordine delle colonne indicato"""
+    column = {isin: j for j, isin in enumerate(isins)}
+    weights = np.zeros((len(portfolios), len(isins)))
+    for i, portfolio in enumerate(portfolios):
+        for isin, weight in target_weights(portfolio).items():
+            weights[i, column[isin]] = weight
+    return weights
+
+
+def rebalance_starts(dates, rebalance):
+    """
+    Indici delle date in cui il portafoglio torna ai pesi obiettivo: la prima data
+    più il primo giorno disponibile di ogni nuovo anno ('1y') o trimestre ('3M')
+    """
+    if rebalance not in REBALANCE_PERIODS:
+        raise ValueError(f"Ribilanciamento '{rebalance}' non riconosciuto")
+    period = REBALANCE_PERIODS[rebalance]
+    if period is None or len(dates) == 0:
+        return np.zeros(1, dtype=np.intp)
+
+    months = np.asarray(dates, dtype='datetime64[M]').astype(np.int64)
+    buckets = months // 12 if period == 'Y' else months // 3
+    changes = np.flatnonzero(buckets[1:] != buckets[:-1]) + 1
+    return np.concatenate(([0], changes))
+
+
+def simulate(prices, weights, starts):
+    """
+    Curve di equity (date x portafogli, base 1) con ribilanciamento alle date `starts`.
+    Tra due ribilanciamenti il portafoglio è buy-and-hold, quindi il valore è il prodotto
+    scalare tra i pesi e la crescita di ogni ETF dall'ultimo ribilanciamento: nessun ciclo sui giorni
+    """
+    prices = np.asarray(prices, dtype=float)
+    n_dates = prices.shape[0]
+    starts = np.asarray(starts, dtype=np.intp)
+
+    # Ultimo ribilanciamento strettamente precedente ad ogni data (la prima data ancora a sé stessa)
+    period = np.maximum(np.searchsorted(starts, np.arange(n_dates), side='left') - 1, 0)
+    anchors = starts[period]
+
+    # Valore relativo all'ultimo ribilanciamento
+    relative = (prices / prices[anchors]) @ weights.T
+
+    # Valore ai ribilanciamenti: prodotto cumulato dei rendimenti dei periodi precedenti
+    start_values = np.cumprod(np.vstack([np.ones((1, weights.shape[0])), relative[starts[1:]]]), axis=0)
+    return start_values[period] * relative
+
+
+def performance_metrics(equity, dates):
+    """CAGR, volatilità annualizzata e massimo drawdown di ogni curva (colonne di `equity`)"""
+    equity = np.asarray(equity, dtype=float)
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    years = (dates[-1] - dates[0]).astype(np.int64) / DAYS_PER_YEAR
+
+    returns = equity[1:] / equity[:-1] - 1
+    drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = np.where(years > 0, (equity[-1] / equity[0]) ** (1 / years) - 1, np.nan)
+    volatility = returns.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS) if len(returns) > 1 \
+        else np.full(equity.shape[1], np.nan)
+
+    return {
+        'cagr': cagr,
+        'volatility': volatility,
+        'max_drawdown': drawdown.min(axis=0),
+    }
+
+
+def run_backtest(prices, portfolios=None):
+    """
+    Backtest di tutti i portafogli su un DataFrame di prezzi allineati
+    (indice = date, colonne = ISIN). I portafogli con un componente senza prezzi
+    completi nel periodo vengono esclusi e riportati in `skipped`.
+    I prezzi degli ETF sono già al netto del TER, che quindi non viene sottratto
+    """
+    if portfolios is None:
+        portfolios = get_catalog()
+
+    prices = prices.sort_index()
+    available = {isin for isin in prices.columns if prices[isin].notna().all() and (prices[isin] > 0).all()}
+
+    simulated, skipped = [], []
+    for portfolio in iter_portfolios(portfolios):
+        if available.issuperset(target_weights(portfolio)):
+            simulated.append(portfolio)
+        else:
+            skipped.append(portfolio.id)
+
+    dates = prices.index.values
+    isins = sorted({isin for p in simulated for isin in target_weights(p)})
+    matrix = prices[isins].to_numpy(dtype=float)
+    equity = np.empty((len(dates), len(simulated)))
+
+    # Un'unica simulazione per politica di ribilanciamento
+    for code in REBALANCE_CODES:
+        group = [i for i, p in enumerate(simulated) if p.rebalance == code]
+        if group:
+            weights = weight_matrix([simulated[i] for i in group], isins)
+            equity[:, group] = simulate(matrix, weights, rebalance_starts(dates, code))
+
+    ids = [p.id for p in simulated]
+    metrics = performance_metrics(equity, dates) if len(dates) else {}
+    return BacktestResult(
+        equity=pd.DataFrame(equity, index=prices.index, columns=ids),
+        metrics=pd.DataFrame(metrics, index=pd.Index(ids, name='id')),
+        skipped=tuple(skipped),
+    )
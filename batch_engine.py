@@ -0,0 +1,245 @@
+"""
+Motore di Raccomandazione Batch
+Valuta migliaia di questionari contro tutto il catalogo con operazioni vettoriali NumPy,
+producendo gli stessi risultati di calculate_recommendations per ogni cliente
+"""
+
+import numpy as np
+import pandas as pd
+
+from catalog import iter_portfolios
+from engine import (
+    ACTIVE_MANAGEMENT, ACTIVE_MANAGEMENT_EXTRA_ETFS, AGE_RISK_MODIFIER, BEGINNER, DEFAULT_BASE_RISKS,
+    DEFAULT_HARD_CAP, DEFAULT_HORIZON_YEARS, DEFAULT_MAX_COMPONENTS, ESG_BONUS_ANSWER, ESG_ONLY_ANSWER,
+    GOAL_GROWTH, GOAL_PRESERVATION, GOAL_RISK_MODIFIER, HORIZON_YEARS, INCOME_RISK_MODIFIER, LEVERAGE_RISK, LOW_MAINTENANCE,
+    MAX_COMPONENTS, MAX_RISK, MIN_RISK, MODERATE_MAINTENANCE, RISK_TOLERANCE_HARD_CAPS, SCORE_WEIGHTS,
+    SET_AND_FORGET, TIME_RISK_MAPPING, TOLERANCE_ADJUSTMENT, TOP_N, WEALTH_RISK_MODIFIER, WIZARD_QUESTIONS
+)
+
+# Righe elaborate per blocco: limita la matrice clienti × portafogli in memoria
+DEFAULT_CHUNK_SIZE = 10_000
+
+# Punteggio assegnato ai portafogli esclusi dai filtri
+_EXCLUDED = np.iinfo(np.int32).min
+
+# Colonne del risultato
+RESULT_COLUMNS = tuple(f'portfolio_{rank}' for rank in range(1, TOP_N + 1)) + (
+    'recommended_risks', 'single_only', 'esg_only', 'max_etfs'
+)
+
+
+def _lookup(options, table, default, dtype=np.int32):
+    """Tabella di lookup per codice risposta; l'ultimo slot vale per le risposte non riconosciute"""
+    return np.array([table.get(option, default) for option in options] + [default], dtype=dtype)
+
+
+def _flags(options, selected):
+    """Tabella booleana per codice risposta: True per le risposte in `selected`"""
+    return np.array([option in selected for option in options] + [False], dtype=bool)
+
+
+def encode_answers(answers):
+    """Converte la tabella delle risposte in codici interi (una colonna per domanda)"""
+    missing = [q for q in WIZARD_QUESTIONS if q not in answers.columns]
+    if missing:
+        raise ValueError(f"Colonne mancanti nelle risposte: {', '.join(missing)}")
+
+    codes = {}
+    for question, options in WIZARD_QUESTIONS.items():
+        column_codes = pd.Index(list(options)).get_indexer(answers[question]).astype(np.int64)
+        # Risposte sconosciute (-1) → slot finale con i valori di default
+        codes[question] = np.where(column_codes < 0, len(options), column_codes)
+    return codes
+
+
+def portfolio_columns(portfolios):
+    """Attributi del catalogo come array allineati, nell'ordine di iterazione del wizard"""
+    flat = iter_portfolios(portfolios)
+    return {
+        'ids': np.array([p.id for p in flat], dtype=object),
+        'risk': np.array([p.risk_level for p in flat], dtype=np.int32),
+        'esg': np.array([p.esg == 1 for p in flat], dtype=bool),
+        'n_components': np.array([p.n_components for p in flat], dtype=np.int32),
+        'min_years': np.array([p.min_years for p in flat], dtype=float),
+        'max_years': np.array([p.max_years for p in flat], dtype=float),
+        'is_single': np.array([p.is_single for p in flat], dtype=bool),
+        'no_rebalance': np.array([p.rebalance == 'NO' for p in flat], dtype=bool),
+        'easy_rebalance': np.array([p.rebalance in ['NO', '1y'] for p in flat], dtype=bool),
+    }
+
+
+def _risk_masks(codes):
+    """Livelli di rischio raccomandati come maschera booleana (clienti × livelli 0..8)"""
+    horizon_options = WIZARD_QUESTIONS['time_horizon']
+    base_lists = [TIME_RISK_MAPPING.get(o, DEFAULT_BASE_RISKS) for o in horizon_options] + [DEFAULT_BASE_RISKS]
+    width = max(len(b) for b in base_lists)
+    # Righe di rischio base con padding a 0 (valore non valido)
+    base_table = np.array([b + [0] * (width - len(b)) for b in base_lists], dtype=np.int32)
+
+    adjustment = (
+        _lookup(WIZARD_QUESTIONS['age_range'], AGE_RISK_MODIFIER, 0)[codes['age_range']] +
+        _lookup(WIZARD_QUESTIONS['investment_goal'], GOAL_RISK_MODIFIER, 0)[codes['investment_goal']] +
+        _lookup(WIZARD_QUESTIONS['portfolio_percentage'], WEALTH_RISK_MODIFIER, 0)[codes['portfolio_percentage']] +
+        _lookup(WIZARD_QUESTIONS['risk_tolerance'], TOLERANCE_ADJUSTMENT, 0)[codes['risk_tolerance']] +
+        _lookup(WIZARD_QUESTIONS['income_stability'], INCOME_RISK_MODIFIER, 0)[codes['income_stability']]
+    )
+    caps = _lookup(WIZARD_QUESTIONS['risk_tolerance'], RISK_TOLERANCE_HARD_CAPS, DEFAULT_HARD_CAP)[codes['risk_tolerance']]
+
+    n = len(adjustment)
+    base = base_table[codes['time_horizon']]
+    valid = base > 0
+    adjusted = np.clip(base + adjustment[:, None], MIN_RISK, MAX_RISK)
+
+    masks = np.zeros((n, LEVERAGE_RISK + 1), dtype=bool)
+    rows = np.broadcast_to(np.arange(n)[:, None], adjusted.shape)
+    masks[rows[valid], adjusted[valid]] = True
+
+    # ⚠️ HARD LIMITS: nessun livello oltre il cap della tolleranza
+    levels = np.arange(LEVERAGE_RISK + 1)
+    masks &= levels[None, :] <= caps[:, None]
+
+    # Fallback: il massimo consentito e quello sotto
+    empty = ~masks.any(axis=1)
+    if empty.any():
+        empty_rows = np.flatnonzero(empty)
+        masks[empty_rows, caps[empty_rows]] = True
+        masks[empty_rows, np.maximum(MIN_RISK, caps[empty_rows] - 1)] = True
+
+    # Rischio ideale: il valore centrale dei livelli raccomandati ordinati
+    counts = masks.sum(axis=1)
+    position = np.cumsum(masks, axis=1)
+    ideal = np.argmax(masks & (position == (counts // 2 + 1)[:, None]), axis=1)
+
+    return masks, ideal
+
+
+def _score_chunk(codes, columns):
+    """Punteggi (clienti × portafogli) per un blocco di questionari già codificati"""
+    masks, ideal = _risk_masks(codes)
+
+    experience = codes['experience']
+    complexity = codes['complexity']
+    esg_answer = codes['esg_preference']
+    goal = codes['investment_goal']
+
+    experience_options = WIZARD_QUESTIONS['experience']
+    complexity_options = WIZARD_QUESTIONS['complexity']
+    esg_options = WIZARD_QUESTIONS['esg_preference']
+    goal_options = WIZARD_QUESTIONS['investment_goal']
+
+    single_only = (_flags(complexity_options, (SET_AND_FORGET,))[complexity] |
+                   _flags(experience_options, (BEGINNER,))[experience])
+    prefer_single = _flags(complexity_options, LOW_MAINTENANCE)[complexity]
+    moderate = _flags(complexity_options, (MODERATE_MAINTENANCE,))[complexity]
+    esg_only = _flags(esg_options, (ESG_ONLY_ANSWER,))[esg_answer]
+    prefer_esg = _flags(esg_options, (ESG_BONUS_ANSWER,))[esg_answer]
+    goal_preservation = _flags(goal_options, (GOAL_PRESERVATION,))[goal]
+    goal_growth = _flags(goal_options, (GOAL_GROWTH,))[goal]
+
+    # Orizzonte dell'utente [da, a]: compatibile se si sovrappone a quello del portafoglio
+    horizon_options = WIZARD_QUESTIONS['time_horizon']
+    horizon_low = _lookup(horizon_options, {o: y[0] for o, y in HORIZON_YEARS.items()},
+                          DEFAULT_HORIZON_YEARS[0], dtype=float)[codes['time_horizon']]
+    horizon_high = _lookup(horizon_options, {o: y[1] for o, y in HORIZON_YEARS.items()},
+                           DEFAULT_HORIZON_YEARS[1], dtype=float)[codes['time_horizon']]
+
+    max_etfs = _lookup(experience_options, MAX_COMPONENTS, DEFAULT_MAX_COMPONENTS)[experience]
+    max_etfs = max_etfs + ACTIVE_MANAGEMENT_EXTRA_ETFS * (
+        ~single_only & _flags(complexity_options, ACTIVE_MANAGEMENT)[complexity])
+
+    risk = columns['risk']
+    esg = columns['esg'][None, :]
+    is_single = columns['is_single'][None, :]
+
+    # Filtri
+    eligible = (
+        (risk != LEVERAGE_RISK)[None, :] &
+        (columns['min_years'][None, :] <= horizon_high[:, None]) &
+        (columns['max_years'][None, :] >= horizon_low[:, None]) &
+        masks[:, risk] &
+        (~esg_only[:, None] | esg) &
+        (columns['n_components'][None, :] <= max_etfs[:, None]) &
+        (~single_only[:, None] | is_single)
+    )
+
+    # Punteggio
+    w = SCORE_WEIGHTS
+    scores = (
+        w['prefer_single'] * (prefer_single[:, None] & is_single) +
+        w['prefer_esg'] * (prefer_esg[:, None] & esg) +
+        w['esg_only'] * (esg_only[:, None] & esg) +
+        w['no_rebalance'] * (prefer_single[:, None] & columns['no_rebalance'][None, :]) +
+        w['easy_rebalance'] * (moderate[:, None] & columns['easy_rebalance'][None, :]) +
+        w['unwanted_single'] * (~prefer_single[:, None] & ~single_only[:, None] & is_single) +
+        w['goal_match'] * (goal_preservation[:, None] & (risk <= 3)[None, :]) +
+        w['goal_match'] * (goal_growth[:, None] & (risk >= 5)[None, :]) +
+        w['risk_distance'] * np.abs(risk[None, :] - ideal[:, None])
+    ).astype(np.int32)
+    scores[~eligible] = _EXCLUDED
+
+    # Ordinamento stabile: a parità di punteggio vale l'ordine del catalogo, come nel wizard
+    order = np.argsort(-scores.astype(np.int64), axis=1, kind='stable')[:, :TOP_N]
+    top_valid = np.take_along_axis(eligible, order, axis=1)
+
+    return order, top_valid, masks, single_only, esg_only, max_etfs
+
+
+def score_codes(codes, portfolios, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Raccomandazioni per risposte già codificate (un array di codici per domanda).
+    Restituisce (top, valid, risk_masks, single_only, esg_only, max_etfs) dove `top` contiene
+    gli indici dei portafogli nell'ordine di iter_portfolios(portfolios)
+    """
+    columns = portfolio_columns(portfolios)
+    n = len(next(iter(codes.values())))
+    width = min(TOP_N, len(columns['ids']))
+
+    top = np.zeros((n, width), dtype=np.int64)
+    valid = np.zeros((n, width), dtype=bool)
+    risk_masks = np.zeros((n, LEVERAGE_RISK + 1), dtype=bool)
+    single_only = np.zeros(n, dtype=bool)
+    esg_only = np.zeros(n, dtype=bool)
+    max_etfs = np.zeros(n, dtype=np.int32)
+
+    for start in range(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        chunk = {q: c[start:stop] for q, c in codes.items()}
+        (top[start:stop], valid[start:stop], risk_masks[start:stop], single_only[start:stop],
+         esg_only[start:stop], max_etfs[start:stop]) = _score_chunk(chunk, columns)
+
+    return top, valid, risk_masks, single_only, esg_only, max_etfs
+
+
+def score_profiles(answers, portfolios, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Raccomandazioni codificate per una tabella di questionari (vedi score_codes)"""
+    if not isinstance(answers, pd.DataFrame):
+        answers = pd.DataFrame(list(answers), columns=list(WIZARD_QUESTIONS))
+    return score_codes(encode_answers(answers), portfolios, chunk_size)
+
+
+def calculate_recommendations_batch(answers, portfolios, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Calcola le raccomandazioni per molti clienti in una volta.
+    `answers` è un DataFrame (o una lista di dict) con una colonna per ogni parametro di
+    calculate_recommendations; il risultato ha una riga per cliente con gli ID dei top 3,
+    i livelli di rischio suggeriti e i criteri derivati
+    """
+    if not isinstance(answers, pd.DataFrame):
+        answers = pd.DataFrame(list(answers), columns=list(WIZARD_QUESTIONS))
+
+    top, valid, risk_masks, single_only, esg_only, max_etfs = score_profiles(answers, portfolios, chunk_size)
+    ids = portfolio_columns(portfolios)['ids']
+
+    result = pd.DataFrame(index=answers.index)
+    for rank in range(TOP_N):
+        column = np.full(len(answers), None, dtype=object)
+        if rank < top.shape[1]:
+            column[valid[:, rank]] = ids[top[valid[:, rank], rank]]
+        result[f'portfolio_{rank + 1}'] = pd.Series(column, index=answers.index, dtype=object)
+
+    levels = np.arange(LEVERAGE_RISK + 1)
+    result['recommended_risks'] = [levels[mask].tolist() for mask in risk_masks]
+    result['single_only'] = single_only
+    result['esg_only'] = esg_only
+    result['max_etfs'] = max_etfs
+    return result
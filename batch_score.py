@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Scoring Batch dei Questionari da Riga di Comando
+Legge i questionari da CSV o JSONL in streaming, li valuta a blocchi in un pool di processi
+e scrive i risultati in modo incrementale, nello stesso ordine dell'input
+
+Uso:
+    python batch_score.py clienti.csv risultati.csv --workers 8 --chunk-size 5000
+    python batch_score.py clienti.csv risultati.csv --synthetic 24000   # catalogo sintetico
+"""
+
+import argparse
+import csv
+import io
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from batch_engine import RESULT_COLUMNS, calculate_recommendations_batch
+from catalog import get_catalog
+from engine import TOP_N, WIZARD_QUESTIONS
+from synthetic_catalog import (
+    DEFAULT_SEED, generate_catalog, install_synthetic_catalog, synthetic_version, use_catalog
+)
+
+DEFAULT_CHUNK_SIZE = 5_000
+
+
+def detect_format(path, explicit=None):
+    """Formato del file dall'opzione esplicita o dall'estensione"""
+    if explicit:
+        return explicit
+    return 'jsonl' if path.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def read_records(stream, fmt):
+    """
+    Itera i record grezzi uno alla volta, senza caricare il file in memoria.
+    Restituisce (colonne di input, iteratore dei record): liste di campi per il CSV,
+    righe di testo per il JSONL (decodificate poi nei worker)
+    """
+    if fmt == 'csv':
+        reader = csv.reader(stream)
+        header = next(reader, None)
+        if header is None:
+            return [], iter(())
+        return header, reader
+
+    lines = (line for line in stream if line.strip())
+    first = next(lines, None)
+    if first is None:
+        return [], iter(())
+    # Le colonne di input si ricavano dal primo record
+    return list(json.loads(first)), itertools.chain([first], lines)
+
+
+def iter_chunks(records, chunk_size):
+    """Raggruppa i record in blocchi di dimensione fissa"""
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _passthrough(input_fields):
+    """Colonne di input copiate nell'output (quelle dei risultati vengono ricalcolate)"""
+    return [f for f in input_fields if f not in RESULT_COLUMNS]
+
+
+def _blank_missing(values):
+    """Sostituisce None/NaN (campi assenti nei record JSONL) con stringhe vuote"""
+    return ['' if v is None or v != v else v for v in values]
+
+
+def score_chunk(records, input_format, input_fields, output_format):
+    """
+    Valuta un blocco di record grezzi e restituisce il testo di output già formattato
+    (eseguito nei processi worker: al processo principale restano solo lettura e scrittura)
+    """
+    if input_format == 'csv':
+        frame = pd.DataFrame(records, columns=input_fields)
+    else:
+        frame = pd.DataFrame.from_records([json.loads(line) for line in records])
+
+    answers = frame.reindex(columns=list(WIZARD_QUESTIONS))
+    results = calculate_recommendations_batch(answers, get_catalog())
+
+    if output_format == 'csv':
+        columns = [_blank_missing(frame[f].tolist()) if f in frame else [''] * len(frame)
+                   for f in _passthrough(input_fields)]
+        columns += [results[f'portfolio_{rank}'].fillna('').tolist() for rank in range(1, TOP_N + 1)]
+        columns.append([';'.join(map(str, risks)) for risks in results['recommended_risks']])
+        columns += [results[f].tolist() for f in ('single_only', 'esg_only', 'max_etfs')]
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator='\n').writerows(zip(*columns))
+        return buffer.getvalue()
+
+    lines = []
+    for row, result in zip(frame.to_dict('records'), results.to_dict('records')):
+        row.update(result)
+        row['single_only'] = bool(row['single_only'])
+        row['esg_only'] = bool(row['esg_only'])
+        row['max_etfs'] = int(row['max_etfs'])
+        lines.append(json.dumps(row, ensure_ascii=False))
+    return '\n'.join(lines) + '\n'
+
+
+def run(input_stream, output_stream, input_format, output_format, chunk_size=DEFAULT_CHUNK_SIZE,
+        workers=None, progress=None, synthetic=None):
+    """
+    Esegue lo scoring in streaming. Al massimo 2 blocchi per worker sono in memoria
+    contemporaneamente; i risultati vengono scritti in ordine di input.
+    Con `synthetic` = (portafogli, seed) si usa un catalogo sintetico al posto di quello reale.
+    Restituisce (righe elaborate, secondi impiegati)
+    """
+    if synthetic is None:
+        return _run(input_stream, output_stream, input_format, output_format, chunk_size, workers, progress)
+    with use_catalog(generate_catalog(*synthetic), synthetic_version(*synthetic)):
+        return _run(input_stream, output_stream, input_format, output_format, chunk_size, workers, progress,
+                    synthetic)
+
+
+def _run(input_stream, output_stream, input_format, output_format, chunk_size, workers, progress,
+         synthetic=None):
+    workers = workers or os.cpu_count() or 1
+    input_fields, records = read_records(input_stream, input_format)
+    missing = [q for q in WIZARD_QUESTIONS if q not in input_fields]
+    if input_fields and missing:
+        raise ValueError(f"Colonne mancanti nell'input: {', '.join(missing)}")
+
+    if output_format == 'csv' and input_fields:
+        csv.writer(output_stream, lineterminator='\n').writerow(_passthrough(input_fields) + list(RESULT_COLUMNS))
+
+    start = time.perf_counter()
+    total = 0
+
+    def write(text, n_rows):
+        nonlocal total
+        output_stream.write(text)
+        total += n_rows
+        if progress:
+            elapsed = time.perf_counter() - start
+            progress(f"📊 {total:,} righe elaborate - {total / max(elapsed, 1e-9):,.0f} righe/s")
+
+    chunks = iter_chunks(records, chunk_size)
+
+    if workers == 1:
+        for chunk in chunks:
+            write(score_chunk(chunk, input_format, input_fields, output_format), len(chunk))
+        return total, time.perf_counter() - start
+
+    max_pending = workers * 2
+    # Ogni worker genera lo stesso catalogo sintetico (deterministico dato il seed)
+    initializer, initargs = (install_synthetic_catalog, synthetic) if synthetic else (None, ())
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append((pool.submit(score_chunk, chunk, input_format, input_fields, output_format), len(chunk)))
+            # Finestra limitata: si attende il blocco più vecchio prima di leggerne altri
+            while len(pending) >= max_pending:
+                future, n_rows = pending.popleft()
+                write(future.result(), n_rows)
+        while pending:
+            future, n_rows = pending.popleft()
+            write(future.result(), n_rows)
+
+    return total, time.perf_counter() - start
+
+
+def parse_args(argv=None):
+    """Argomenti da riga di comando"""
+    parser = argparse.ArgumentParser(description="Scoring batch dei questionari del wizard")
+    parser.add_argument('input', help="File dei questionari (CSV o JSONL, '-' per stdin)")
+    parser.add_argument('output', help="File dei risultati (CSV o JSONL, '-' per stdout)")
+    parser.add_argument('--input-format', choices=['csv', 'jsonl'], help="Formato di input (default: da estensione)")
+    parser.add_argument('--output-format', choices=['csv', 'jsonl'], help="Formato di output (default: da estensione)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Righe per blocco")
+    parser.add_argument('--workers', type=int, default=None, help="Processi worker (default: numero di CPU)")
+    parser.add_argument('--synthetic', type=int, default=None, metavar='N',
+                        help="Usa un catalogo sintetico di N portafogli al posto di quello reale")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Seed del catalogo sintetico")
+    parser.add_argument('--quiet', action='store_true', help="Non mostrare l'avanzamento")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Punto di ingresso della CLI"""
+    args = parse_args(argv)
+    input_format = detect_format(args.input, args.input_format)
+    output_format = detect_format(args.output, args.output_format)
+
+    def progress(message):
+        print(message, file=sys.stderr, flush=True)
+
+    input_stream = sys.stdin if args.input == '-' else open(args.input, newline='', encoding='utf-8')
+    output_stream = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    try:
+        total, elapsed = run(input_stream, output_stream, input_format, output_format,
+                             chunk_size=args.chunk_size, workers=args.workers,
+                             progress=None if args.quiet else progress,
+                             synthetic=(args.synthetic, args.seed) if args.synthetic else None)
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output_stream is not sys.stdout:
+            output_stream.close()
+
+    print(f"✅ {total:,} questionari in {elapsed:.2f}s ({total / max(elapsed, 1e-9):,.0f} righe/s)",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Benchmark di Scoring, Filtri, Statistiche e Rendering
+Misura calculate_recommendations, filter_portfolios, get_statistics e le riesecuzioni
+complete della pagina (AppTest headless) sul catalogo reale e su cataloghi sintetici
+di 1k/10k/100k portafogli, e confronta i tempi con quelli di riferimento salvati:
+il comando termina con errore se un benchmark supera la soglia di regressione.
+Ogni esecuzione misura anche un carico di riferimento fisso (MACHINE_REFERENCE): i tempi
+sono confrontati in proporzione a quello, così una macchina più lenta nel suo insieme
+non produce regressioni
+
+Uso:
+    python benchmark.py                        # confronto con benchmark_baseline.json
+    python benchmark.py --update-baseline      # salva i tempi correnti come riferimento
+    python benchmark.py --sizes 1000 --no-render
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+from dataclasses import dataclass
+
+import catalog
+import portfolios_data
+from engine import WIZARD_QUESTIONS, calculate_recommendations, filter_portfolios
+from filter_index import get_filter_index
+from horizon_index import get_horizon_index
+from synthetic_catalog import generate_catalog, synthetic_version, use_catalog
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, 'app.py')
+BASELINE_PATH = os.path.join(APP_DIR, 'benchmark_baseline.json')
+
+SIZES = (1_000, 10_000, 100_000)
+DEFAULT_REPEAT = 5
+DEFAULT_PROFILES = 50
+DEFAULT_SEED = 2024
+
+# Rapporto massimo tra tempo misurato e riferimento prima di segnalare una regressione
+DEFAULT_THRESHOLD = 1.25
+
+# Durata minima di ogni misura: le funzioni più rapide vengono eseguite in un ciclo
+# di più chiamate fino a superarla, e il tempo riportato è la media per chiamata
+MIN_SECONDS = 0.02
+
+# Chiamate massime per misura (funzioni quasi istantanee)
+MAX_LOOPS = 10_000
+
+# Carico fisso in Python puro che misura la velocità della macchina, salvato con gli altri tempi
+MACHINE_REFERENCE = 'machine_reference'
+
+# Viste renderizzate: etichetta della modalità principale e della visualizzazione
+RENDER_VIEWS = {
+    'wizard': ("🎯 Guidami alla Scelta (Consigliato)", None),
+    'by_risk': ("🔍 Esplora Liberamente", "📊 Per Livello di Rischio"),
+    'all_portfolios': ("🔍 Esplora Liberamente", "🔍 Tutti i Portafogli"),
+}
+RENDER_TIMEOUT = 300
+
+
+@dataclass(frozen=True)
+class BenchmarkResult:
+    """Tempo di un benchmark e confronto con il riferimento"""
+    __slots__ = ('name', 'seconds', 'baseline', 'ratio', 'regression')
+
+    name: str
+    seconds: float
+    baseline: float                    # NaN se il benchmark non ha un riferimento
+    ratio: float
+    regression: bool
+
+
+def size_label(n_portfolios):
+    """Etichetta compatta di un catalogo sintetico (1k, 10k, 100k)"""
+    if n_portfolios % 1000 == 0:
+        return f"{n_portfolios // 1000}k"
+    return str(n_portfolios)
+
+
+def answer_profiles(n_profiles=DEFAULT_PROFILES, seed=DEFAULT_SEED):
+    """Questionari casuali ma riproducibili (una tupla di risposte nell'ordine di WIZARD_QUESTIONS)"""
+    rng = random.Random(seed)
+    return [tuple(rng.choice(options) for options in WIZARD_QUESTIONS.values()) for _ in range(n_profiles)]
+
+
+def time_call(function, repeat=DEFAULT_REPEAT, setup=None, loops=None):
+    """
+    Tempo per chiamata: minimo su `repeat` misure (il meno disturbato dal resto del sistema),
+    ognuna media di `loops` chiamate. Se `loops` non è indicato lo si ricava da una chiamata
+    di prova perché ogni misura duri almeno MIN_SECONDS, così anche le funzioni sotto il
+    millisecondo hanno tempi confrontabili. `setup`, se indicato, viene eseguito fuori misura
+    prima di ogni chiamata
+    """
+    def timed_call():
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        function()
+        return time.perf_counter() - started
+
+    if loops is None:
+        trial = timed_call()
+        loops = min(MAX_LOOPS, max(1, math.ceil(MIN_SECONDS / max(trial, 1e-9))))
+
+    best = float('inf')
+    for _ in range(repeat):
+        best = min(best, sum(timed_call() for _ in range(loops)) / loops)
+    return best
+
+
+def machine_reference(repeat=DEFAULT_REPEAT):
+    """Tempo di un carico fisso (ordinamenti, dizionari e operazioni su interi grandi)"""
+    def workload():
+        rng = random.Random(0)
+        values = [rng.random() for _ in range(100_000)]
+        sorted(values)
+        counts = {}
+        for value in values:
+            key = int(value * 1000)
+            counts[key] = counts.get(key, 0) + 1
+        mask = 0
+        for position in range(0, 200_000, 3):
+            mask |= 1 << position
+        bin(mask).count('1')
+
+    return time_call(workload, repeat, loops=1)
+
+
+def benchmark_functions(compiled, repeat=DEFAULT_REPEAT, profiles=None):
+    """
+    Tempi di scoring, filtri e statistiche sul catalogo attivo. I risultati memorizzati
+    negli indici vengono svuotati prima di ogni ripetizione: si misura il calcolo, non la cache
+    """
+    if profiles is None:
+        profiles = answer_profiles()
+    all_risks = sorted({p.risk_level for section in compiled.values() for p in section})
+
+    def clear_caches():
+        get_filter_index(compiled).clear_cache()
+        get_horizon_index(compiled).clear_cache()
+
+    def score():
+        for answers in profiles:
+            calculate_recommendations(compiled, *answers)
+
+    def filter_all():
+        filter_portfolios(compiled, all_risks, False, False)
+        filter_portfolios(compiled, all_risks[:3], True, False)
+        filter_portfolios(compiled, all_risks, False, True)
+
+    def statistics():
+        # Le statistiche sono precalcolate con gli indici: si misura anche la loro costruzione
+        portfolios_data.rebuild_indexes()
+        portfolios_data.get_statistics()
+
+    return {
+        'calculate_recommendations': time_call(score, repeat, clear_caches),
+        'filter_portfolios': time_call(filter_all, repeat, clear_caches),
+        'get_statistics': time_call(statistics, repeat),
+    }
+
+
+def benchmark_renders(repeat=DEFAULT_REPEAT, views=RENDER_VIEWS):
+    """Tempo di una riesecuzione completa della pagina per ogni vista, a cache già calde"""
+    from streamlit.testing.v1 import AppTest
+
+    timings = {}
+    for name, (main_mode, view_type) in views.items():
+        app = AppTest.from_file(APP_PATH, default_timeout=RENDER_TIMEOUT).run()
+        app.sidebar.radio[0].set_value(main_mode).run()
+        if view_type is not None:
+            app.sidebar.radio[1].set_value(view_type).run()
+        if app.exception:
+            raise RuntimeError(f"Vista {name}: {app.exception[0].value}")
+        timings[f'render_{name}'] = time_call(app.run, repeat, loops=1)
+    return timings
+
+
+def run_benchmarks(sizes=SIZES, repeat=DEFAULT_REPEAT, render=True, seed=DEFAULT_SEED, progress=None):
+    """Tutti i benchmark: nome 'funzione[catalogo]' -> secondi"""
+    catalogs = [('reale', portfolios_data.get_all_portfolios(), catalog.CATALOG_VERSION)]
+    catalogs += [(size_label(n), generate_catalog(n, seed), synthetic_version(n, seed)) for n in sizes]
+
+    results = {MACHINE_REFERENCE: machine_reference(repeat)}
+    if progress:
+        progress(f"{MACHINE_REFERENCE}: {results[MACHINE_REFERENCE] * 1000:.2f} ms")
+    for label, raw_sections, version in catalogs:
+        with use_catalog(raw_sections, version) as compiled:
+            timings = benchmark_functions(compiled, repeat)
+            if render:
+                timings.update(benchmark_renders(repeat))
+        for name, seconds in timings.items():
+            results[f'{name}[{label}]'] = seconds
+            if progress:
+                progress(f"{name}[{label}]: {seconds * 1000:.2f} ms")
+    return results
+
+
+def read_baseline(path=BASELINE_PATH):
+    """Tempi di riferimento salvati ({} se il file non esiste)"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['results']
+
+
+def write_baseline(results, path=BASELINE_PATH):
+    """Salva i tempi correnti come riferimento, con la macchina su cui sono stati misurati"""
+    payload = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        # Cifre significative, non decimali fissi: i benchmark più rapidi durano pochi microsecondi
+        'results': {name: float(f'{seconds:.4g}') for name, seconds in sorted(results.items())},
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def machine_scale(results, baseline):
+    """Velocità relativa della macchina corrente rispetto a quella del riferimento (1 se non misurata)"""
+    if MACHINE_REFERENCE in results and MACHINE_REFERENCE in baseline:
+        return results[MACHINE_REFERENCE] / baseline[MACHINE_REFERENCE]
+    return 1.0
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Confronto con il riferimento: regressione se il rapporto, corretto per la velocità
+    della macchina (machine_scale), supera la soglia. Nessun tempo viene arrotondato a una
+    durata minima: i benchmark rapidi sono già mediati su almeno MIN_SECONDS (time_call)
+    """
+    scale = machine_scale(results, baseline)
+    compared = []
+    for name, seconds in results.items():
+        reference = baseline.get(name, float('nan'))
+        known = name in baseline and name != MACHINE_REFERENCE and reference > 0
+        ratio = seconds / (reference * scale) if known else float('nan')
+        compared.append(BenchmarkResult(
+            name=name,
+            seconds=seconds,
+            baseline=reference,
+            ratio=ratio,
+            regression=known and ratio > threshold,
+        ))
+    return compared
+
+
+def parse_args(argv=None):
+    """Argomenti da riga di comando"""
+    parser = argparse.ArgumentParser(description="Benchmark di scoring, filtri, statistiche e rendering")
+    parser.add_argument('--sizes', type=int, nargs='*', default=list(SIZES),
+                        help="Dimensioni dei cataloghi sintetici")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Ripetizioni per benchmark")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Seed dei cataloghi sintetici")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Rapporto massimo rispetto al riferimento")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="File dei tempi di riferimento")
+    parser.add_argument('--update-baseline', action='store_true', help="Salva i tempi come nuovo riferimento")
+    parser.add_argument('--no-render', action='store_true', help="Salta i rendering con AppTest")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Esegue i benchmark e segnala le regressioni"""
+    args = parse_args(argv)
+
+    def progress(message):
+        print(message, file=sys.stderr, flush=True)
+
+    results = run_benchmarks(args.sizes, args.repeat, render=not args.no_render, seed=args.seed, progress=progress)
+    if args.update_baseline:
+        write_baseline(results, args.baseline)
+        print(f"✅ Riferimento aggiornato: {args.baseline} ({len(results)} benchmark)")
+        return 0
+
+    baseline = read_baseline(args.baseline)
+    compared = compare(results, baseline, args.threshold)
+    print(f"Velocità relativa della macchina: {machine_scale(results, baseline):.2f}x il riferimento")
+    for result in compared:
+        if result.name == MACHINE_REFERENCE:
+            continue
+        if result.ratio != result.ratio:
+            status = "nuovo"
+        else:
+            status = f"{result.ratio:5.2f}x" + (" ❌ REGRESSIONE" if result.regression else "")
+        print(f"{result.name:45} {result.seconds * 1000:10.2f} ms  {status}")
+
+    regressions = [result for result in compared if result.regression]
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark oltre la soglia di {args.threshold:.2f}x")
+        return 1
+    print(f"\n✅ Nessuna regressione oltre {args.threshold:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Calibrazione Empirica dei Livelli di Rischio
+Confronta volatilità e massimo drawdown storici di ogni portafoglio con le fasce
+della sua categoria di rischio e segnala i livelli dichiarati che non trovano riscontro nei dati.
+La volatilità viene dalla covarianza condivisa dell'archivio (covariance.py), calcolata
+con un solo prodotto matriciale per tutto il catalogo; il drawdown con un backtest per
+ogni gruppo di portafogli quotati nello stesso periodo.
+Il report viene salvato per versione di catalogo e archivio prezzi; ad ogni aggiornamento
+dei prezzi si ricalcolano solo i portafogli con ISIN modificati
+
+Uso:
+    python calibration.py
+"""
+
+import glob
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from backtest import TRADING_DAYS, run_backtest
+import catalog
+from catalog import get_catalog, iter_portfolios, target_weights
+from covariance import get_covariance, portfolio_volatilities
+from engine import RISK_CATEGORY_BANDS, get_risk_category
+from price_store import PRICE_DIR, open_store
+
+# Directory dei report salvati (la stessa cache della tabella delle risposte)
+CALIBRATION_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+CALIBRATION_PREFIX = 'calibration_'
+
+# Storico minimo per una stima affidabile (un anno di borsa)
+MIN_HISTORY_DAYS = TRADING_DAYS
+
+STATUS_BELOW = 'sotto'
+STATUS_OK = 'in linea'
+STATUS_ABOVE = 'sopra'
+STATUS_MISSING = 'dati insufficienti'
+
+COLUMNS = ('risk_level', 'category', 'start', 'end', 'volatility', 'max_drawdown',
+           'volatility_status', 'drawdown_status', 'flagged', 'data_version')
+
+
+def band_status(value, band):
+    """Posizione di un valore rispetto a una fascia (low, high)"""
+    if np.isnan(value):
+        return STATUS_MISSING
+    low, high = band
+    if value < low:
+        return STATUS_BELOW
+    if value > high:
+        return STATUS_ABOVE
+    return STATUS_OK
+
+
+def listing_spans(store, isins):
+    """
+    Prima e ultima posizione con prezzo di ogni ISIN nell'indice delle date dell'archivio;
+    None se la serie manca o è vuota
+    """
+    spans = {}
+    for isin in isins:
+        valid = np.flatnonzero(~np.isnan(store.column(isin))) if isin in store else ()
+        spans[isin] = (int(valid[0]), int(valid[-1])) if len(valid) else None
+    return spans
+
+
+def portfolio_window(portfolio, spans):
+    """
+    Posizioni (prima, ultima) del periodo in cui tutti i componenti sono quotati,
+    None se manca la serie di un componente
+    """
+    components = [spans[isin] for isin in target_weights(portfolio)]
+    if any(span is None for span in components):
+        return None
+    return max(first for first, _ in components), min(last for _, last in components)
+
+
+def report_row(store, portfolio, volatility=np.nan, max_drawdown=np.nan, start='', end=''):
+    """Riga del report di un portafoglio a partire dalle metriche storiche (NaN se mancano i dati)"""
+    category = get_risk_category(portfolio.risk_level)
+    bands = RISK_CATEGORY_BANDS[category]
+    volatility_status = band_status(volatility, bands['volatility'])
+    drawdown_status = band_status(-max_drawdown, bands['drawdown'])
+    return {
+        'risk_level': portfolio.risk_level,
+        'category': category,
+        'start': start,
+        'end': end,
+        'volatility': volatility,
+        'max_drawdown': max_drawdown,
+        'volatility_status': volatility_status,
+        'drawdown_status': drawdown_status,
+        'flagged': STATUS_BELOW in (volatility_status, drawdown_status)
+                   or STATUS_ABOVE in (volatility_status, drawdown_status),
+        'data_version': store.data_version(target_weights(portfolio)),
+    }
+
+
+def calibrate_window(store, window, portfolios, volatilities):
+    """
+    Righe del report per i portafogli che condividono lo stesso periodo di quotazione:
+    un solo backtest per tutto il gruppo, sui prezzi con i giorni di chiusura di singole
+    borse riempiti con l'ultimo prezzo. La volatilità arriva dalla covarianza condivisa
+    """
+    first, last = window
+    start, end = store.dates[first], store.dates[last]
+    isins = sorted({isin for portfolio in portfolios for isin in target_weights(portfolio)})
+    prices = store.frame(isins, start, end).astype(np.float64).ffill()
+    drawdowns = run_backtest(prices, {'calibration': portfolios}).metrics['max_drawdown']
+    return {
+        portfolio.id: report_row(store, portfolio, volatilities[portfolio.id],
+                                 float(drawdowns.get(portfolio.id, np.nan)), str(start), str(end))
+        for portfolio in portfolios
+    }
+
+
+def calibrate(store, portfolios=None, previous=None):
+    """
+    Report di calibrazione per tutto il catalogo. Le righe di un report `previous`
+    (stessa versione del catalogo) vengono riutilizzate per i portafogli i cui ISIN
+    non sono cambiati nell'archivio; la covarianza tra due ISIN dipende solo dalle loro serie,
+    quindi anche le volatilità riutilizzate restano valide. Gli altri portafogli vengono
+    raggruppati per periodo di quotazione comune, con un backtest per gruppo
+    """
+    if portfolios is None:
+        portfolios = get_catalog()
+    flat = iter_portfolios(portfolios)
+
+    rows, stale = {}, []
+    for portfolio in flat:
+        data_version = store.data_version(target_weights(portfolio))
+        if previous is not None and portfolio.id in previous.index \
+                and previous.at[portfolio.id, 'data_version'] == data_version:
+            rows[portfolio.id] = previous.loc[portfolio.id, list(COLUMNS)].to_dict()
+        else:
+            stale.append(portfolio)
+
+    if stale:
+        volatilities = portfolio_volatilities(get_covariance(store.root), {'calibration': stale})
+        spans = listing_spans(store, {isin for portfolio in stale for isin in target_weights(portfolio)})
+        windows = {}
+        for portfolio in stale:
+            window = portfolio_window(portfolio, spans)
+            if window is None or window[1] - window[0] + 1 < MIN_HISTORY_DAYS:
+                rows[portfolio.id] = report_row(store, portfolio)
+            else:
+                windows.setdefault(window, []).append(portfolio)
+        for window, group in windows.items():
+            rows.update(calibrate_window(store, window, group, volatilities))
+
+    ids = [portfolio.id for portfolio in flat]
+    return pd.DataFrame([rows[pid] for pid in ids], index=pd.Index(ids, name='id'), columns=list(COLUMNS))
+
+
+def _read_report(path):
+    return pd.read_csv(path, index_col='id', dtype={'data_version': str, 'start': str, 'end': str},
+                       keep_default_na=False, na_values={'volatility': [''], 'max_drawdown': ['']})
+
+
+def get_calibration(root=PRICE_DIR, table_dir=CALIBRATION_DIR):
+    """
+    Report per la versione corrente di catalogo e archivio prezzi: letto dal disco se presente,
+    altrimenti ricalcolato a partire dal report precedente. None se non esiste un archivio prezzi
+    """
+    store = open_store(root)
+    if store is None:
+        return None
+
+    prefix = os.path.join(table_dir, f'{CALIBRATION_PREFIX}{catalog.CATALOG_VERSION}_')
+    path = f'{prefix}{store.version}.csv'
+    if os.path.exists(path):
+        return _read_report(path)
+
+    existing = sorted(glob.glob(f'{prefix}*.csv'), key=os.path.getmtime)
+    previous = _read_report(existing[-1]) if existing else None
+    report = calibrate(store, previous=previous)
+
+    try:
+        os.makedirs(table_dir, exist_ok=True)
+        for old in glob.glob(os.path.join(table_dir, f'{CALIBRATION_PREFIX}*.csv')):
+            os.remove(old)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        report.to_csv(tmp_path)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Directory in sola lettura: il report resta solo in memoria
+        pass
+    return report
+
+
+def main():
+    """Esegue la calibrazione e stampa i portafogli fuori fascia"""
+    report = get_calibration()
+    if report is None:
+        print("❌ Archivio prezzi non trovato: importa prima i prezzi con price_import.py", file=sys.stderr)
+        return 1
+
+    for portfolio_id, row in report.iterrows():
+        if row['volatility_status'] == STATUS_MISSING:
+            print(f"⚪ {portfolio_id:8} rischio {row['risk_level']} - {STATUS_MISSING}")
+            continue
+        icon = '⚠️' if row['flagged'] else '✅'
+        print(f"{icon} {portfolio_id:8} rischio {row['risk_level']} ({row['category']}): "
+              f"volatilità {row['volatility']:.1%} ({row['volatility_status']}), "
+              f"max drawdown {row['max_drawdown']:.1%} ({row['drawdown_status']})")
+    print(f"\n{int(report['flagged'].sum())} portafogli su {len(report)} fuori dalla fascia dichiarata")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
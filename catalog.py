@@ -0,0 +1,238 @@
+"""
+Catalogo Compilato dei Portafogli
+Converte i dizionari di portfolios_data in oggetti immutabili con campi numerici,
+validati una sola volta all'import del modulo
+"""
+
+import hashlib
+import math
+import re
+import warnings
+from dataclasses import dataclass
+from typing import Tuple
+
+from portfolios_data import get_all_portfolios
+
+# Ordine delle sezioni del catalogo (lo stesso di get_all_portfolios)
+SECTIONS = ('multi', 'single', 'esg')
+
+# Codici di ribilanciamento ammessi
+REBALANCE_CODES = ('NO', '1y', '3M')
+
+# Campi obbligatori nei dizionari grezzi
+REQUIRED_FIELDS = ('id', 'name', 'risk_level', 'esg', 'min_duration', 'rebalance',
+                   'strategy_description', 'components')
+REQUIRED_COMPONENT_FIELDS = ('percentage', 'name', 'isin', 'ter')
+
+
+class CatalogWarning(UserWarning):
+    """Anomalia non bloccante nei dati del catalogo (es. allocazioni che non sommano a 100)"""
+
+
+@dataclass(frozen=True)
+class Component:
+    """Singolo ETF di un portafoglio, con peso e TER già numerici"""
+    __slots__ = ('percentage', 'name', 'isin', 'ter')
+
+    percentage: float
+    name: str
+    isin: str
+    ter: float
+
+
+@dataclass(frozen=True)
+class Portfolio:
+    """Portafoglio compilato: campi originali più i valori derivati precalcolati"""
+    __slots__ = ('id', 'section', 'name', 'risk_level', 'esg', 'min_duration', 'min_years', 'max_years',
+                 'rebalance', 'strategy_description', 'components', 'note',
+                 'weighted_ter', 'n_components', 'is_single', 'alternatives')
+
+    id: str
+    section: str
+    name: str
+    risk_level: int
+    esg: int
+    min_duration: str                  # Etichetta originale, usata solo per la visualizzazione
+    min_years: int                     # Estremo inferiore dell'orizzonte in anni
+    max_years: float                   # Estremo superiore (math.inf se l'orizzonte è aperto)
+    rebalance: str
+    strategy_description: str
+    components: Tuple[Component, ...]
+    note: str
+    weighted_ter: float
+    n_components: int
+    is_single: bool
+    alternatives: bool                 # Componenti alternativi: se ne sceglie UNO solo
+
+
+def _parse_number(value, field, portfolio_id):
+    """Converte una stringa numerica del catalogo (accetta anche la virgola decimale)"""
+    try:
+        number = float(str(value).strip().replace(',', '.'))
+    except ValueError:
+        raise ValueError(f"Portafoglio {portfolio_id}: valore '{value}' non valido per '{field}'") from None
+    if number < 0:
+        raise ValueError(f"Portafoglio {portfolio_id}: '{field}' non può essere negativo ({value})")
+    return number
+
+
+# Orizzonte: un numero ('10', aperto verso l'alto), un intervallo aperto ('1..xx')
+# o un intervallo chiuso ('1...9', '3-7')
+_HORIZON_PATTERN = re.compile(r'^\s*(\d+)\s*(?:(?:\.{2,}|-)\s*(\d+|x+)?)?\s*$', re.IGNORECASE)
+
+
+def parse_horizon(min_duration, portfolio_id='?'):
+    """Intervallo di anni [minimo, massimo] da etichette come '10', '1..xx' o '1...9'"""
+    match = _HORIZON_PATTERN.match(str(min_duration))
+    if not match:
+        raise ValueError(f"Portafoglio {portfolio_id}: orizzonte minimo '{min_duration}' non valido")
+    low = int(match.group(1))
+    upper = match.group(2)
+    high = int(upper) if upper and upper.isdigit() else math.inf
+    if high < low:
+        raise ValueError(f"Portafoglio {portfolio_id}: orizzonte '{min_duration}' con estremi invertiti")
+    return low, high
+
+
+def compile_component(raw, portfolio_id):
+    """Compila un componente grezzo in un Component"""
+    missing = [f for f in REQUIRED_COMPONENT_FIELDS if f not in raw]
+    if missing:
+        raise ValueError(f"Portafoglio {portfolio_id}: campi mancanti nel componente: {', '.join(missing)}")
+
+    return Component(
+        percentage=_parse_number(raw['percentage'], 'percentage', portfolio_id),
+        name=raw['name'],
+        isin=raw['isin'].strip().upper(),
+        ter=_parse_number(raw['ter'], 'ter', portfolio_id),
+    )
+
+
+def compile_portfolio(raw, section):
+    """Compila un dizionario di portfolios_data in un Portfolio validato"""
+    portfolio_id = raw.get('id', '?')
+    missing = [f for f in REQUIRED_FIELDS if f not in raw]
+    if missing:
+        raise ValueError(f"Portafoglio {portfolio_id}: campi mancanti: {', '.join(missing)}")
+
+    if raw['risk_level'] not in range(1, 9):
+        raise ValueError(f"Portafoglio {portfolio_id}: livello di rischio {raw['risk_level']} fuori scala (1-8)")
+    if raw['esg'] not in (0, 1):
+        raise ValueError(f"Portafoglio {portfolio_id}: flag ESG {raw['esg']} non valido (0/1)")
+    if raw['rebalance'] not in REBALANCE_CODES:
+        raise ValueError(f"Portafoglio {portfolio_id}: ribilanciamento '{raw['rebalance']}' non riconosciuto")
+    if not raw['components']:
+        raise ValueError(f"Portafoglio {portfolio_id}: nessun componente")
+
+    components = tuple(compile_component(c, portfolio_id) for c in raw['components'])
+    min_years, max_years = parse_horizon(raw['min_duration'], portfolio_id)
+    n_components = len(components)
+    total_weight = sum(c.percentage for c in components)
+
+    # Portafogli "a scelta" (es. bond ladder): ogni componente vale il 100%.
+    # Si considera scelto il primo ETF dell'elenco, come in target_weights
+    alternatives = n_components > 1 and all(c.percentage == 100 for c in components)
+
+    if alternatives:
+        weighted_ter = components[0].ter
+    else:
+        weighted_ter = sum(c.ter * c.percentage / 100 for c in components)
+        if abs(total_weight - 100) > 1e-6:
+            warnings.warn(
+                f"Portafoglio {portfolio_id}: le allocazioni sommano a {total_weight:g}% invece di 100%",
+                CatalogWarning,
+                stacklevel=2,
+            )
+
+    return Portfolio(
+        id=portfolio_id,
+        section=section,
+        name=raw['name'],
+        risk_level=raw['risk_level'],
+        esg=raw['esg'],
+        min_duration=str(raw['min_duration']),
+        min_years=min_years,
+        max_years=max_years,
+        rebalance=raw['rebalance'],
+        strategy_description=raw['strategy_description'],
+        components=components,
+        note=raw.get('note', ''),
+        weighted_ter=weighted_ter,
+        n_components=n_components,
+        is_single=n_components == 1,
+        alternatives=alternatives,
+    )
+
+
+def compile_catalog(raw_sections=None):
+    """Compila tutte le sezioni del catalogo, verificando l'unicità degli ID"""
+    if raw_sections is None:
+        raw_sections = get_all_portfolios()
+
+    compiled = {}
+    seen_ids = set()
+    for section in SECTIONS:
+        portfolios = []
+        for raw in raw_sections.get(section, []):
+            portfolio = compile_portfolio(raw, section)
+            if portfolio.id in seen_ids:
+                raise ValueError(f"ID portafoglio duplicato: {portfolio.id}")
+            seen_ids.add(portfolio.id)
+            portfolios.append(portfolio)
+        compiled[section] = tuple(portfolios)
+    return compiled
+
+
+def catalog_version(raw_sections=None):
+    """Impronta del contenuto del catalogo grezzo: cambia ad ogni modifica dei dati"""
+    if raw_sections is None:
+        raw_sections = get_all_portfolios()
+    payload = repr([(s, raw_sections.get(s, [])) for s in SECTIONS]).encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()[:12]
+
+
+# Compilazione unica all'import
+CATALOG = compile_catalog()
+CATALOG_VERSION = catalog_version()
+_BY_ID = {p.id: p for section in CATALOG.values() for p in section}
+
+
+def get_catalog():
+    """Restituisce il catalogo compilato organizzato per sezione"""
+    return CATALOG
+
+
+def get_portfolio(portfolio_id):
+    """Cerca un portafoglio compilato per ID"""
+    return _BY_ID.get(portfolio_id)
+
+
+def iter_portfolios(catalog=None):
+    """Restituisce tutti i portafogli compilati in ordine di sezione"""
+    if catalog is None:
+        catalog = CATALOG
+    return tuple(p for section in catalog.values() for p in section)
+
+
+def target_weights(portfolio):
+    """
+    Pesi obiettivo del portafoglio come frazioni che sommano a 1, aggregati per ISIN.
+    Per i portafogli a componenti alternativi si considera il primo ETF dell'elenco
+    (lo stesso di cui compile_portfolio riporta il TER)
+    """
+    components = portfolio.components[:1] if portfolio.alternatives else portfolio.components
+    total = sum(c.percentage for c in components)
+    weights = {}
+    for comp in components:
+        weights[comp.isin] = weights.get(comp.isin, 0.0) + comp.percentage / total
+    return weights
+
+
+def isin_universe(catalog=None):
+    """ISIN unici presenti nel catalogo, in ordine di prima apparizione"""
+    return tuple(dict.fromkeys(c.isin for p in iter_portfolios(catalog) for c in p.components))
+
+
+def isin_names(catalog=None):
+    """Nome di ogni ISIN presente nel catalogo"""
+    return {c.isin: c.name for p in iter_portfolios(catalog) for c in p.components}
@@ -0,0 +1,144 @@
+"""
+Covarianza Condivisa tra gli ETF del Catalogo
+Stima una sola volta la matrice di covarianza dei rendimenti giornalieri per tutti gli ISIN
+dell'archivio prezzi e ne ricava la volatilità di ogni portafoglio con un unico prodotto
+matriciale pesi x Σ x pesiᵀ. Il risultato è memorizzato per versione dell'archivio
+"""
+
+import functools
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+from backtest import TRADING_DAYS, weight_matrix
+from catalog import get_catalog, iter_portfolios, target_weights
+from price_store import PRICE_DIR, PriceStore, store_version
+
+# Numero minimo di rendimenti comuni perché una covarianza tra due ETF sia considerata valida
+MIN_OBSERVATIONS = 60
+
+
+@dataclass(frozen=True)
+class CovarianceModel:
+    """Rendimenti medi e covarianza annualizzati sull'universo degli ISIN in archivio"""
+    __slots__ = ('isins', 'mean', 'cov', 'observations', 'shrinkage', 'version')
+
+    isins: Tuple[str, ...]
+    mean: np.ndarray                   # Rendimento logaritmico medio annuo per ISIN
+    cov: np.ndarray                    # Covarianza annua (NaN dove i dati comuni sono insufficienti)
+    observations: np.ndarray           # Rendimenti giornalieri comuni per ogni coppia di ISIN
+    shrinkage: float
+    version: str                       # Versione dell'archivio prezzi da cui è stato stimato
+
+    def correlation(self):
+        """Matrice di correlazione corrispondente"""
+        std = np.sqrt(np.diag(self.cov))
+        return self.cov / np.outer(std, std)
+
+    def subset(self, isins):
+        """Media e covarianza ristrette agli ISIN indicati, nell'ordine dato"""
+        position = {isin: i for i, isin in enumerate(self.isins)}
+        index = [position[isin] for isin in isins]
+        return self.mean[index], self.cov[np.ix_(index, index)]
+
+
+def log_returns(prices):
+    """Rendimenti logaritmici giornalieri (date - 1 x ISIN), NaN dove manca uno dei due prezzi"""
+    prices = np.asarray(prices, dtype=np.float64)
+    return np.diff(np.log(prices), axis=0)
+
+
+def pairwise_covariance(returns):
+    """
+    Covarianza campionaria su coppie di osservazioni complete (come DataFrame.cov),
+    calcolata con prodotti matriciali invece che coppia per coppia.
+    Restituisce (covarianza, numero di osservazioni comuni)
+    """
+    mask = ~np.isnan(returns)
+    values = np.where(mask, returns, 0.0)
+    present = mask.astype(np.float64)
+
+    counts = present.T @ present
+    cross = values.T @ values
+    # sums[i, j] = somma dei rendimenti di i nei giorni in cui è presente anche j
+    sums = values.T @ present
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = (cross - sums * sums.T / counts) / (counts - 1)
+    cov[counts < MIN_OBSERVATIONS] = np.nan
+    return cov, counts.astype(np.int64)
+
+
+def shrink(cov, intensity):
+    """
+    Shrinkage verso la diagonale: riduce le correlazioni campionarie di `intensity` (0-1),
+    lasciando invariate le varianze. Stabilizza la matrice con poche osservazioni comuni
+    """
+    if not 0 <= intensity <= 1:
+        raise ValueError(f"Intensità di shrinkage {intensity} fuori dall'intervallo 0-1")
+    target = np.diag(np.diag(cov))
+    return (1 - intensity) * cov + intensity * target
+
+
+def estimate(store, isins=None, shrinkage=0.0, start=None, end=None):
+    """Stima il modello di covarianza per gli ISIN indicati (default: tutto l'archivio)"""
+    isins = tuple(store.isins if isins is None else isins)
+    prices = np.column_stack([store.column(isin, start, end) for isin in isins]) if isins \
+        else np.empty((0, 0))
+    returns = log_returns(prices)
+
+    cov, counts = pairwise_covariance(returns)
+    if shrinkage:
+        cov = shrink(cov, shrinkage)
+
+    with np.errstate(invalid='ignore'):
+        mean = np.nanmean(returns, axis=0) * TRADING_DAYS if len(returns) else np.full(len(isins), np.nan)
+    return CovarianceModel(
+        isins=isins,
+        mean=mean,
+        cov=cov * TRADING_DAYS,
+        observations=counts,
+        shrinkage=float(shrinkage),
+        version=store.version,
+    )
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_model(root, version, shrinkage):
+    """Una sola stima per archivio, versione e shrinkage, condivisa da tutto il processo"""
+    return estimate(PriceStore.open(root), shrinkage=shrinkage)
+
+
+def get_covariance(root=PRICE_DIR, shrinkage=0.0):
+    """
+    Modello di covarianza per la versione corrente dell'archivio, ricalcolato solo
+    quando l'archivio cambia. None se non esiste ancora un archivio prezzi
+    """
+    version = store_version(root)
+    if version is None:
+        return None
+    return _cached_model(root, version, float(shrinkage))
+
+
+def portfolio_volatilities(model, portfolios=None):
+    """
+    Volatilità annua di ogni portafoglio ai pesi obiettivo, con un unico prodotto batch
+    diag(W Σ Wᵀ). NaN per i portafogli con ISIN senza prezzi o covarianze non stimabili
+    """
+    if portfolios is None:
+        portfolios = get_catalog()
+    flat = iter_portfolios(portfolios)
+    known = set(model.isins)
+    covered = [p for p in flat if known.issuperset(target_weights(p))]
+
+    weights = weight_matrix(covered, model.isins)
+    variances = np.einsum('pi,ij,pj->p', weights, np.nan_to_num(model.cov), weights)
+    # Un portafoglio è stimabile solo se tutte le covarianze tra i suoi ISIN sono valide
+    held = (weights != 0).astype(np.float64)
+    invalid = np.einsum('pi,ij,pj->p', held, np.isnan(model.cov).astype(np.float64), held) > 0
+
+    result = {p.id: np.nan for p in flat}
+    result.update({p.id: float(np.sqrt(v)) if not bad else np.nan
+                   for p, v, bad in zip(covered, variances, invalid)})
+    return result
@@ -0,0 +1,443 @@
+"""
+Motore di Raccomandazione dei Portafogli
+Opzioni del questionario, regole di punteggio, categorie di rischio e accesso al catalogo.
+Non dipende da streamlit né da pandas: è importabile da test, job batch e processi worker
+"""
+
+import math
+
+# Accesso al catalogo compilato, riesportato per chi usa solo il motore
+from catalog import CATALOG_VERSION, get_catalog, get_portfolio, iter_portfolios  # noqa: F401
+from filter_index import get_filter_index
+from horizon_index import get_horizon_index
+
+# ============================================================================
+# OPZIONI DEL QUESTIONARIO (nell'ordine mostrato dal wizard)
+# ============================================================================
+
+AGE_OPTIONS = (
+    "Meno di 30 anni - Inizio carriera",
+    "30-45 anni - Consolidamento professionale",
+    "45-60 anni - Picco carriera, pre-pensione",
+    "Più di 60 anni - Pensione o vicino alla pensione"
+)
+
+HORIZON_OPTIONS = (
+    "Meno di 3 anni - Breve termine",
+    "3-7 anni - Medio termine",
+    "7-10 anni - Medio-lungo termine",
+    "10-15 anni - Lungo termine",
+    "Più di 15 anni - Molto lungo termine"
+)
+
+GOAL_OPTIONS = (
+    "Pensione - Costruire capitale per il futuro",
+    "Grande acquisto - Casa, auto, educazione figli",
+    "Crescita patrimonio - Aumentare il capitale nel tempo",
+    "Preservazione capitale - Proteggere dall'inflazione",
+    "Libertà finanziaria - Rendita passiva"
+)
+
+WEALTH_OPTIONS = (
+    "Tutto o quasi tutto (80-100%)",
+    "Parte maggiore (50-80%)",
+    "Parte significativa (20-50%)",
+    "Parte minore (meno del 20%)"
+)
+
+EXPERIENCE_OPTIONS = (
+    "Principiante - È la mia prima volta con investimenti",
+    "Base - Ho letto e studiato, ma poca pratica",
+    "Intermedio - Ho già investito in ETF o fondi",
+    "Esperto - Investo regolarmente e comprendo i mercati"
+)
+
+TOLERANCE_OPTIONS = (
+    "😰 Venderei immediatamente - Non sopporto le perdite",
+    "😟 Sarei molto preoccupato - Probabilmente venderei",
+    "😐 Sarei preoccupato ma manterrei - Capisco la volatilità",
+    "😊 Lo vedrei come opportunità - Comprerei di più se possibile",
+    "🚀 Sono tranquillo - È normale, compro ancora"
+)
+
+INCOME_OPTIONS = (
+    "Reddito stabile e sicuro - Posso investire regolarmente",
+    "Reddito variabile - Preferisco flessibilità",
+    "Reddito incerto - Potrei aver bisogno dei soldi",
+    "Pensionato/a - Vivo di rendite o pensione"
+)
+
+ESG_OPTIONS = (
+    "Sì, voglio solo portafogli ESG - È una priorità",
+    "Mi interessa ma non è essenziale - Bonus se disponibile",
+    "No, non è importante - Focus solo su rendimento/rischio"
+)
+
+COMPLEXITY_OPTIONS = (
+    "Zero - Voglio investire e dimenticare (set & forget)",
+    "Minima - Al massimo un controllo annuale",
+    "Moderata - Posso ribilanciare ogni 3-6 mesi se necessario",
+    "Alta - Mi piace monitorare e gestire attivamente"
+)
+
+# Domande del wizard: nome del parametro → opzioni, nell'ordine di calculate_recommendations
+WIZARD_QUESTIONS = {
+    'age_range': AGE_OPTIONS,
+    'time_horizon': HORIZON_OPTIONS,
+    'investment_goal': GOAL_OPTIONS,
+    'portfolio_percentage': WEALTH_OPTIONS,
+    'experience': EXPERIENCE_OPTIONS,
+    'risk_tolerance': TOLERANCE_OPTIONS,
+    'income_stability': INCOME_OPTIONS,
+    'esg_preference': ESG_OPTIONS,
+    'complexity': COMPLEXITY_OPTIONS
+}
+
+# Risposte che attivano regole specifiche
+BEGINNER = EXPERIENCE_OPTIONS[0]
+ESG_ONLY_ANSWER = ESG_OPTIONS[0]
+ESG_BONUS_ANSWER = ESG_OPTIONS[1]
+SET_AND_FORGET = COMPLEXITY_OPTIONS[0]
+LOW_MAINTENANCE = COMPLEXITY_OPTIONS[:2]
+MODERATE_MAINTENANCE = COMPLEXITY_OPTIONS[2]
+ACTIVE_MANAGEMENT = COMPLEXITY_OPTIONS[2:]
+GOAL_PRESERVATION = GOAL_OPTIONS[3]
+GOAL_GROWTH = GOAL_OPTIONS[2]
+
+# ============================================================================
+# REGOLE DI RISCHIO
+# ============================================================================
+
+# Mapping età → influenza rischio base
+AGE_RISK_MODIFIER = {
+    "Meno di 30 anni - Inizio carriera": +1,
+    "30-45 anni - Consolidamento professionale": 0,
+    "45-60 anni - Picco carriera, pre-pensione": -1,
+    "Più di 60 anni - Pensione o vicino alla pensione": -2
+}
+
+# Mapping orizzonte temporale → range di rischio base
+TIME_RISK_MAPPING = {
+    "Meno di 3 anni - Breve termine": [1, 2],
+    "3-7 anni - Medio termine": [2, 3],
+    "7-10 anni - Medio-lungo termine": [3, 4, 5],
+    "10-15 anni - Lungo termine": [4, 5, 6],
+    "Più di 15 anni - Molto lungo termine": [5, 6, 7]
+}
+DEFAULT_BASE_RISKS = [3, 4, 5]
+
+# Mapping orizzonte temporale → intervallo di anni [da, a], confrontato con l'orizzonte
+# [min_years, max_years] di ogni portafoglio (devono sovrapporsi)
+HORIZON_YEARS = {
+    "Meno di 3 anni - Breve termine": (0, 3),
+    "3-7 anni - Medio termine": (3, 7),
+    "7-10 anni - Medio-lungo termine": (7, 10),
+    "10-15 anni - Lungo termine": (10, 15),
+    "Più di 15 anni - Molto lungo termine": (15, math.inf)
+}
+DEFAULT_HORIZON_YEARS = (0, math.inf)
+
+# Mapping obiettivo → preferenza rischio
+GOAL_RISK_MODIFIER = {
+    "Pensione - Costruire capitale per il futuro": 0,
+    "Grande acquisto - Casa, auto, educazione figli": -1,
+    "Crescita patrimonio - Aumentare il capitale nel tempo": +1,
+    "Preservazione capitale - Proteggere dall'inflazione": -2,
+    "Libertà finanziaria - Rendita passiva": 0
+}
+
+# Mapping percentuale patrimonio → prudenza
+WEALTH_RISK_MODIFIER = {
+    "Tutto o quasi tutto (80-100%)": -2,
+    "Parte maggiore (50-80%)": -1,
+    "Parte significativa (20-50%)": 0,
+    "Parte minore (meno del 20%)": +1
+}
+
+# Mapping tolleranza emotiva → aggiustamento rischio
+TOLERANCE_ADJUSTMENT = {
+    "😰 Venderei immediatamente - Non sopporto le perdite": -2,
+    "😟 Sarei molto preoccupato - Probabilmente venderei": -1,
+    "😐 Sarei preoccupato ma manterrei - Capisco la volatilità": 0,
+    "😊 Lo vedrei come opportunità - Comprerei di più se possibile": +1,
+    "🚀 Sono tranquillo - È normale, compro ancora": +1
+}
+
+# Mapping stabilità reddito → prudenza
+INCOME_RISK_MODIFIER = {
+    "Reddito stabile e sicuro - Posso investire regolarmente": +1,
+    "Reddito variabile - Preferisco flessibilità": 0,
+    "Reddito incerto - Potrei aver bisogno dei soldi": -2,
+    "Pensionato/a - Vivo di rendite o pensione": -1
+}
+
+# Limite del range di rischio dopo gli aggiustamenti (8 = leverage, mai suggerito)
+MIN_RISK = 1
+MAX_RISK = 7
+LEVERAGE_RISK = 8
+
+# ⚠️ CRITICAL FIX: HARD LIMITS BASATI SULLA TOLLERANZA AL RISCHIO
+RISK_TOLERANCE_HARD_CAPS = {
+    "😰 Venderei immediatamente - Non sopporto le perdite": 2,
+    "😟 Sarei molto preoccupato - Probabilmente venderei": 3,
+    "😐 Sarei preoccupato ma manterrei - Capisco la volatilità": 5,
+    "😊 Lo vedrei come opportunità - Comprerei di più se possibile": 7,
+    "🚀 Sono tranquillo - È normale, compro ancora": 7
+}
+DEFAULT_HARD_CAP = 5
+
+# ============================================================================
+# REGOLE DI COMPLESSITÀ E PUNTEGGIO
+# ============================================================================
+
+# Complessità massima basata su esperienza
+# ⚠️ CRITICAL FIX: Aumentato limite per "Base" da 3 a 5
+MAX_COMPONENTS = {
+    "Principiante - È la mia prima volta con investimenti": 1,
+    "Base - Ho letto e studiato, ma poca pratica": 5,  # 🔧 AUMENTATO DA 3 A 5
+    "Intermedio - Ho già investito in ETF o fondi": 7,  # 🔧 AUMENTATO DA 6 A 7
+    "Esperto - Investo regolarmente e comprendo i mercati": 10
+}
+DEFAULT_MAX_COMPONENTS = 5
+
+# 🔧 BONUS CRITICO: ETF extra per chi è disposto a gestire complessità moderata/alta
+ACTIVE_MANAGEMENT_EXTRA_ETFS = 2
+
+# Pesi del punteggio dei portafogli candidati
+SCORE_WEIGHTS = {
+    'prefer_single': 12,        # Single ETF quando preferito
+    'prefer_esg': 6,            # ESG come bonus
+    'esg_only': 10,             # ESG come priorità
+    'no_rebalance': 18,         # Nessun ribilanciamento per chi vuole gestione minima
+    'easy_rebalance': 8,        # NO/1y per chi accetta gestione moderata
+    'unwanted_single': -5,      # Penalità single ETF se non preferito
+    'goal_match': 8,            # Coerenza rischio/obiettivo
+    'risk_distance': -3         # Per ogni livello di distanza dal rischio ideale
+}
+
+# Numero di portafogli suggeriti dal wizard
+TOP_N = 3
+
+
+# ============================================================================
+# CATEGORIE DI RISCHIO
+# ============================================================================
+
+# Fasce di volatilità annua e di drawdown tipico (in valore assoluto) per categoria,
+# le stesse descritte nella sezione educativa dell'app
+RISK_CATEGORY_BANDS = {
+    'Basso': {'volatility': (0.05, 0.15), 'drawdown': (0.10, 0.20)},
+    'Medio': {'volatility': (0.10, 0.20), 'drawdown': (0.20, 0.35)},
+    'Alto': {'volatility': (0.15, 0.25), 'drawdown': (0.30, 0.50)},
+    'Molto Alto': {'volatility': (0.30, float('inf')), 'drawdown': (0.50, float('inf'))},
+}
+
+
+def get_risk_category(risk_level):
+    """Restituisce la categoria di rischio basata sul livello"""
+    if risk_level <= 2:
+        return 'Basso'
+    elif risk_level <= 5:
+        return 'Medio'
+    elif risk_level <= 7:
+        return 'Alto'
+    else:  # risk_level == 8
+        return 'Molto Alto'
+
+
+# ============================================================================
+# CALCOLO DELLE RACCOMANDAZIONI
+# ============================================================================
+
+def calculate_recommendations(portfolios, age_range, time_horizon, investment_goal, 
+                             portfolio_percentage, experience, risk_tolerance, income_stability, 
+                             esg_preference, complexity):
+    """Calcola i portafogli raccomandati in base alle risposte del wizard"""
+    
+    # STEP 1: Determina livello di rischio base
+    
+    # Calcola rischio base dall'orizzonte temporale
+    base_risks = TIME_RISK_MAPPING.get(time_horizon, DEFAULT_BASE_RISKS)
+    
+    # Applica tutti i modificatori
+    total_adjustment = (
+        AGE_RISK_MODIFIER.get(age_range, 0) +
+        GOAL_RISK_MODIFIER.get(investment_goal, 0) +
+        WEALTH_RISK_MODIFIER.get(portfolio_percentage, 0) +
+        TOLERANCE_ADJUSTMENT.get(risk_tolerance, 0) +
+        INCOME_RISK_MODIFIER.get(income_stability, 0)
+    )
+    
+    # Applica aggiustamento al range
+    recommended_risks = []
+    for risk in base_risks:
+        adjusted = risk + total_adjustment
+        adjusted = max(MIN_RISK, min(MAX_RISK, adjusted))
+        recommended_risks.append(adjusted)
+    
+    # Rimuovi duplicati e ordina
+    recommended_risks = sorted(set(recommended_risks))
+    
+    # ============================================================================
+    # ⚠️ CRITICAL FIX: HARD LIMITS BASATI SULLA TOLLERANZA AL RISCHIO
+    # ============================================================================
+    max_risk_allowed = RISK_TOLERANCE_HARD_CAPS.get(risk_tolerance, DEFAULT_HARD_CAP)
+    
+    # APPLICA IL LIMITE INVALICABILE
+    recommended_risks = [r for r in recommended_risks if r <= max_risk_allowed]
+    
+    # Se il filtro ha eliminato tutto, usa il massimo consentito e quello sotto
+    if not recommended_risks:
+        recommended_risks = [max(MIN_RISK, max_risk_allowed - 1), max_risk_allowed]
+    
+    # STEP 2: Determina preferenze di complessità
+    
+    # Single ETF SOLO se: complessità Zero OR esperienza Principiante
+    single_only = complexity == SET_AND_FORGET or experience == BEGINNER
+    
+    # Preferenza per single (ma non obbligatorio)
+    prefer_single = complexity in LOW_MAINTENANCE
+    
+    # STEP 3: Determina preferenza ESG
+    
+    esg_only = esg_preference == ESG_ONLY_ANSWER
+    prefer_esg = esg_preference == ESG_BONUS_ANSWER
+    
+    # STEP 4: Determina complessità massima basata su esperienza
+    max_etfs = MAX_COMPONENTS.get(experience, DEFAULT_MAX_COMPONENTS)
+    
+    # 🔧 BONUS CRITICO: Se l'utente è disposto a gestire complessità moderata/alta
+    # e NON vuole solo single ETF, aumenta ulteriormente il limite
+    if not single_only and complexity in ACTIVE_MANAGEMENT:
+        max_etfs += ACTIVE_MANAGEMENT_EXTRA_ETFS  # Permetti portafogli un po' più complessi
+    
+    # STEP 5: Orizzonte compatibile (intervalli precalcolati, vedi horizon_index)
+    horizon_years = HORIZON_YEARS.get(time_horizon, DEFAULT_HORIZON_YEARS)
+    compatible = get_horizon_index(portfolios).compatible(*horizon_years)
+    
+    # STEP 6: Filtra e punteggia i portafogli
+    
+    # Raccogli tutti i portafogli
+    all_portfolios = []
+    for section in portfolios.values():
+        all_portfolios.extend(section)
+    
+    # Rischio ideale: il valore centrale del range suggerito
+    ideal_risk = recommended_risks[len(recommended_risks)//2]
+    
+    # Filtra i portafogli
+    candidates = []
+    for position, portfolio in enumerate(all_portfolios):
+        # FILTRO CRITICO: Escludi sempre rischio 8
+        if portfolio.risk_level == LEVERAGE_RISK:
+            continue
+        
+        # Filtro orizzonte
+        if not compatible[position]:
+            continue
+        
+        # Filtro rischio
+        if portfolio.risk_level not in recommended_risks:
+            continue
+        
+        # Filtro ESG
+        if esg_only and portfolio.esg != 1:
+            continue
+        
+        # Filtro numero componenti
+        if portfolio.n_components > max_etfs:
+            continue
+        
+        # Filtro single ETF
+        if single_only and not portfolio.is_single:
+            continue
+        
+        # CALCOLA SCORE
+        score = 0
+        
+        # Bonus per preferenza single
+        if prefer_single and portfolio.is_single:
+            score += SCORE_WEIGHTS['prefer_single']
+        
+        # Bonus per ESG
+        if prefer_esg and portfolio.esg == 1:
+            score += SCORE_WEIGHTS['prefer_esg']
+        
+        # Bonus forte per ESG only
+        if esg_only and portfolio.esg == 1:
+            score += SCORE_WEIGHTS['esg_only']
+        
+        # Bonus per nessun ribilanciamento
+        if complexity in LOW_MAINTENANCE:
+            if portfolio.rebalance == 'NO':
+                score += SCORE_WEIGHTS['no_rebalance']
+        
+        # Bonus moderato per ribilanciamento annuale
+        if complexity == MODERATE_MAINTENANCE:
+            if portfolio.rebalance in ['NO', '1y']:
+                score += SCORE_WEIGHTS['easy_rebalance']
+        
+        # 🔧 PENALITÀ PER SINGLE ETF se NON è preferito
+        # Questo aiuta a far emergere i multi-ETF quando l'utente è disposto a gestirli
+        if not prefer_single and not single_only and portfolio.is_single:
+            score += SCORE_WEIGHTS['unwanted_single']
+        
+        # Bonus per match con obiettivo
+        if investment_goal == GOAL_PRESERVATION:
+            if portfolio.risk_level <= 3:
+                score += SCORE_WEIGHTS['goal_match']
+        
+        if investment_goal == GOAL_GROWTH:
+            if portfolio.risk_level >= 5:
+                score += SCORE_WEIGHTS['goal_match']
+        
+        # Vicinanza al rischio ideale
+        risk_distance = abs(portfolio.risk_level - ideal_risk)
+        score += risk_distance * SCORE_WEIGHTS['risk_distance']
+        
+        candidates.append({
+            'portfolio': portfolio,
+            'score': score
+        })
+    
+    # Ordina per score
+    candidates.sort(key=lambda x: x['score'], reverse=True)
+    
+    # Prendi i top 3
+    top_portfolios = [c['portfolio'] for c in candidates[:TOP_N]]
+    
+    return {
+        'portfolios': top_portfolios,
+        'recommended_risks': recommended_risks,
+        'criteria': {
+            'age_range': age_range,
+            'time_horizon': time_horizon,
+            'investment_goal': investment_goal,
+            'portfolio_percentage': portfolio_percentage,
+            'experience': experience,
+            'risk_tolerance': risk_tolerance,
+            'income_stability': income_stability,
+            'esg_preference': esg_preference,
+            'complexity': complexity,
+            'single_only': single_only,
+            'esg_only': esg_only,
+            'max_etfs': max_etfs
+        }
+    }
+
+
+# ============================================================================
+# FILTRI DELLE VISTE DI ESPLORAZIONE
+# ============================================================================
+
+def filter_portfolios(portfolios, risk_filter, esg_filter, single_only, rebalance_filter=None, ranges=()):
+    """
+    Applica i filtri ai portafogli con i bitset precalcolati del catalogo
+    (rebalance_filter: codici di ribilanciamento ammessi, None per tutti;
+    ranges: condizioni (colonna, minimo, massimo) su TER, quote per classe di attivo e orizzonte)
+    """
+    filtered = {'multi': [], 'single': [], 'esg': []}
+    selected = get_filter_index(portfolios).filter(risk_filter, esg_filter, single_only, rebalance_filter, ranges)
+    for section, portfolio_list in selected.items():
+        filtered[section] = list(portfolio_list)
+    return filtered
@@ -0,0 +1,164 @@
+"""
+Modello di Esposizione per Classe di Attivo e Area Geografica
+Tabella ISIN -> esposizioni (classi di attivo di market_assumptions più aree geografiche),
+con la ripartizione interna degli ETF multi-asset (Vanguard LifeStrategy: quota azionaria
+globale e obbligazionaria). L'esposizione aggregata di ogni portafoglio (look-through) si
+ottiene una volta per catalogo come prodotto tra la matrice sparsa dei pesi
+(portafogli x ISIN, in forma di coordinate) e la tabella delle esposizioni
+"""
+
+import re
+
+import numpy as np
+
+from catalog import isin_universe, iter_portfolios, target_weights
+from market_assumptions import ASSET_CLASSES, asset_class_exposure
+
+# Aree geografiche della parte investita (la liquidità non ha area)
+REGIONS = ('north_america', 'europe', 'pacific', 'emerging', 'global')
+
+# Fattori di esposizione: classi di attivo, poi aree geografiche
+FACTORS = tuple(ASSET_CLASSES) + REGIONS
+
+FACTOR_LABELS = {
+    'equity': 'Azioni sviluppati',
+    'equity_em': 'Azioni emergenti',
+    'gold': 'Oro',
+    'bond': 'Obbligazioni',
+    'inflation_linked': 'Obbligazioni indicizzate',
+    'short_bond': 'Obbligazioni breve termine',
+    'money_market': 'Monetario',
+    'north_america': 'Nord America',
+    'europe': 'Europa',
+    'pacific': 'Pacifico',
+    'emerging': 'Mercati emergenti',
+    'global': 'Globale (non ripartito)',
+}
+
+# Ripartizione geografica approssimata degli indici azionari (pesi di capitalizzazione)
+REGION_SPLITS = {
+    'world': {'north_america': 0.75, 'europe': 0.16, 'pacific': 0.09},
+    'all_world': {'north_america': 0.66, 'europe': 0.14, 'pacific': 0.09, 'emerging': 0.11},
+    'world_ex_usa': {'north_america': 0.12, 'europe': 0.56, 'pacific': 0.32},
+    'usa': {'north_america': 1.0},
+    'europe': {'europe': 1.0},
+    'emerging': {'emerging': 1.0},
+    'global': {'global': 1.0},
+}
+
+# Regole sul nome per l'area della parte azionaria, valutate in ordine
+EQUITY_REGION_RULES = (
+    (r'ex usa', 'world_ex_usa'),
+    (r's&p 500|\busa\b|nasdaq', 'usa'),
+    (r'emerging', 'emerging'),
+    (r'all-world|all country|acwi|global all cap|lifestrategy', 'all_world'),
+    (r'world', 'world'),
+    (r'europe|\bemu\b|euro stoxx', 'europe'),
+)
+DEFAULT_EQUITY_REGION = 'world'
+
+# Obbligazioni in euro: area europea; le altre (es. LifeStrategy, globali) restano non ripartite
+_EURO_BONDS = re.compile(r'\beur\b|\beuro\b|\bemu\b', re.IGNORECASE)
+
+# Classi senza area geografica
+_CASH_CLASSES = ('money_market',)
+
+_last_model = None
+
+
+def sleeve_region(name, asset_class):
+    """Area geografica di una quota (classe di attivo) di un ETF, ricavata dal nome"""
+    if asset_class == 'equity':
+        for pattern, region in EQUITY_REGION_RULES:
+            if re.search(pattern, name, re.IGNORECASE):
+                return region
+        return DEFAULT_EQUITY_REGION
+    if asset_class == 'equity_em':
+        return 'emerging'
+    if asset_class == 'gold':
+        return 'global'
+    return 'europe' if _EURO_BONDS.search(name) else 'global'
+
+
+def etf_exposure(name):
+    """
+    Esposizione di un ETF: quote per classe di attivo (da market_assumptions, con la
+    ripartizione dei LifeStrategy) e, per la parte investita, quote per area geografica
+    """
+    exposure = dict.fromkeys(FACTORS, 0.0)
+    for asset_class, share in asset_class_exposure(name).items():
+        exposure[asset_class] += share
+        if asset_class in _CASH_CLASSES:
+            continue
+        for region, region_share in REGION_SPLITS[sleeve_region(name, asset_class)].items():
+            exposure[region] += share * region_share
+    return exposure
+
+
+def exposure_table(isins, names):
+    """Matrice ISIN x FACTORS delle esposizioni (una riga per ISIN, nell'ordine dato)"""
+    table = np.zeros((len(isins), len(FACTORS)))
+    for row, isin in enumerate(isins):
+        exposure = etf_exposure(names[isin])
+        table[row] = [exposure[factor] for factor in FACTORS]
+    return table
+
+
+class ExposureModel:
+    """Esposizioni aggregate dei portafogli di un catalogo compilato"""
+    __slots__ = ('catalog', 'portfolios', 'ids', 'isins', 'table', 'matrix', '_rows')
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        portfolios = self.portfolios = iter_portfolios(catalog)
+        self.ids = tuple(p.id for p in portfolios)
+        self._rows = {portfolio_id: row for row, portfolio_id in enumerate(self.ids)}
+
+        names = {c.isin: c.name for p in portfolios for c in p.components}
+        self.isins = isin_universe(catalog)
+        self.table = exposure_table(self.isins, names)
+
+        # Pesi in forma di coordinate (portafoglio, ISIN, peso): la matrice densa
+        # portafogli x ISIN sarebbe quasi tutta zeri
+        columns = {isin: column for column, isin in enumerate(self.isins)}
+        rows, cols, weights = [], [], []
+        for row, portfolio in enumerate(portfolios):
+            for isin, weight in target_weights(portfolio).items():
+                rows.append(row)
+                cols.append(columns[isin])
+                weights.append(weight)
+        rows = np.array(rows, dtype=np.int64)
+        cols = np.array(cols, dtype=np.int64)
+        weights = np.array(weights, dtype=float)
+
+        # Prodotto sparso x denso: per ogni fattore, somma per portafoglio di peso x esposizione
+        self.matrix = np.zeros((len(self.ids), len(FACTORS)))
+        for factor in range(len(FACTORS)):
+            self.matrix[:, factor] = np.bincount(rows, weights=weights * self.table[cols, factor],
+                                                 minlength=len(self.ids))
+
+    def column(self, factor):
+        """Esposizione di tutti i portafogli a un fattore, nell'ordine di iter_portfolios"""
+        return self.matrix[:, FACTORS.index(factor)]
+
+    def exposure(self, portfolio_id):
+        """Esposizione aggregata di un portafoglio: fattore -> quota (frazione)"""
+        return dict(zip(FACTORS, self.matrix[self._rows[portfolio_id]].tolist()))
+
+    def similar(self, portfolio_id, limit=3):
+        """Portafogli con l'esposizione più vicina (distanza L1 sui fattori): [(portafoglio, distanza)] dal più simile"""
+        row = self._rows[portfolio_id]
+        distances = np.abs(self.matrix - self.matrix[row]).sum(axis=1)
+        distances[row] = np.inf
+        order = np.argsort(distances, kind='stable')[:limit]
+        return [(self.portfolios[i], float(distances[i])) for i in order if np.isfinite(distances[i])]
+
+
+def get_exposure_model(catalog):
+    """Modello del catalogo indicato, ricostruito solo quando cambia il catalogo"""
+    global _last_model
+    model = _last_model
+    if model is None or model.catalog is not catalog:
+        model = ExposureModel(catalog)
+        _last_model = model
+    return model
@@ -0,0 +1,124 @@
+"""
+Indice a Bitset per i Filtri di Esplorazione
+Per ogni livello di rischio, flag ESG, single/multi ETF e codice di ribilanciamento
+precalcola un bitset (un intero Python: il bit i corrisponde all'i-esimo portafoglio del
+catalogo). Una combinazione di filtri diventa qualche AND tra interi più la raccolta dei
+portafogli selezionati, e il risultato viene memorizzato per tupla di filtri.
+Le condizioni sui valori numerici (TER, quote per classe di attivo, orizzonte) si risolvono
+con range_index e si combinano con lo stesso AND.
+L'indice si costruisce una volta per catalogo; non dipende da streamlit, pandas né numpy
+(range_index, che usa numpy, si importa solo al primo filtro numerico)
+"""
+
+import threading
+
+# Combinazioni di filtri memorizzate per catalogo (le più vecchie vengono scartate)
+CACHE_SIZE = 128
+
+_lock = threading.Lock()
+_last_index = None
+
+
+def bitset(flags):
+    """Bitset dai flag in ordine di catalogo (il primo flag è il bit meno significativo)"""
+    return int(''.join('1' if flag else '0' for flag in reversed(flags)) or '0', 2)
+
+
+def iter_bits(mask):
+    """Posizioni dei bit a 1, in ordine crescente (scansione in C della rappresentazione binaria)"""
+    bits = bin(mask)[:1:-1]
+    position = bits.find('1')
+    while position != -1:
+        yield position
+        position = bits.find('1', position + 1)
+
+
+class FilterIndex:
+    """Bitset dei criteri di filtro di un catalogo compilato"""
+    __slots__ = ('catalog', 'portfolios', 'sections', 'all_mask', 'risk_masks', 'esg_mask',
+                 'single_mask', 'rebalance_masks', '_cache')
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.portfolios = tuple(p for section in catalog.values() for p in section)
+
+        # Posizione iniziale e numero di portafogli di ogni sezione (bit contigui)
+        self.sections = []
+        start = 0
+        for section, portfolio_list in catalog.items():
+            self.sections.append((section, start, len(portfolio_list)))
+            start += len(portfolio_list)
+
+        portfolios = self.portfolios
+        self.all_mask = (1 << len(portfolios)) - 1
+        self.risk_masks = {
+            level: bitset([p.risk_level == level for p in portfolios])
+            for level in sorted({p.risk_level for p in portfolios})
+        }
+        self.esg_mask = bitset([p.esg == 1 for p in portfolios])
+        self.single_mask = bitset([p.is_single for p in portfolios])
+        self.rebalance_masks = {
+            code: bitset([p.rebalance == code for p in portfolios])
+            for code in sorted({p.rebalance for p in portfolios})
+        }
+        self._cache = {}
+
+    def mask(self, risk_filter, esg_filter=False, single_only=False, rebalance_filter=None, ranges=()):
+        """
+        Bitset dei portafogli che soddisfano tutti i filtri
+        (ranges: condizioni (colonna, minimo, massimo) di range_index)
+        """
+        mask = 0
+        for level in risk_filter:
+            mask |= self.risk_masks.get(level, 0)
+        if esg_filter:
+            mask &= self.esg_mask
+        if single_only:
+            mask &= self.single_mask
+        if rebalance_filter is not None:
+            codes = 0
+            for code in rebalance_filter:
+                codes |= self.rebalance_masks.get(code, 0)
+            mask &= codes
+        if ranges and mask:
+            from range_index import get_range_index
+            mask &= get_range_index(self.catalog).mask(ranges)
+        return mask
+
+    def gather(self, mask):
+        """Portafogli selezionati dal bitset, per sezione e nell'ordine del catalogo"""
+        selected = {}
+        for section, start, length in self.sections:
+            section_mask = (mask >> start) & ((1 << length) - 1)
+            portfolio_list = self.catalog[section]
+            selected[section] = tuple(portfolio_list[i] for i in iter_bits(section_mask))
+        return selected
+
+    def filter(self, risk_filter, esg_filter=False, single_only=False, rebalance_filter=None, ranges=()):
+        """Portafogli filtrati per sezione, memorizzati per combinazione di filtri"""
+        key = (frozenset(risk_filter), bool(esg_filter), bool(single_only),
+               None if rebalance_filter is None else frozenset(rebalance_filter),
+               tuple(sorted(map(tuple, ranges), key=lambda condition: condition[0])))
+        selected = self._cache.get(key)
+        if selected is None:
+            selected = self.gather(self.mask(*key))
+            with _lock:
+                if len(self._cache) >= CACHE_SIZE:
+                    self._cache.pop(next(iter(self._cache)))
+                self._cache[key] = selected
+        return selected
+
+    def clear_cache(self):
+        """Svuota le combinazioni di filtri memorizzate (i bitset restano)"""
+        with _lock:
+            self._cache.clear()
+
+
+def get_filter_index(catalog):
+    """Indice del catalogo indicato, ricostruito solo quando cambia il catalogo"""
+    global _last_index
+    index = _last_index
+    if index is None or index.catalog is not catalog:
+        index = FilterIndex(catalog)
+        _last_index = index
+    return index
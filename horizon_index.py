@@ -0,0 +1,79 @@
+"""
+Indice degli Intervalli di Orizzonte
+Ogni portafoglio è adatto a un intervallo di anni [min_years, max_years] ricavato da
+min_duration. Un portafoglio è compatibile con l'orizzonte di un utente [da, a] se i due
+intervalli si sovrappongono: min_years <= a e max_years >= da.
+L'indice tiene gli estremi distinti ordinati, ciascuno con il bitset cumulato dei portafogli
+(come filter_index): una ricerca sono due bisezioni e un AND tra interi.
+Non dipende da streamlit né da pandas
+"""
+
+import bisect
+import threading
+
+from filter_index import bitset, iter_bits
+
+_lock = threading.Lock()
+_last_index = None
+
+
+class HorizonIndex:
+    """Intervalli di orizzonte di un catalogo compilato, interrogabili per sovrapposizione"""
+    __slots__ = ('catalog', 'size', 'starts', 'start_masks', 'ends', 'end_masks', '_flags')
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        portfolios = [p for section in catalog.values() for p in section]
+        self.size = len(portfolios)
+
+        # starts[i] -> portafogli con min_years <= starts[i] (cumulato dal più piccolo)
+        self.starts = sorted({p.min_years for p in portfolios})
+        self.start_masks = []
+        mask = 0
+        for start in self.starts:
+            mask |= bitset([p.min_years == start for p in portfolios])
+            self.start_masks.append(mask)
+
+        # ends[i] -> portafogli con max_years >= ends[i] (cumulato dal più grande)
+        self.ends = sorted({p.max_years for p in portfolios})
+        self.end_masks = [0] * len(self.ends)
+        mask = 0
+        for i in range(len(self.ends) - 1, -1, -1):
+            mask |= bitset([p.max_years == self.ends[i] for p in portfolios])
+            self.end_masks[i] = mask
+        self._flags = {}
+
+    def mask(self, low, high):
+        """Bitset dei portafogli il cui intervallo si sovrappone a [low, high]"""
+        i = bisect.bisect_right(self.starts, high) - 1
+        j = bisect.bisect_left(self.ends, low)
+        if i < 0 or j == len(self.ends):
+            return 0
+        return self.start_masks[i] & self.end_masks[j]
+
+    def compatible(self, low, high):
+        """Flag per posizione nel catalogo (1 = compatibile con [low, high]), memorizzati per intervallo"""
+        flags = self._flags.get((low, high))
+        if flags is None:
+            flags = bytearray(self.size)
+            for position in iter_bits(self.mask(low, high)):
+                flags[position] = 1
+            flags = bytes(flags)
+            with _lock:
+                self._flags[(low, high)] = flags
+        return flags
+
+    def clear_cache(self):
+        """Svuota i flag memorizzati per intervallo (i bitset restano)"""
+        with _lock:
+            self._flags.clear()
+
+
+def get_horizon_index(catalog):
+    """Indice del catalogo indicato, ricostruito solo quando cambia il catalogo"""
+    global _last_index
+    index = _last_index
+    if index is None or index.catalog is not catalog:
+        index = HorizonIndex(catalog)
+        _last_index = index
+    return index
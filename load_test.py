@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Test di Carico Multi-Sessione
+Simula molte sessioni dell'app (AppTest headless) in un solo processo: una parte segue il
+wizard con risposte casuali, le altre esplorano il catalogo con viste e filtri casuali.
+Riporta i percentili di latenza per tipo di interazione, la memoria trattenuta in
+st.session_state da ogni sessione (wizard_results incluso) e una stima degli utenti
+sostenibili da un singolo processo server
+
+Le sessioni aperte avanzano a turno di un'interazione alla volta: lo script di una sessione
+Streamlit è Python puro e, con il GIL, un processo esegue comunque una riesecuzione alla
+volta. AppTest inoltre non supporta esecuzioni parallele in thread dello stesso processo
+
+Uso:
+    python load_test.py --sessions 50 --concurrency 10
+    python load_test.py --sessions 20 --synthetic 10000
+"""
+
+import argparse
+import contextlib
+import random
+import resource
+import statistics
+import sys
+import time
+
+import catalog
+from catalog import Component, Portfolio
+from synthetic_catalog import generate_catalog, synthetic_version, use_catalog
+from wizard_timing import APP_PATH
+
+DEFAULT_SESSIONS = 30
+DEFAULT_CONCURRENCY = 10
+DEFAULT_WIZARD_SHARE = 0.5
+DEFAULT_EXPLORE_STEPS = 6
+DEFAULT_SEED = 2024
+TIMEOUT = 300
+
+# Pausa media di un utente tra due interazioni e utilizzo massimo della CPU del processo
+DEFAULT_THINK_TIME = 5.0
+TARGET_UTILIZATION = 0.7
+
+PERCENTILES = (50, 90, 99)
+
+WIZARD_MODE = "🎯 Guidami alla Scelta (Consigliato)"
+EXPLORE_MODE = "🔍 Esplora Liberamente"
+RESTART_LABEL = "🔄 Ricomincia il Questionario"
+
+# Chiavi dei widget creati per portafoglio o per vista, raggruppate nel riepilogo della memoria
+WIDGET_KEY_PREFIXES = ('open_', 'page_')
+
+# Oggetti del catalogo condiviso (st.cache_resource): una sessione ne trattiene solo il riferimento
+SHARED_TYPES = (Portfolio, Component)
+
+
+def wizard_steps(app, rng):
+    """Questionario con risposte casuali, calcolo dei risultati e talvolta un nuovo questionario"""
+    for _ in range(2 if rng.random() < 0.3 else 1):
+        for index in range(len(app.main.radio)):
+            radio = app.main.radio[index]
+            radio.set_value(rng.choice(radio.options))
+            yield 'wizard_answer'
+        app.main.button[0].click()
+        yield 'wizard_submit'
+        if not app.session_state['wizard_results']:
+            return
+        restart = [button for button in app.main.button if button.label == RESTART_LABEL]
+        if restart and rng.random() < 0.3:
+            restart[0].click()
+            yield 'wizard_restart'
+
+
+def explore_steps(app, rng, steps=DEFAULT_EXPLORE_STEPS):
+    """Passaggio all'esplorazione, poi cambi di vista, filtri casuali e apertura di portafogli"""
+    app.sidebar.radio[0].set_value(EXPLORE_MODE)
+    yield 'explore_mode'
+    for _ in range(steps):
+        action = rng.choice(('explore_view', 'explore_filter', 'open_portfolio'))
+        if action == 'open_portfolio' and not app.main.toggle:
+            action = 'explore_view'
+
+        if action == 'explore_view':
+            view = app.sidebar.radio[1]
+            view.set_value(rng.choice(view.options))
+        elif action == 'explore_filter':
+            risks = app.sidebar.multiselect[0]
+            risks.set_value(rng.sample(risks.options, rng.randint(1, len(risks.options))))
+            checkbox = app.sidebar.checkbox[rng.randrange(len(app.sidebar.checkbox))]
+            checkbox.set_value(not checkbox.value)
+        else:
+            rng.choice(list(app.main.toggle)).set_value(True)
+        yield action
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Byte trattenuti da un oggetto e da ciò che contiene. Gli oggetti del catalogo condiviso
+    contano zero (il riferimento è già nel contenitore); array NumPy e DataFrame pandas
+    contano i propri buffer
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, SHARED_TYPES):
+        return 0
+    seen.add(id(obj))
+
+    if hasattr(obj, 'memory_usage') and hasattr(obj, 'columns'):
+        return int(obj.memory_usage(deep=True).sum())
+    size = sys.getsizeof(obj)
+    if hasattr(obj, 'nbytes') and hasattr(obj, 'base') and obj.base is not None:
+        size += obj.nbytes                 # vista su un buffer non incluso in getsizeof
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+def session_state_bytes(app):
+    """Byte trattenuti in st.session_state, per chiave"""
+    state = app.session_state
+    return {key: deep_sizeof(state[key]) for key in sorted(state.keys(), key=str)}
+
+
+class SimulatedSession:
+    """Una sessione AppTest con il proprio percorso di interazioni"""
+    __slots__ = ('number', 'kind', 'app', 'steps')
+
+    def __init__(self, number, kind, rng, explore_steps_count=DEFAULT_EXPLORE_STEPS):
+        from streamlit.testing.v1 import AppTest
+
+        self.number = number
+        self.kind = kind
+        self.app = AppTest.from_file(APP_PATH, default_timeout=TIMEOUT)
+        if kind == 'wizard':
+            self.steps = wizard_steps(self.app, rng)
+        else:
+            self.steps = explore_steps(self.app, rng, explore_steps_count)
+
+    def run(self):
+        """Riesegue lo script; restituisce la durata in secondi"""
+        started = time.perf_counter()
+        self.app.run()
+        elapsed = time.perf_counter() - started
+        if self.app.exception:
+            raise RuntimeError(f"Sessione {self.number} ({self.kind}): {self.app.exception[0].value}")
+        return elapsed
+
+
+def percentile(values, q):
+    """Percentile q (0-100) con interpolazione lineare"""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def peak_rss_mb():
+    """Picco di memoria residente del processo, in MB (ru_maxrss è in KB su Linux)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_load_test(sessions=DEFAULT_SESSIONS, concurrency=DEFAULT_CONCURRENCY, wizard_share=DEFAULT_WIZARD_SHARE,
+                  seed=DEFAULT_SEED, explore_steps_count=DEFAULT_EXPLORE_STEPS, progress=None):
+    """
+    Esegue le sessioni, al massimo `concurrency` aperte insieme.
+    Restituisce latenze per interazione (secondi), memoria per sessione e durata totale
+    """
+    rng = random.Random(seed)
+    kinds = ['wizard' if rng.random() < wizard_share else 'explore' for _ in range(sessions)]
+    latencies = {}
+    memory = []
+    pending = list(enumerate(kinds, start=1))
+    active = []
+
+    started = time.perf_counter()
+    while pending or active:
+        while pending and len(active) < concurrency:
+            number, kind = pending.pop(0)
+            session = SimulatedSession(number, kind, random.Random(rng.random()), explore_steps_count)
+            latencies.setdefault('initial_load', []).append(session.run())
+            active.append(session)
+
+        for session in list(active):
+            interaction = next(session.steps, None)
+            if interaction is None:
+                state = session_state_bytes(session.app)
+                memory.append({'session': session.number, 'kind': session.kind,
+                               'total_bytes': sum(state.values()), 'keys': state})
+                active.remove(session)
+                if progress:
+                    progress(f"sessione {session.number} ({session.kind}) completata")
+                continue
+            latencies.setdefault(interaction, []).append(session.run())
+
+    return {
+        'latencies': latencies,
+        'memory': sorted(memory, key=lambda entry: entry['session']),
+        'elapsed': time.perf_counter() - started,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def summarize_latencies(latencies):
+    """Conteggio, media, percentili e massimo in millisecondi per tipo di interazione"""
+    rows = []
+    for interaction, values in latencies.items():
+        row = {'interaction': interaction, 'count': len(values), 'mean_ms': statistics.fmean(values) * 1000}
+        for q in PERCENTILES:
+            row[f'p{q}_ms'] = percentile(values, q) * 1000
+        row['max_ms'] = max(values) * 1000
+        rows.append(row)
+    return sorted(rows, key=lambda row: row['mean_ms'] * row['count'], reverse=True)
+
+
+def state_group(key):
+    """Chiave di session_state nel riepilogo: i widget per portafoglio sono raggruppati per prefisso"""
+    key = str(key)
+    for prefix in WIDGET_KEY_PREFIXES:
+        if key.startswith(prefix):
+            return prefix + '*'
+    return key
+
+
+def summarize_memory(memory):
+    """Memoria media e massima per chiave di session_state e per tipo di sessione, in KB"""
+    by_key = {}
+    for entry in memory:
+        grouped = {}
+        for key, size in entry['keys'].items():
+            grouped[state_group(key)] = grouped.get(state_group(key), 0) + size
+        for key, size in grouped.items():
+            by_key.setdefault(key, []).append(size)
+    by_kind = {}
+    for entry in memory:
+        by_kind.setdefault(entry['kind'], []).append(entry['total_bytes'])
+    return (
+        {key: (statistics.fmean(sizes) / 1024, max(sizes) / 1024) for key, sizes in by_key.items()},
+        {kind: (statistics.fmean(sizes) / 1024, max(sizes) / 1024) for kind, sizes in by_kind.items()},
+    )
+
+
+def estimated_users(latencies, think_time=DEFAULT_THINK_TIME, utilization=TARGET_UTILIZATION):
+    """
+    Utenti sostenibili da un processo: ognuno chiede in media una riesecuzione ogni
+    `think_time` secondi, e il processo ne esegue una alla volta fino all'utilizzo indicato
+    """
+    values = [value for interaction, values in latencies.items() if interaction != 'initial_load'
+              for value in values]
+    if not values:
+        return 0
+    return int(utilization * think_time / statistics.fmean(values))
+
+
+def parse_args(argv=None):
+    """Argomenti da riga di comando"""
+    parser = argparse.ArgumentParser(description="Test di carico multi-sessione dell'app")
+    parser.add_argument('--sessions', type=int, default=DEFAULT_SESSIONS, help="Sessioni simulate in totale")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="Sessioni aperte insieme")
+    parser.add_argument('--wizard-share', type=float, default=DEFAULT_WIZARD_SHARE,
+                        help="Quota di sessioni che seguono il wizard (le altre esplorano)")
+    parser.add_argument('--explore-steps', type=int, default=DEFAULT_EXPLORE_STEPS,
+                        help="Interazioni per sessione di esplorazione")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Seed delle sessioni casuali")
+    parser.add_argument('--think-time', type=float, default=DEFAULT_THINK_TIME,
+                        help="Secondi medi tra due interazioni di un utente, per la stima degli utenti")
+    parser.add_argument('--synthetic', type=int, default=None, metavar='N',
+                        help="Usa un catalogo sintetico di N portafogli invece di quello reale")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Esegue il test di carico e stampa latenze, memoria per sessione e stima degli utenti"""
+    args = parse_args(argv)
+
+    def progress(message):
+        print(message, file=sys.stderr, flush=True)
+
+    scope = contextlib.nullcontext()
+    if args.synthetic:
+        scope = use_catalog(generate_catalog(args.synthetic, args.seed), synthetic_version(args.synthetic, args.seed))
+    with scope:
+        result = run_load_test(args.sessions, args.concurrency, args.wizard_share, args.seed,
+                               args.explore_steps, progress)
+        version = catalog.CATALOG_VERSION
+
+    interactions = sum(len(values) for values in result['latencies'].values())
+    print(f"Catalogo {version}: {args.sessions} sessioni, {args.concurrency} aperte insieme, "
+          f"{interactions} interazioni in {result['elapsed']:.1f} s ({interactions / result['elapsed']:.1f}/s)")
+
+    print(f"\n{'interazione':18} {'n':>5} {'media':>9} " + " ".join(f"{'p' + str(q):>9}" for q in PERCENTILES)
+          + f" {'max':>9}  (ms)")
+    for row in summarize_latencies(result['latencies']):
+        print(f"{row['interaction']:18} {row['count']:5} {row['mean_ms']:9.1f} "
+              + " ".join(f"{row[f'p{q}_ms']:9.1f}" for q in PERCENTILES) + f" {row['max_ms']:9.1f}")
+
+    by_key, by_kind = summarize_memory(result['memory'])
+    print(f"\n{'session_state':32} {'media KB':>10} {'max KB':>10}")
+    for key, (mean_kb, max_kb) in sorted(by_key.items(), key=lambda item: item[1][1], reverse=True):
+        print(f"{str(key):32} {mean_kb:10.1f} {max_kb:10.1f}")
+    for kind, (mean_kb, max_kb) in sorted(by_kind.items()):
+        print(f"{'totale sessione ' + kind:32} {mean_kb:10.1f} {max_kb:10.1f}")
+
+    print(f"\nPicco RSS del processo: {result['peak_rss_mb']:.0f} MB")
+    print(f"Utenti stimati per processo (una interazione ogni {args.think_time:.0f} s, "
+          f"utilizzo {TARGET_UTILIZATION:.0%}): {estimated_users(result['latencies'], args.think_time)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
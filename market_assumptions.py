@@ -0,0 +1,77 @@
+"""
+Ipotesi di Mercato per Classe di Attivo
+Rendimenti attesi, volatilità e correlazioni annue per classe di attivo (valori illustrativi
+di lungo periodo per un investitore in euro) e ripartizione di ogni ETF sulle classi,
+ricavata dal nome. Da queste si ottengono media e covarianza dei singoli ETF
+"""
+
+import re
+
+import numpy as np
+
+# Classi di attivo: (rendimento atteso annuo, volatilità annua), in frazioni
+ASSET_CLASSES = {
+    'equity': (0.070, 0.160),
+    'equity_em': (0.080, 0.210),
+    'gold': (0.040, 0.150),
+    'bond': (0.030, 0.055),
+    'inflation_linked': (0.025, 0.060),
+    'short_bond': (0.025, 0.015),
+    'money_market': (0.020, 0.005),
+}
+
+# Correlazioni tra classi, nello stesso ordine di ASSET_CLASSES
+CLASS_CORRELATION = np.array([
+    # eq    em    gold  bond  infl  short money
+    [1.00, 0.75, 0.10, 0.15, 0.20, 0.10, 0.00],
+    [0.75, 1.00, 0.20, 0.15, 0.20, 0.10, 0.00],
+    [0.10, 0.20, 1.00, 0.25, 0.30, 0.05, 0.00],
+    [0.15, 0.15, 0.25, 1.00, 0.70, 0.50, 0.10],
+    [0.20, 0.20, 0.30, 0.70, 1.00, 0.40, 0.10],
+    [0.10, 0.10, 0.05, 0.50, 0.40, 1.00, 0.30],
+    [0.00, 0.00, 0.00, 0.10, 0.10, 0.30, 1.00],
+])
+
+# Regole sul nome dell'ETF, valutate in ordine: la prima che corrisponde assegna la ripartizione.
+# Una ripartizione può superare il 100% (leva) con una quota negativa di liquidità
+EXPOSURE_RULES = (
+    (r'\(2x\)|leveraged', {'equity': 2.0, 'money_market': -1.0}),
+    (r'gold', {'gold': 1.0}),
+    (r'emerging', {'equity_em': 1.0}),
+    (r'overnight', {'money_market': 1.0}),
+    (r'floating rate|short maturity|0-3', {'short_bond': 1.0}),
+    (r'inflation', {'inflation_linked': 1.0}),
+    (r'bond|corporate|government', {'bond': 1.0}),
+)
+
+_LIFESTRATEGY = re.compile(r'(\d+)% equity', re.IGNORECASE)
+
+def asset_class_exposure(name):
+    """Ripartizione di un ETF sulle classi di attivo, ricavata dal nome"""
+    match = _LIFESTRATEGY.search(name)
+    if match:
+        equity = int(match.group(1))
+        return {'equity': equity / 100, 'bond': (100 - equity) / 100}
+    for pattern, exposure in EXPOSURE_RULES:
+        if re.search(pattern, name, re.IGNORECASE):
+            return dict(exposure)
+    # Indici azionari globali o regionali (MSCI World, S&P 500, All-World...)
+    return {'equity': 1.0}
+
+
+def exposure_matrix(isins, names):
+    """Matrice ISIN x classi di attivo con le ripartizioni di ogni ETF (`names`: ISIN -> nome)"""
+    classes = list(ASSET_CLASSES)
+    matrix = np.zeros((len(isins), len(classes)))
+    for i, isin in enumerate(isins):
+        for asset_class, share in asset_class_exposure(names[isin]).items():
+            matrix[i, classes.index(asset_class)] = share
+    return matrix
+
+
+def etf_moments(isins, names):
+    """Rendimento atteso annuo e matrice di covarianza annua degli ETF indicati (`names`: ISIN -> nome)"""
+    means, vols = (np.array(values) for values in zip(*ASSET_CLASSES.values()))
+    class_cov = CLASS_CORRELATION * np.outer(vols, vols)
+    exposure = exposure_matrix(isins, names)
+    return exposure @ means, exposure @ class_cov @ exposure.T
@@ -0,0 +1,124 @@
+"""
+Simulazione Monte Carlo dei Risultati sull'Orizzonte Minimo
+Genera centinaia di migliaia di scenari annui di rendimento degli ETF (lognormali correlati)
+e ne ricava le bande di percentili del capitale e la probabilità di perdita a scadenza
+"""
+
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+from catalog import target_weights
+from market_assumptions import etf_moments
+
+DEFAULT_PATHS = 100_000
+DEFAULT_CHUNK_SIZE = 10_000
+DEFAULT_SEED = 2024
+
+# Percentili riportati per ogni anno dell'orizzonte
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+@dataclass(frozen=True)
+class MonteCarloResult:
+    """Distribuzione simulata del capitale (base 1) anno per anno"""
+    __slots__ = ('years', 'n_paths', 'seed', 'bands', 'probability_of_loss', 'mean_final')
+
+    years: int
+    n_paths: int
+    seed: int
+    bands: np.ndarray                  # len(PERCENTILES) x (years + 1), in sola lettura
+    probability_of_loss: float         # Quota di scenari con capitale finale < 1
+    mean_final: float
+
+    def percentile(self, q):
+        """Banda di un percentile di PERCENTILES lungo l'orizzonte"""
+        return self.bands[PERCENTILES.index(q)]
+
+
+def _log_parameters(mean, cov):
+    """Media e fattore di covarianza dei log-rendimenti annui a partire da quelli aritmetici"""
+    log_mean = np.log1p(mean) - np.diag(cov) / 2
+    # Fattorizzazione tramite autovalori: ammette covarianze singolari (ETF sulla stessa classe)
+    eigenvalues, eigenvectors = np.linalg.eigh(cov)
+    factor = eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
+    return log_mean, factor
+
+
+def simulate_paths(weights, mean, cov, years, rebalanced=True, n_paths=DEFAULT_PATHS,
+                   chunk_size=DEFAULT_CHUNK_SIZE, seed=DEFAULT_SEED):
+    """
+    Capitale simulato (scenari x anni + 1, base 1) per i pesi indicati.
+    Con `rebalanced` i pesi tornano all'obiettivo ogni anno, altrimenti restano liberi
+    di derivare (buy-and-hold). Gli scenari sono generati a blocchi di `chunk_size`
+    da un unico generatore, quindi il risultato dipende dal seed ma non dalla dimensione dei blocchi
+    """
+    weights = np.asarray(weights, dtype=float)
+    log_mean, factor = _log_parameters(np.asarray(mean, dtype=float), np.asarray(cov, dtype=float))
+    rng = np.random.default_rng(seed)
+
+    wealth = np.empty((n_paths, years + 1), dtype=np.float32)
+    wealth[:, 0] = 1
+    for start in range(0, n_paths, chunk_size):
+        size = min(chunk_size, n_paths - start)
+        log_returns = log_mean + rng.standard_normal((size, years, len(weights))) @ factor.T
+        if rebalanced:
+            growth = np.cumprod(np.exp(log_returns) @ weights, axis=1)
+        else:
+            growth = np.exp(np.cumsum(log_returns, axis=1)) @ weights
+        wealth[start:start + size, 1:] = growth
+    return wealth
+
+
+def simulate_portfolio(portfolio, n_paths=DEFAULT_PATHS, chunk_size=DEFAULT_CHUNK_SIZE, seed=DEFAULT_SEED):
+    """
+    Monte Carlo di un portafoglio del catalogo sul suo orizzonte minimo (almeno un anno),
+    al netto dei TER. I portafogli ribilanciati (annuali o trimestrali) sono simulati
+    con ribilanciamento annuo, quelli senza ribilanciamento in buy-and-hold
+    """
+    weights = target_weights(portfolio)
+    isins = list(weights)
+    ters = {c.isin: c.ter / 100 for c in portfolio.components}
+    names = {c.isin: c.name for c in portfolio.components}
+    mean, cov = etf_moments(isins, names)
+    mean = mean - np.array([ters[isin] for isin in isins])
+
+    years = max(portfolio.min_years, 1)
+    wealth = simulate_paths([weights[isin] for isin in isins], mean, cov, years,
+                            rebalanced=portfolio.rebalance != 'NO', n_paths=n_paths,
+                            chunk_size=chunk_size, seed=seed)
+
+    final = wealth[:, -1]
+    # Bande in sola lettura: il risultato è immutabile e può essere condiviso tra le sessioni
+    bands = np.percentile(wealth, PERCENTILES, axis=0)
+    bands.flags.writeable = False
+    return MonteCarloResult(
+        years=years,
+        n_paths=n_paths,
+        seed=seed,
+        bands=bands,
+        probability_of_loss=float(np.mean(final < 1)),
+        mean_final=float(final.mean(dtype=np.float64)),
+    )
+
+
+def percentile_table(result):
+    """Righe (anno, percentili...) delle bande, pronte per una tabella o un grafico"""
+    rows = []
+    for year in range(result.years + 1):
+        rows.append((year,) + tuple(float(band[year]) for band in result.bands))
+    return rows
+
+
+if __name__ == "__main__":
+    import time
+
+    from catalog import iter_portfolios
+
+    for portfolio in iter_portfolios():
+        start = time.perf_counter()
+        outcome = simulate_portfolio(portfolio)
+        elapsed = time.perf_counter() - start
+        print(f"{portfolio.id:8} {outcome.years:2d} anni  mediana {outcome.percentile(50)[-1]:.2f}  "
+              f"P(perdita) {outcome.probability_of_loss:5.1%}  ({elapsed:.2f}s)")
@@ -0,0 +1,202 @@
+"""
+Frontiera Efficiente sull'Universo degli ETF del Catalogo
+Risolve in blocco i problemi media-varianza per una griglia di avversioni al rischio
+(gradiente proiettato accelerato, vincoli long-only e peso massimo per ETF), ricava i
+portafogli a varianza minima e a Sharpe massimo e colloca i portafogli modello rispetto alla frontiera
+"""
+
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtest import weight_matrix
+from catalog import get_catalog, isin_names, isin_universe, iter_portfolios, target_weights
+from covariance import get_covariance
+from market_assumptions import etf_moments
+from price_store import PRICE_DIR
+
+DEFAULT_POINTS = 40
+DEFAULT_RISK_FREE = 0.02
+
+# Avversioni al rischio della griglia: dal portafoglio a rendimento massimo a quello a varianza minima
+MIN_RISK_AVERSION = 1e-2
+MAX_RISK_AVERSION = 1e4
+
+MAX_ITERATIONS = 5_000
+TOLERANCE = 1e-9
+PROJECTION_STEPS = 40
+
+SOURCE_HISTORY = 'storico'
+SOURCE_ASSUMPTIONS = 'ipotesi'
+
+
+@dataclass(frozen=True)
+class Frontier:
+    """Punti della frontiera (ordinati per volatilità) e portafogli notevoli"""
+    __slots__ = ('isins', 'weights', 'returns', 'volatilities', 'min_variance', 'max_sharpe',
+                 'risk_free', 'cap')
+
+    isins: Tuple[str, ...]
+    weights: np.ndarray                # Punti x ISIN
+    returns: np.ndarray                # Rendimento atteso annuo di ogni punto
+    volatilities: np.ndarray
+    min_variance: int                  # Indice del punto a varianza minima
+    max_sharpe: int                    # Indice del punto a Sharpe massimo
+    risk_free: float
+    cap: float
+
+    def allocation(self, index, threshold=1e-4):
+        """Pesi di un punto della frontiera, senza le posizioni trascurabili, in ordine decrescente"""
+        weights = self.weights[index]
+        order = np.argsort(-weights, kind='stable')
+        return {self.isins[i]: float(weights[i]) for i in order if weights[i] > threshold}
+
+
+def project_capped_simplex(values, cap):
+    """
+    Proiezione euclidea di ogni riga sull'insieme {0 <= w <= cap, somma(w) = 1}:
+    si cerca per bisezione, su tutte le righe insieme, la soglia tau con somma(clip(v - tau)) = 1
+    """
+    low = values.min(axis=1, keepdims=True) - 1.0
+    high = values.max(axis=1, keepdims=True)
+    for _ in range(PROJECTION_STEPS):
+        tau = (low + high) / 2
+        too_large = np.clip(values - tau, 0, cap).sum(axis=1, keepdims=True) > 1
+        low = np.where(too_large, tau, low)
+        high = np.where(too_large, high, tau)
+    return np.clip(values - (low + high) / 2, 0, cap)
+
+
+def solve_mean_variance(mean, cov, risk_aversions, cap=1.0):
+    """
+    Massimizza mean·w - λ/2 wᵀΣw con vincoli long-only e peso massimo `cap`,
+    per tutte le avversioni λ contemporaneamente (una riga di pesi per λ).
+    Con λ = inf si ottiene il portafoglio a varianza minima
+    """
+    mean = np.asarray(mean, dtype=float)
+    cov = np.asarray(cov, dtype=float)
+    n_assets = len(mean)
+    if cap * n_assets < 1 - 1e-12:
+        raise ValueError(f"Peso massimo {cap:.0%} troppo basso per {n_assets} ETF")
+
+    aversions = np.asarray(risk_aversions, dtype=float)[:, None]
+    minimum_variance = np.isinf(aversions)
+    # Con λ infinito si minimizza solo la varianza: gradiente Σw, rendimento ignorato
+    scale = np.where(minimum_variance, 1.0, aversions)
+    linear = np.where(minimum_variance, 0.0, 1.0) * mean
+
+    lipschitz = max(np.linalg.eigvalsh(cov).max(), 1e-12)
+    step = 1.0 / (scale * lipschitz)
+
+    weights = project_capped_simplex(np.full((len(aversions), n_assets), 1.0 / n_assets), cap)
+    momentum = weights
+    t = np.ones_like(scale)
+    for _ in range(MAX_ITERATIONS):
+        gradient = scale * (momentum @ cov) - linear
+        updated = project_capped_simplex(momentum - step * gradient, cap)
+        # Gradiente proiettato (nelle unità della varianza): nullo nel punto ottimo, anche quando
+        # più allocazioni equivalenti (ETF sulla stessa classe) hanno lo stesso valore
+        residual = (np.abs(updated - momentum) * lipschitz).max()
+        if residual < TOLERANCE:
+            weights = updated
+            break
+
+        # Accelerazione di Nesterov, azzerata per le righe in cui il passo inverte direzione
+        restart = np.sum((momentum - updated) * (updated - weights), axis=1, keepdims=True) > 0
+        t = np.where(restart, 1.0, t)
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        momentum = updated + ((t - 1) / t_next) * (updated - weights)
+        weights, t = updated, t_next
+    return weights
+
+
+def efficient_frontier(mean, cov, isins, cap=1.0, n_points=DEFAULT_POINTS, risk_free=DEFAULT_RISK_FREE):
+    """Frontiera efficiente con vincoli long-only e peso massimo per ETF"""
+    mean = np.asarray(mean, dtype=float)
+    cov = np.asarray(cov, dtype=float)
+    aversions = np.append(np.geomspace(MIN_RISK_AVERSION, MAX_RISK_AVERSION, n_points), np.inf)
+    weights = solve_mean_variance(mean, cov, aversions, cap)
+
+    returns = weights @ mean
+    volatilities = np.sqrt(np.einsum('pi,ij,pj->p', weights, cov, weights).clip(0))
+    order = np.argsort(volatilities, kind='stable')
+    weights, returns, volatilities = weights[order], returns[order], volatilities[order]
+
+    # Solo i punti efficienti: rendimento crescente con la volatilità
+    efficient = returns >= np.maximum.accumulate(returns) - 1e-12
+    weights, returns, volatilities = weights[efficient], returns[efficient], volatilities[efficient]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(volatilities > 0, (returns - risk_free) / volatilities, -np.inf)
+    return Frontier(
+        isins=tuple(isins),
+        weights=weights,
+        returns=returns,
+        volatilities=volatilities,
+        min_variance=int(np.argmin(volatilities)),
+        max_sharpe=int(np.argmax(sharpe)),
+        risk_free=risk_free,
+        cap=cap,
+    )
+
+
+def portfolio_positions(frontier, mean, cov, portfolios=None):
+    """
+    Rendimento e volatilità attesi dei portafogli modello e distanza dalla frontiera:
+    `gap` è il rendimento in meno rispetto al punto di frontiera con la stessa volatilità
+    """
+    if portfolios is None:
+        portfolios = get_catalog()
+    known = set(frontier.isins)
+    covered = [p for p in iter_portfolios(portfolios) if known.issuperset(target_weights(p))]
+    weights = weight_matrix(covered, frontier.isins)
+
+    returns = weights @ mean
+    volatilities = np.sqrt(np.einsum('pi,ij,pj->p', weights, cov, weights).clip(0))
+    frontier_returns = np.interp(volatilities, frontier.volatilities, frontier.returns,
+                                 right=frontier.returns[-1])
+    return pd.DataFrame({
+        'risk_level': [p.risk_level for p in covered],
+        'volatility': volatilities,
+        'expected_return': returns,
+        'frontier_return': frontier_returns,
+        'gap': frontier_returns - returns,
+    }, index=pd.Index([p.id for p in covered], name='id'))
+
+
+def universe_moments(portfolios, root=PRICE_DIR):
+    """
+    Rendimenti attesi e covarianza annui dell'universo del catalogo indicato: dalla covarianza
+    storica in cache se l'archivio prezzi è disponibile (solo gli ISIN con stime complete),
+    altrimenti dalle ipotesi di mercato. Restituisce (isins, media, covarianza, fonte)
+    """
+    model = get_covariance(root)
+    if model is not None:
+        candidates = [isin for isin in isin_universe(portfolios) if isin in model.isins]
+        if candidates:
+            mean, cov = model.subset(candidates)
+            valid = ~np.isnan(cov).any(axis=1) & ~np.isnan(mean)
+            if valid.sum() >= 2:
+                isins = [isin for isin, ok in zip(candidates, valid) if ok]
+                mean, cov = model.subset(isins)
+                # Media logaritmica -> rendimento atteso aritmetico
+                return tuple(isins), mean + np.diag(cov) / 2, cov, SOURCE_HISTORY
+
+    isins = isin_universe(portfolios)
+    mean, cov = etf_moments(isins, isin_names(portfolios))
+    return isins, mean, cov, SOURCE_ASSUMPTIONS
+
+
+if __name__ == "__main__":
+    import time
+
+    universe, expected, covariance, source = universe_moments(get_catalog())
+    for max_weight in (1.0, 0.25, 0.10):
+        started = time.perf_counter()
+        result = efficient_frontier(expected, covariance, universe, cap=max_weight)
+        elapsed = time.perf_counter() - started
+        best = result.max_sharpe
+        print(f"cap {max_weight:.0%} ({source}): {len(result.returns)} punti in {elapsed:.3f}s - "
+              f"Sharpe max {result.returns[best]:.2%} / {result.volatilities[best]:.2%}")
@@ -381,39 +381,73 @@ def get_all_portfolios():
         'esg': ESG_PORTFOLIOS
     }
 
-def get_portfolio_by_id(portfolio_id):
-    """Cerca un portafoglio specifico per ID"""
+def _build_indexes():
+    """Costruisce gli indici di ricerca sui portafogli (una sola scansione del catalogo)"""
     all_portfolios = MULTI_PORTFOLIOS + SINGLE_PORTFOLIOS + ESG_PORTFOLIOS
+
+    by_id = {}
+    by_risk = {}
+    by_esg = {0: [], 1: []}
+    by_isin = {}
+    by_component_count = {}
+
     for portfolio in all_portfolios:
-        if portfolio['id'] == portfolio_id:
-            return portfolio
-    return None
+        by_id.setdefault(portfolio['id'], portfolio)
+        by_risk.setdefault(portfolio['risk_level'], []).append(portfolio)
+        by_esg.setdefault(portfolio['esg'], []).append(portfolio)
+        by_component_count.setdefault(len(portfolio['components']), []).append(portfolio)
+
+        # Un portafoglio compare una sola volta per ISIN anche se lo ripete
+        for isin in dict.fromkeys(comp['isin'] for comp in portfolio['components']):
+            by_isin.setdefault(isin, []).append(portfolio)
+
+    statistics = {
+        'total_portfolios': len(all_portfolios),
+        'multi_portfolios': len(MULTI_PORTFOLIOS),
+        'single_portfolios': len(SINGLE_PORTFOLIOS),
+        'esg_portfolios': len(ESG_PORTFOLIOS),
+        'risk_levels': sorted(by_risk),
+        'unique_etfs': len(by_isin)
+    }
+
+    return {
+        'by_id': by_id,
+        'by_risk': by_risk,
+        'by_esg': by_esg,
+        'by_isin': by_isin,
+        'by_component_count': by_component_count,
+        'statistics': statistics
+    }
+
+_INDEXES = _build_indexes()
+
+def rebuild_indexes():
+    """Ricostruisce gli indici dopo una modifica delle liste dei portafogli"""
+    global _INDEXES
+    _INDEXES = _build_indexes()
+
+def get_portfolio_by_id(portfolio_id):
+    """Cerca un portafoglio specifico per ID"""
+    return _INDEXES['by_id'].get(portfolio_id)
 
 def get_portfolios_by_risk(risk_level):
     """Filtra i portafogli per livello di rischio"""
-    all_portfolios = MULTI_PORTFOLIOS + SINGLE_PORTFOLIOS + ESG_PORTFOLIOS
-    return [p for p in all_portfolios if p['risk_level'] == risk_level]
+    return list(_INDEXES['by_risk'].get(risk_level, []))
 
 def get_portfolios_by_esg(esg_only=True):
     """Filtra i portafogli per criterio ESG"""
-    all_portfolios = MULTI_PORTFOLIOS + SINGLE_PORTFOLIOS + ESG_PORTFOLIOS
-    if esg_only:
-        return [p for p in all_portfolios if p['esg'] == 1]
-    else:
-        return [p for p in all_portfolios if p['esg'] == 0]
+    return list(_INDEXES['by_esg'][1 if esg_only else 0])
+
+def get_portfolios_by_isin(isin):
+    """Restituisce i portafogli che contengono un determinato ETF"""
+    return list(_INDEXES['by_isin'].get(isin, []))
+
+def get_portfolios_by_component_count(n_components):
+    """Filtra i portafogli per numero di ETF componenti"""
+    return list(_INDEXES['by_component_count'].get(n_components, []))
 
 def get_statistics():
-    """Restituisce statistiche sui portafogli disponibili"""
-    all_portfolios = MULTI_PORTFOLIOS + SINGLE_PORTFOLIOS + ESG_PORTFOLIOS
-    return {
-        'total_portfolios': len(all_portfolios),
-        'multi_portfolios': len(MULTI_PORTFOLIOS),
-        'single_portfolios': len(SINGLE_PORTFOLIOS),
-        'esg_portfolios': len(ESG_PORTFOLIOS),
-        'risk_levels': sorted(set(p['risk_level'] for p in all_portfolios)),
-        'unique_etfs': len(set(
-            comp['isin'] 
-            for p in all_portfolios 
-            for comp in p['components']
-        ))
-    }
+    """Restituisce statistiche sui portafogli disponibili (precalcolate con gli indici)"""
+    statistics = dict(_INDEXES['statistics'])
+    statistics['risk_levels'] = list(statistics['risk_levels'])
+    return statistics
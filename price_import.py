@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Importazione Massiva dei Prezzi da CSV
+Legge gli export a blocchi, converte i campi in tipi compatti, scarta le righe non valide,
+segnala i buchi nelle serie e aggiunge all'archivio solo i prezzi nuovi di ogni ISIN,
+scrivendoli a lotti per non tenere in memoria l'intero export.
+I portafogli che contengono gli ISIN aggiornati vengono indicati come da ricalcolare
+
+Formati accettati:
+    lungo:  date,isin,price            (una riga per data e ISIN)
+    largo:  date,IE00BFY0GT14,...      (una colonna di prezzi per ISIN)
+
+Uso:
+    python price_import.py export_2024.csv export_2025.csv --chunk-size 250000 --flush-rows 1000000
+"""
+
+import argparse
+import re
+import sys
+import time
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from portfolios_data import get_portfolios_by_isin
+from price_store import DATE_DTYPE, PRICE_DIR, PRICE_DTYPE, append_series, open_store
+
+DEFAULT_CHUNK_SIZE = 250_000
+
+# Righe nuove accumulate al massimo prima di scriverle nell'archivio (controllato a fine blocco)
+DEFAULT_FLUSH_ROWS = 1_000_000
+
+# Distanza massima tra due prezzi consecutivi oltre la quale si segnala un buco (giorni di calendario)
+MAX_GAP_DAYS = 7
+
+# Colonne del formato lungo
+DATE_COLUMN = 'date'
+ISIN_COLUMN = 'isin'
+PRICE_COLUMN = 'price'
+
+_ISIN_PATTERN = re.compile(r'^[A-Z]{2}[A-Z0-9]{9}[0-9]$')
+
+
+@dataclass(frozen=True)
+class ImportReport:
+    """Esito di un'importazione"""
+    __slots__ = ('rows_read', 'rows_appended', 'rows_existing', 'invalid_rows', 'duplicates',
+                 'gaps', 'updated_isins', 'stale_portfolios', 'version')
+
+    rows_read: int
+    rows_appended: int
+    rows_existing: int                 # Righe con date già presenti nell'archivio
+    invalid_rows: int                  # Date, ISIN o prezzi non validi
+    duplicates: int                    # Stessa data e ISIN ripetuti (vale l'ultima riga)
+    gaps: Tuple[Tuple[str, str, str], ...]   # (ISIN, ultima data prima del buco, data successiva)
+    updated_isins: Tuple[str, ...]
+    stale_portfolios: Tuple[str, ...]  # ID dei portafogli con almeno un ISIN aggiornato
+    version: str
+
+
+def normalize_chunk(chunk, date_format='%Y-%m-%d', decimal='.'):
+    """
+    Converte un blocco grezzo nel formato lungo compatto: date datetime64[D],
+    ISIN maiuscoli, prezzi float32. Restituisce (blocco, righe scartate)
+    """
+    chunk = chunk.rename(columns=str.strip)
+    lower = {column.lower(): column for column in chunk.columns}
+    if ISIN_COLUMN in lower:
+        long = pd.DataFrame({
+            'date': chunk[lower[DATE_COLUMN]],
+            'isin': chunk[lower[ISIN_COLUMN]],
+            'price': chunk[lower[PRICE_COLUMN]],
+        })
+    else:
+        # Formato largo: la prima colonna contiene le date, le altre i prezzi per ISIN
+        date_column = chunk.columns[0]
+        long = chunk.melt(id_vars=[date_column], var_name='isin', value_name='price')
+        long = long.rename(columns={date_column: 'date'}).dropna(subset=['price'])
+
+    prices = long['price']
+    if not pd.api.types.is_numeric_dtype(prices):
+        # Colonna con valori non numerici: il parser CSV l'ha lasciata come testo
+        prices = prices.astype(str).str.strip().str.replace(decimal, '.', regex=False)
+        prices = pd.to_numeric(prices, errors='coerce')
+    prices = prices.to_numpy(dtype=np.float64)
+    dates = pd.to_datetime(long['date'], format=date_format, errors='coerce').to_numpy().astype(DATE_DTYPE)
+    isins = long['isin'].astype(str).str.strip().str.upper()
+
+    valid = ~np.isnat(dates) & np.isfinite(prices) & (prices > 0) & isins.str.match(_ISIN_PATTERN).to_numpy()
+    frame = pd.DataFrame({
+        'date': dates[valid],
+        'isin': isins[valid].astype('category').to_numpy(),
+        'price': prices[valid].astype(PRICE_DTYPE),
+    })
+    return frame, int((~valid).sum())
+
+
+def read_price_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE, sep=',', decimal='.', date_format='%Y-%m-%d'):
+    """Itera un export CSV (percorso o stream) a blocchi normalizzati, senza caricarlo tutto"""
+    dtypes = {DATE_COLUMN: str, ISIN_COLUMN: str}
+    with pd.read_csv(source, sep=sep, decimal=decimal, dtype=dtypes, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            yield normalize_chunk(chunk, date_format=date_format, decimal=decimal)
+
+
+def _last_dates(store):
+    """Data dell'ultimo prezzo valido di ogni ISIN già in archivio"""
+    last = {}
+    if store is None:
+        return last
+    for isin in store.isins:
+        filled = np.flatnonzero(~np.isnan(store.series(isin)))
+        if len(filled):
+            last[isin] = store.dates[filled[-1]]
+    return last
+
+
+def _deduplicate(dates, prices):
+    """Ordina per data e tiene l'ultima occorrenza di ogni data"""
+    order = np.argsort(dates, kind='stable')
+    dates, prices = dates[order], prices[order]
+    keep = np.ones(len(dates), dtype=bool)
+    keep[:-1] = dates[1:] != dates[:-1]
+    return dates[keep], prices[keep]
+
+
+def _find_gaps(isin, dates, previous):
+    """Buchi più lunghi di MAX_GAP_DAYS, incluso quello rispetto all'ultimo prezzo in archivio"""
+    if previous is not None:
+        dates = np.concatenate([[previous], dates])
+    steps = np.flatnonzero(np.diff(dates).astype(np.int64) > MAX_GAP_DAYS)
+    return [(isin, str(dates[i]), str(dates[i + 1])) for i in steps]
+
+
+def stale_portfolios(isins):
+    """ID dei portafogli del catalogo che contengono almeno uno degli ISIN indicati"""
+    return tuple(sorted({p['id'] for isin in isins for p in get_portfolios_by_isin(isin)}))
+
+
+def _flush(pending, last, root):
+    """
+    Deduplica le righe accumulate per ISIN, cerca i buchi rispetto all'ultima data nota
+    e le aggiunge all'archivio. Aggiorna `last` con l'ultima data scritta di ogni ISIN.
+    Restituisce (aggiornamenti, duplicati, buchi, manifest)
+    """
+    updates, gaps = {}, []
+    duplicates = 0
+    for isin, parts in sorted(pending.items()):
+        dates, prices = _deduplicate(np.concatenate([d for d, _ in parts]), np.concatenate([p for _, p in parts]))
+        duplicates += sum(len(d) for d, _ in parts) - len(dates)
+        gaps.extend(_find_gaps(isin, dates, last.get(isin)))
+        updates[isin] = (dates, prices)
+
+    manifest = append_series(updates, root)
+    last.update({isin: dates[-1] for isin, (dates, _) in updates.items()})
+    return updates, duplicates, gaps, manifest
+
+
+def import_prices(sources, root=PRICE_DIR, chunk_size=DEFAULT_CHUNK_SIZE, sep=',', decimal='.',
+                  date_format='%Y-%m-%d', flush_rows=DEFAULT_FLUSH_ROWS, progress=None):
+    """
+    Importa uno o più export nell'archivio prezzi. Per ogni ISIN vengono tenute solo
+    le righe successive all'ultimo prezzo già presente, quindi reimportare lo stesso file
+    non cambia nulla (né la versione dell'archivio né i portafogli da ricalcolare).
+    Le righe nuove vengono scritte appena superano `flush_rows`: da lì in poi una riga
+    con data non successiva all'ultima scritta per il suo ISIN conta come già presente
+    """
+    store = open_store(root)
+    last = _last_dates(store)
+    pending = {}
+    buffered = rows_read = invalid_rows = rows_existing = rows_appended = duplicates = 0
+    gaps, updated = [], set()
+    start = time.perf_counter()
+
+    def write_pending():
+        nonlocal buffered, rows_appended, duplicates
+        updates, n_duplicates, new_gaps, manifest = _flush(pending, last, root)
+        rows_appended += sum(len(dates) for dates, _ in updates.values())
+        duplicates += n_duplicates
+        gaps.extend(new_gaps)
+        updated.update(updates)
+        pending.clear()
+        buffered = 0
+        return manifest
+
+    for source in sources:
+        for frame, n_invalid in read_price_chunks(source, chunk_size, sep=sep, decimal=decimal,
+                                                  date_format=date_format):
+            rows_read += len(frame) + n_invalid
+            invalid_rows += n_invalid
+            dates = frame['date'].to_numpy().astype(DATE_DTYPE)
+            prices = frame['price'].to_numpy()
+            for isin, rows in frame.groupby('isin', observed=True, sort=False).indices.items():
+                chunk_dates = dates[rows]
+                if isin in last:
+                    fresh = chunk_dates > last[isin]
+                    rows_existing += int((~fresh).sum())
+                    rows = rows[fresh]
+                    chunk_dates = chunk_dates[fresh]
+                if len(rows):
+                    pending.setdefault(isin, []).append((chunk_dates, prices[rows]))
+                    buffered += len(rows)
+            if buffered >= flush_rows:
+                write_pending()
+            if progress:
+                elapsed = time.perf_counter() - start
+                progress(f"📥 {rows_read:,} righe lette - {rows_read / max(elapsed, 1e-9):,.0f} righe/s")
+
+    # Ultimo lotto (anche vuoto: restituisce il manifest corrente)
+    manifest = write_pending()
+    return ImportReport(
+        rows_read=rows_read,
+        rows_appended=rows_appended,
+        rows_existing=rows_existing,
+        invalid_rows=invalid_rows,
+        duplicates=duplicates,
+        gaps=tuple(gaps),
+        updated_isins=tuple(sorted(updated)),
+        stale_portfolios=stale_portfolios(updated),
+        version=manifest.get('version', ''),
+    )
+
+
+def parse_args(argv=None):
+    """Argomenti da riga di comando"""
+    parser = argparse.ArgumentParser(description="Importazione dei prezzi giornalieri nell'archivio locale")
+    parser.add_argument('inputs', nargs='+', help="File CSV da importare ('-' per stdin)")
+    parser.add_argument('--store', default=PRICE_DIR, help="Directory dell'archivio prezzi")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Righe per blocco")
+    parser.add_argument('--flush-rows', type=int, default=DEFAULT_FLUSH_ROWS,
+                        help="Righe nuove accumulate prima di scriverle nell'archivio")
+    parser.add_argument('--sep', default=',', help="Separatore di campo")
+    parser.add_argument('--decimal', default='.', help="Separatore decimale dei prezzi")
+    parser.add_argument('--date-format', default='%Y-%m-%d', help="Formato delle date (strftime)")
+    parser.add_argument('--quiet', action='store_true', help="Non mostrare l'avanzamento")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Punto di ingresso della CLI"""
+    args = parse_args(argv)
+
+    def progress(message):
+        print(message, file=sys.stderr, flush=True)
+
+    sources = [sys.stdin if path == '-' else path for path in args.inputs]
+    report = import_prices(sources, root=args.store, chunk_size=args.chunk_size, sep=args.sep,
+                           decimal=args.decimal, date_format=args.date_format, flush_rows=args.flush_rows,
+                           progress=None if args.quiet else progress)
+
+    print(f"✅ {report.rows_appended:,} nuovi prezzi per {len(report.updated_isins)} ISIN "
+          f"({report.rows_existing:,} già presenti, {report.invalid_rows:,} non validi, "
+          f"{report.duplicates:,} duplicati)", file=sys.stderr)
+    for isin, before, after in report.gaps:
+        print(f"⚠️ {isin}: nessun prezzo tra {before} e {after}", file=sys.stderr)
+    if report.stale_portfolios:
+        print(f"🔄 Portafogli da ricalcolare: {', '.join(report.stale_portfolios)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
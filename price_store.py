@@ -0,0 +1,309 @@
+"""
+Archivio Locale dei Prezzi Giornalieri
+Un file binario contiguo per ISIN (float32) e un indice di date condiviso, aperti
+in memory mapping: le serie si leggono e si affettano senza copie né parsing.
+Un manifest JSON registra lunghezze e versione: i lettori vedono solo i dati che dichiara
+"""
+
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Directory predefinita dell'archivio
+PRICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prices')
+
+MANIFEST_NAME = 'manifest.json'
+DATES_NAME = 'dates.bin'
+SERIES_SUFFIX = '.f32'
+
+DATE_DTYPE = np.dtype('<M8[D]')
+PRICE_DTYPE = np.dtype('<f4')
+
+_ISIN_PATTERN = re.compile(r'^[A-Z]{2}[A-Z0-9]{9}[0-9]$')
+
+
+def _series_path(root, isin):
+    return os.path.join(root, f'{isin}{SERIES_SUFFIX}')
+
+
+def _version(manifest):
+    """Impronta del manifest: cambia ad ogni scrittura, anche a parità di dimensioni"""
+    payload = json.dumps({k: manifest[k] for k in ('revision', 'n_dates', 'lengths')}, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def _write_manifest(root, n_dates, lengths, modified, revision):
+    """Scrive il manifest in modo atomico: i lettori vedono la versione vecchia o quella nuova"""
+    manifest = {
+        'revision': revision,
+        'n_dates': n_dates,
+        'lengths': dict(sorted(lengths.items())),
+        'modified': dict(sorted(modified.items())),
+    }
+    manifest['version'] = _version(manifest)
+    tmp_path = os.path.join(root, f'{MANIFEST_NAME}.{os.getpid()}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, os.path.join(root, MANIFEST_NAME))
+    return manifest
+
+
+def _previous_manifest(root):
+    """Manifest corrente, o uno vuoto se l'archivio non esiste ancora"""
+    try:
+        return read_manifest(root)
+    except FileNotFoundError:
+        return {'revision': 0, 'n_dates': 0, 'lengths': {}, 'modified': {}}
+
+
+def read_manifest(root=PRICE_DIR):
+    """Manifest dell'archivio (FileNotFoundError se l'archivio non esiste)"""
+    with open(os.path.join(root, MANIFEST_NAME), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def store_version(root=PRICE_DIR):
+    """Versione corrente dell'archivio, None se l'archivio non esiste"""
+    try:
+        return read_manifest(root)['version']
+    except FileNotFoundError:
+        return None
+
+
+def validate_dates(dates):
+    """Converte le date in datetime64[D] verificando che siano strettamente crescenti"""
+    dates = np.asarray(dates, dtype=DATE_DTYPE)
+    if np.isnat(dates).any():
+        raise ValueError("Indice delle date con valori mancanti")
+    if len(dates) > 1 and not (dates[1:] > dates[:-1]).all():
+        raise ValueError("Le date devono essere strettamente crescenti e senza duplicati")
+    return dates
+
+
+def validate_isin(isin):
+    """Verifica il formato di un ISIN (usato anche come nome di file)"""
+    if not _ISIN_PATTERN.match(isin):
+        raise ValueError(f"ISIN '{isin}' non valido")
+    return isin
+
+
+def write_store(dates, series, root=PRICE_DIR, unchanged=()):
+    """
+    Crea o sostituisce interamente l'archivio. `series` associa ad ogni ISIN i prezzi
+    allineati alle prime date dell'indice (una serie può essere più corta dell'indice:
+    i giorni finali mancanti valgono NaN). Ogni file viene sostituito in modo atomico,
+    quindi i lettori già aperti continuano a vedere i dati precedenti.
+    Gli ISIN in `unchanged` hanno gli stessi prezzi di prima e conservano la loro revisione
+    """
+    dates = validate_dates(dates)
+    os.makedirs(root, exist_ok=True)
+    previous = _previous_manifest(root)
+    revision = previous['revision'] + 1
+
+    lengths = {}
+    for isin, values in series.items():
+        validate_isin(isin)
+        values = np.asarray(values, dtype=PRICE_DTYPE)
+        if values.ndim != 1 or len(values) > len(dates):
+            raise ValueError(f"Serie {isin} più lunga dell'indice delle date")
+        path = _series_path(root, isin)
+        values.tofile(f'{path}.tmp')
+        os.replace(f'{path}.tmp', path)
+        lengths[isin] = len(values)
+
+    dates_path = os.path.join(root, DATES_NAME)
+    dates.tofile(f'{dates_path}.tmp')
+    os.replace(f'{dates_path}.tmp', dates_path)
+
+    modified = {isin: previous['modified'].get(isin, revision) if isin in unchanged else revision
+                for isin in lengths}
+    manifest = _write_manifest(root, len(dates), lengths, modified, revision)
+
+    # Serie non più presenti (i lettori che le hanno già mappate le conservano fino alla chiusura)
+    for isin in set(previous['lengths']) - set(lengths):
+        try:
+            os.remove(_series_path(root, isin))
+        except FileNotFoundError:
+            pass
+    return manifest
+
+
+def _write_at(path, values, offset):
+    """
+    Scrive `values` a partire dall'elemento `offset` e tronca il resto del file
+    (elimina eventuali code di scritture interrotte prima dell'aggiornamento del manifest)
+    """
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+        f.seek(offset * values.itemsize)
+        values.tofile(f)
+        f.truncate()
+
+
+def append_series(updates, root=PRICE_DIR):
+    """
+    Aggiunge nuovi prezzi all'archivio. `updates` associa ad ogni ISIN una coppia
+    (date crescenti, prezzi) successive all'ultimo prezzo già presente per quell'ISIN.
+    Nuove date in coda all'indice e nuovi prezzi in coda alle serie vengono scritti
+    sul posto: i lettori già aperti non li vedono finché non rileggono il manifest.
+    Se una data cade dentro l'indice senza esservi presente, l'archivio viene riscritto
+    """
+    previous = _previous_manifest(root)
+    updates = {validate_isin(isin): (validate_dates(dates), np.asarray(values, dtype=PRICE_DTYPE))
+               for isin, (dates, values) in updates.items()}
+    if not updates:
+        return previous
+    incoming = np.unique(np.concatenate([dates for dates, _ in updates.values()]))
+
+    store = PriceStore(root, previous) if previous['revision'] else None
+    index = np.asarray(store.dates) if store else np.empty(0, dtype=DATE_DTYPE)
+    inside = incoming[incoming <= index[-1]] if len(index) else incoming[:0]
+    if not np.isin(inside, index).all():
+        return _rebuild(store, index, incoming, updates, root)
+
+    os.makedirs(root, exist_ok=True)
+    extra = incoming[len(inside):]
+    new_index = np.concatenate([index, extra])
+    lengths = dict(previous['lengths'])
+    for isin, (dates, values) in updates.items():
+        positions = np.searchsorted(new_index, dates)
+        start = lengths.get(isin, 0)
+        if len(positions) == 0:
+            continue
+        if positions[0] < start:
+            raise ValueError(f"Serie {isin}: i nuovi prezzi sovrascriverebbero date già presenti")
+        block = np.full(positions[-1] + 1 - start, np.nan, dtype=PRICE_DTYPE)
+        block[positions - start] = values
+        if isin not in lengths and os.path.exists(_series_path(root, isin)):
+            os.remove(_series_path(root, isin))
+        _write_at(_series_path(root, isin), block, start)
+        lengths[isin] = int(positions[-1]) + 1
+
+    _write_at(os.path.join(root, DATES_NAME), extra, len(index))
+
+    revision = previous['revision'] + 1
+    modified = dict(previous['modified'])
+    modified.update({isin: revision for isin, (dates, _) in updates.items() if len(dates)})
+    return _write_manifest(root, len(new_index), lengths, modified, revision)
+
+
+def _rebuild(store, index, incoming, updates, root):
+    """Riscrittura completa con un indice che include date intermedie mancanti"""
+    new_index = np.union1d(index, incoming)
+    positions = np.searchsorted(new_index, index)
+    series = {}
+    for isin in (store.isins if store else ()):
+        values = np.full(len(new_index), np.nan, dtype=PRICE_DTYPE)
+        values[positions] = store.column(isin)
+        series[isin] = values
+    for isin, (dates, values) in updates.items():
+        column = series.setdefault(isin, np.full(len(new_index), np.nan, dtype=PRICE_DTYPE))
+        column[np.searchsorted(new_index, dates)] = values
+    unchanged = set(series) - {isin for isin, (dates, _) in updates.items() if len(dates)}
+    return write_store(new_index, series, root, unchanged=unchanged)
+
+
+def _memmap(path, dtype, length):
+    """Mappa in sola lettura i primi `length` elementi di un file (vuoto se length è 0)"""
+    if length == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(length,))
+
+
+class PriceStore:
+    """
+    Vista in sola lettura di una versione dell'archivio. L'apertura legge solo il manifest
+    e mappa l'indice delle date; le serie vengono mappate al primo accesso.
+    Condivisibile tra processi: viene serializzata come percorso e riaperta nel worker
+    """
+    __slots__ = ('root', 'version', 'dates', '_lengths', '_modified', '_series')
+
+    def __init__(self, root, manifest):
+        self.root = root
+        self.version = manifest['version']
+        self.dates = _memmap(os.path.join(root, DATES_NAME), DATE_DTYPE, manifest['n_dates'])
+        self._lengths = manifest['lengths']
+        self._modified = manifest['modified']
+        self._series = {}
+
+    @classmethod
+    def open(cls, root=PRICE_DIR):
+        """Apre l'archivio alla versione corrente del manifest"""
+        return cls(root, read_manifest(root))
+
+    def __reduce__(self):
+        return PriceStore.open, (self.root,)
+
+    def __contains__(self, isin):
+        return isin in self._lengths
+
+    def __len__(self):
+        return len(self._lengths)
+
+    @property
+    def isins(self):
+        """ISIN presenti nell'archivio, in ordine alfabetico"""
+        return tuple(self._lengths)
+
+    def revision(self, isin):
+        """Revisione dell'archivio in cui la serie di un ISIN è cambiata l'ultima volta"""
+        return self._modified.get(isin)
+
+    def data_version(self, isins):
+        """
+        Impronta dei soli ISIN indicati: resta invariata finché nessuna delle loro serie
+        cambia, quindi le analisi di un portafoglio vanno ricalcolate solo quando serve
+        """
+        payload = repr([(isin, self._modified.get(isin)) for isin in sorted(isins)])
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+    def series(self, isin):
+        """Prezzi grezzi mappati (senza copia), lunghi al più quanto l'indice delle date"""
+        values = self._series.get(isin)
+        if values is None:
+            if isin not in self._lengths:
+                raise KeyError(f"ISIN {isin} non presente nell'archivio prezzi")
+            values = _memmap(_series_path(self.root, isin), PRICE_DTYPE, self._lengths[isin])
+            self._series[isin] = values
+        return values
+
+    def window(self, start=None, end=None):
+        """Intervallo di posizioni dell'indice tra due date incluse"""
+        first = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(start, 'D'), side='left'))
+        last = len(self.dates) if end is None else int(np.searchsorted(self.dates, np.datetime64(end, 'D'), side='right'))
+        return slice(first, last)
+
+    def column(self, isin, start=None, end=None):
+        """
+        Prezzi di un ISIN allineati all'indice nell'intervallo richiesto: una vista
+        sul file se la serie copre tutto l'intervallo, altrimenti una copia con NaN finali
+        """
+        window = self.window(start, end)
+        values = self.series(isin)[window]
+        expected = window.stop - window.start
+        if len(values) == expected:
+            return values
+        padded = np.full(expected, np.nan, dtype=PRICE_DTYPE)
+        padded[:len(values)] = values
+        return padded
+
+    def frame(self, isins=None, start=None, end=None):
+        """DataFrame date x ISIN (float32) per il backtest e le analisi"""
+        isins = self.isins if isins is None else list(isins)
+        window = self.window(start, end)
+        return pd.DataFrame(
+            {isin: self.column(isin, start, end) for isin in isins},
+            index=pd.DatetimeIndex(self.dates[window], name='date'),
+            columns=isins,
+        )
+
+
+def open_store(root=PRICE_DIR):
+    """Apre l'archivio se esiste, altrimenti None"""
+    try:
+        return PriceStore.open(root)
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,297 @@
+"""
+Profilazione delle Esecuzioni dell'App
+Misura durata e picco di memoria (tracemalloc) di ogni fase di un'esecuzione dello script,
+opzionalmente con un dump cProfile, e aggiunge il risultato a un log JSONL.
+Le fasi sono registrate sull'esecuzione attiva del thread corrente (una per sessione Streamlit):
+senza un'esecuzione attiva `phase` non misura nulla e non ha costi.
+tracemalloc traccia tutto il processo: il picco di una fase include le allocazioni delle
+altre sessioni nello stesso intervallo, quindi è riportato come picco di processo
+(`process_peak_kb`) insieme al numero di esecuzioni profilate sovrapposte
+"""
+
+import contextlib
+import cProfile
+import glob
+import hmac
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+# Directory dei log e dei dump (la stessa cache della tabella delle risposte)
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+PROFILE_LOG = os.path.join(PROFILE_DIR, 'profile.jsonl')
+
+# Variabile d'ambiente che attiva la profilazione per tutte le sessioni
+PROFILE_ENV = 'PORTFOLIO_PROFILE'
+
+# Variabile d'ambiente con il token che attiva la profilazione per una sessione (?debug=<token>);
+# senza token il parametro dell'URL è ignorato
+DEBUG_TOKEN_ENV = 'PORTFOLIO_DEBUG_TOKEN'
+
+# Oltre questa dimensione il log passa a profile.jsonl.1 (sostituendo il precedente)
+MAX_LOG_BYTES = 5 * 1024 * 1024
+
+# Dump cProfile conservati: i più vecchi vengono rimossi
+MAX_PROFILE_DUMPS = 20
+
+# Funzioni riportate nel riepilogo cProfile
+TOP_FUNCTIONS = 15
+
+_local = threading.local()
+_log_lock = threading.Lock()
+
+# Esecuzioni che misurano la memoria in tutto il processo; tracemalloc è attivo finché ce n'è
+# almeno una, e viene fermato solo se è stato avviato da qui
+_tracing_lock = threading.Lock()
+_tracing_runs = set()
+_tracing_started = False
+
+
+def profiling_enabled_by_env():
+    """True se la profilazione è attivata per tutte le sessioni dalla variabile d'ambiente"""
+    return os.environ.get(PROFILE_ENV, '').lower() in ('1', 'true', 'yes')
+
+
+def debug_token_matches(value):
+    """True se `value` (il parametro ?debug= dell'URL) coincide con il token configurato"""
+    token = os.environ.get(DEBUG_TOKEN_ENV, '')
+    if not token or not value:
+        return False
+    return hmac.compare_digest(str(value).encode('utf-8'), token.encode('utf-8'))
+
+
+def _acquire_tracing(profiler):
+    """
+    Avvia tracemalloc per la prima esecuzione che misura la memoria e conta le
+    sovrapposizioni: ogni esecuzione attiva ne vede una in più, la nuova vede tutte le attive
+    """
+    global _tracing_started
+    with _tracing_lock:
+        if not _tracing_runs and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started = True
+        for other in _tracing_runs:
+            other.overlapping += 1
+        profiler.overlapping = len(_tracing_runs)
+        _tracing_runs.add(profiler)
+
+
+def _release_tracing(profiler):
+    """Ferma tracemalloc all'uscita dell'ultima esecuzione, se era stato avviato da qui"""
+    global _tracing_started
+    with _tracing_lock:
+        _tracing_runs.discard(profiler)
+        if not _tracing_runs and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+class RerunProfiler:
+    """
+    Fasi di una singola esecuzione: durata, picco di memoria del processo e numero di chiamate.
+    `overlapping` conta le altre esecuzioni profilate in corso nello stesso intervallo
+    """
+    __slots__ = ('label', 'memory', 'phases', 'record', 'overlapping', '_started', '_profile', '_stack')
+
+    def __init__(self, label, memory=True, profile=False):
+        self.label = label
+        self.memory = memory
+        self.phases = {}
+        self.record = None
+        self.overlapping = 0
+        self._stack = []
+        self._profile = None
+        if memory:
+            # Condiviso con le esecuzioni profilate delle altre sessioni ancora in corso
+            _acquire_tracing(self)
+        if profile:
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:
+                # Un solo profiler alla volta per processo: un'altra sessione lo sta usando
+                self._profile = None
+        self._started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Misura una fase; le fasi annidate contribuiscono al picco di quella esterna.
+        reset_peak agisce su tutto il processo, quindi con più esecuzioni profilate
+        in parallelo i picchi si mescolano: vanno letti insieme a `overlapping`
+        """
+        frame = {'peak': 0}
+        start_memory = 0
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            start_memory = current
+        self._stack.append(frame)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._stack.pop()
+            peak = 0
+            if self.memory:
+                peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                if self._stack:
+                    self._stack[-1]['peak'] = max(self._stack[-1]['peak'], peak)
+            stats = self.phases.setdefault(name, {'seconds': 0.0, 'process_peak_kb': 0.0, 'calls': 0})
+            stats['seconds'] += elapsed
+            stats['process_peak_kb'] = max(stats['process_peak_kb'], max(peak - start_memory, 0) / 1024)
+            stats['calls'] += 1
+
+    def finish(self, dump_dir=PROFILE_DIR):
+        """Chiude l'esecuzione e ne restituisce il record (salvando l'eventuale dump cProfile)"""
+        total = time.perf_counter() - self._started
+        record = {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'label': self.label,
+            'total_seconds': round(total, 6),
+            'phases': {name: {'seconds': round(stats['seconds'], 6),
+                              'process_peak_kb': round(stats['process_peak_kb'], 1),
+                              'calls': stats['calls']}
+                       for name, stats in self.phases.items()},
+        }
+        if self.memory:
+            record['process_traced_kb'] = round(tracemalloc.get_traced_memory()[0] / 1024, 1)
+            record['overlapping_runs'] = self.overlapping
+            _release_tracing(self)
+        if self._profile is not None:
+            self._profile.disable()
+            record['profile'] = _dump_profile(self._profile, self.label, dump_dir)
+            record['top_functions'] = top_functions(self._profile)
+        self.record = record
+        return record
+
+
+def _dump_profile(profile, label, dump_dir):
+    """
+    Salva il dump cProfile (leggibile con pstats o snakeviz), conservando solo gli ultimi
+    MAX_PROFILE_DUMPS. None se la directory non è scrivibile
+    """
+    path = os.path.join(dump_dir, f'profile_{label}_{time.strftime("%Y%m%d_%H%M%S")}_{os.getpid()}.prof')
+    try:
+        os.makedirs(dump_dir, exist_ok=True)
+        profile.dump_stats(path)
+        dumps = sorted(glob.glob(os.path.join(dump_dir, 'profile_*.prof')), key=os.path.getmtime)
+        for old in dumps[:-MAX_PROFILE_DUMPS]:
+            os.remove(old)
+    except OSError:
+        return None
+    return path
+
+
+def top_functions(profile, limit=TOP_FUNCTIONS):
+    """Funzioni con il tempo cumulato più alto: (funzione, chiamate, tempo proprio, tempo cumulato)"""
+    stats = pstats.Stats(profile).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        [f"{os.path.basename(filename)}:{line}({function})", calls, round(own, 6), round(cumulative, 6)]
+        for (filename, line, function), (_, calls, own, cumulative, _) in rows
+    ]
+
+
+def active_profiler():
+    """Profiler dell'esecuzione in corso nel thread corrente, se presente"""
+    return getattr(_local, 'profiler', None)
+
+
+def phase(name):
+    """Misura una fase dell'esecuzione attiva; senza esecuzione attiva non fa nulla"""
+    profiler = active_profiler()
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.phase(name)
+
+
+def append_log(record, path=PROFILE_LOG, max_bytes=MAX_LOG_BYTES):
+    """
+    Aggiunge un record al log JSONL; oltre `max_bytes` il log corrente diventa `path`.1
+    e se ne inizia uno nuovo. Ignora le directory in sola lettura
+    """
+    line = json.dumps(record, ensure_ascii=False)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with _log_lock:
+            if os.path.exists(path) and os.path.getsize(path) >= max_bytes:
+                os.replace(path, f'{path}.1')
+            with open(path, 'a', encoding='utf-8') as log:
+                log.write(line + '\n')
+    except OSError:
+        pass
+
+
+def read_log(path=PROFILE_LOG):
+    """Record del log JSONL, dal più vecchio"""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as log:
+        return [json.loads(line) for line in log if line.strip()]
+
+
+@contextlib.contextmanager
+def profile_rerun(label, enabled=True, memory=True, profile=False, log_path=PROFILE_LOG):
+    """
+    Esecuzione profilata. Se nel thread è già attiva un'esecuzione (ad esempio un fragment
+    chiamato da main) si restituisce quella, e le fasi confluiscono nel suo record.
+    Restituisce il profiler (None se disattivato); il record è in `profiler.record` all'uscita
+    """
+    if not enabled:
+        yield None
+        return
+    if active_profiler() is not None:
+        yield active_profiler()
+        return
+
+    profiler = RerunProfiler(label, memory=memory, profile=profile)
+    _local.profiler = profiler
+    try:
+        yield profiler
+    finally:
+        _local.profiler = None
+        record = profiler.finish(os.path.dirname(log_path) if log_path else PROFILE_DIR)
+        if log_path:
+            append_log(record, log_path)
+
+
+def summarize_log(records):
+    """
+    Durata media e massima e picco di processo per fase su più record, dalla fase più costosa.
+    I record precedenti all'etichetta di processo riportano il picco come `peak_kb`
+    """
+    totals = {}
+    for record in records:
+        for name, stats in record['phases'].items():
+            entry = totals.setdefault(name, {'runs': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'process_peak_kb': 0.0})
+            entry['runs'] += 1
+            entry['seconds'] += stats['seconds']
+            entry['max_seconds'] = max(entry['max_seconds'], stats['seconds'])
+            peak = stats.get('process_peak_kb', stats.get('peak_kb', 0.0))
+            entry['process_peak_kb'] = max(entry['process_peak_kb'], peak)
+    rows = [{'phase': name, 'runs': entry['runs'], 'mean_ms': entry['seconds'] / entry['runs'] * 1000,
+             'max_ms': entry['max_seconds'] * 1000, 'process_peak_kb': entry['process_peak_kb']}
+            for name, entry in totals.items()]
+    return sorted(rows, key=lambda row: row['mean_ms'] * row['runs'], reverse=True)
+
+
+if __name__ == "__main__":
+    import sys
+
+    log = sys.argv[1] if len(sys.argv) > 1 else PROFILE_LOG
+    entries = read_log(log)
+    if not entries:
+        print(f"Nessun record in {log}: avvia l'app con {PROFILE_ENV}=1 o con ?debug=<{DEBUG_TOKEN_ENV}>")
+        sys.exit(1)
+    print(f"{len(entries)} esecuzioni in {log} (picchi di memoria dell'intero processo)")
+    for row in summarize_log(entries):
+        print(f"{row['phase']:28} {row['runs']:6} esecuzioni  media {row['mean_ms']:9.2f} ms  "
+              f"max {row['max_ms']:9.2f} ms  picco processo {row['process_peak_kb']:10.1f} KB")
@@ -0,0 +1,88 @@
+"""
+Indice per Intervalli dei Filtri Numerici
+Precalcola per ogni portafoglio del catalogo colonne numeriche (TER ponderato, quote di
+azioni, obbligazioni e oro lette da exposures, orizzonte minimo in anni) e le conserva
+ordinate: una condizione "valore tra a e b" si risolve con due ricerche binarie sull'array ordinato e restituisce il
+bitset dei portafogli selezionati, combinabile con quelli di filter_index
+"""
+
+import numpy as np
+
+from catalog import iter_portfolios
+from exposures import get_exposure_model
+
+# Fattori di exposures sommati in ogni quota
+SHARE_CLASSES = {
+    'equity': ('equity', 'equity_em'),
+    'bond': ('bond', 'inflation_linked', 'short_bond'),
+    'gold': ('gold',),
+}
+
+# Colonne dell'indice
+COLUMNS = ('ter', 'equity', 'bond', 'gold', 'horizon')
+
+_last_index = None
+
+
+def catalog_columns(catalog):
+    """Valori delle colonne dell'indice per tutti i portafogli, nell'ordine di iter_portfolios"""
+    model = get_exposure_model(catalog)
+    portfolios = iter_portfolios(catalog)
+    columns = {share: sum(model.column(asset_class) for asset_class in classes) * 100
+               for share, classes in SHARE_CLASSES.items()}
+    columns['ter'] = np.array([p.weighted_ter for p in portfolios], dtype=float)
+    columns['horizon'] = np.array([p.min_years for p in portfolios], dtype=float)
+    return columns
+
+
+class RangeIndex:
+    """Colonne numeriche ordinate di un catalogo compilato"""
+    __slots__ = ('catalog', 'size', 'values', 'sorted_values', 'sorted_positions')
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        columns = catalog_columns(catalog)
+        self.size = len(iter_portfolios(catalog))
+        self.values = {}
+        self.sorted_values = {}
+        self.sorted_positions = {}
+        for column in COLUMNS:
+            # Arrotondati: le somme ponderate non devono sforare di un'inezia gli estremi degli slider
+            values = np.round(columns[column], 6)
+            order = np.argsort(values, kind='stable')
+            self.values[column] = values
+            self.sorted_values[column] = values[order]
+            self.sorted_positions[column] = order
+
+    def bounds(self, column):
+        """Valore minimo e massimo di una colonna nel catalogo"""
+        ordered = self.sorted_values[column]
+        if not len(ordered):
+            return 0.0, 0.0
+        return float(ordered[0]), float(ordered[-1])
+
+    def positions(self, column, low=None, high=None):
+        """Posizioni dei portafogli con low <= valore <= high (estremi None = illimitati)"""
+        ordered = self.sorted_values[column]
+        start = 0 if low is None else np.searchsorted(ordered, low, side='left')
+        stop = len(ordered) if high is None else np.searchsorted(ordered, high, side='right')
+        return self.sorted_positions[column][start:stop]
+
+    def mask(self, ranges):
+        """Bitset dei portafogli che rispettano tutti gli intervalli ((colonna, min, max), ...)"""
+        mask = (1 << self.size) - 1
+        for column, low, high in ranges:
+            flags = np.zeros(self.size, dtype=np.uint8)
+            flags[self.positions(column, low, high)] = 1
+            mask &= int.from_bytes(np.packbits(flags, bitorder='little').tobytes(), 'little')
+        return mask
+
+
+def get_range_index(catalog):
+    """Indice del catalogo indicato, ricostruito solo quando cambia il catalogo"""
+    global _last_index
+    index = _last_index
+    if index is None or index.catalog is not catalog:
+        index = RangeIndex(catalog)
+        _last_index = index
+    return index
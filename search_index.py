@@ -0,0 +1,243 @@
+"""
+Indice di Ricerca del Catalogo
+Indice invertito sui nomi dei portafogli, sulle descrizioni della strategia, sui nomi degli
+ETF componenti e sugli ISIN, più un trie dei prefissi per la digitazione incrementale di
+nomi, ID e ISIN. Si costruisce una volta per catalogo; non dipende da streamlit né da pandas
+
+Una ricerca restituisce i portafogli che contengono tutte le parole della query: ogni parola
+corrisponde a un termine identico in qualunque campo o, se lunga almeno MIN_PREFIX caratteri,
+all'inizio di un nome, di un ID o di un ISIN. I risultati sono ordinati per pertinenza
+(peso del campo in cui compare ogni parola) e poi nell'ordine del catalogo.
+
+Sui cataloghi grandi i prefissi brevi (es. 'ie', 'lu') coprono migliaia di termini: per i nodi
+del trie con almeno PRECOMPUTE_FANOUT termini le corrispondenze unite si calcolano con l'indice,
+già in ordine di pertinenza, così come le liste di posizioni più lunghe. Una parola singola
+si risolve allora leggendo i primi `limit` risultati, senza unioni né ordinamenti
+"""
+
+import heapq
+import itertools
+import re
+import threading
+import unicodedata
+
+# Peso di un termine in base al campo in cui compare (vale il campo più pesante)
+FIELD_WEIGHTS = {'id': 4, 'isin': 4, 'name': 3, 'component': 2, 'description': 1}
+
+# Campi i cui termini entrano nel trie dei prefissi
+PREFIX_FIELDS = ('id', 'isin', 'name', 'component')
+
+# Lunghezza minima di una parola per la ricerca per prefisso
+MIN_PREFIX = 2
+
+# Prefissi con le corrispondenze già unite, per indice (i più vecchi vengono scartati)
+CACHE_SIZE = 256
+
+# Nodi del trie con almeno questi termini: corrispondenze unite precalcolate con l'indice
+PRECOMPUTE_FANOUT = 128
+
+# Liste di posizioni di un termine con almeno queste voci: memorizzate in ordine di pertinenza
+RANKED_POSTINGS = 1024
+
+_TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+_lock = threading.Lock()
+_last_index = None
+
+
+def normalize(text):
+    """Minuscole senza accenti ('Liquidità' -> 'liquidita')"""
+    text = str(text).lower()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    """Parole alfanumeriche normalizzate di un testo"""
+    return _TOKEN_PATTERN.findall(normalize(text))
+
+
+class RankedPostings(dict):
+    """Posizione -> peso, con le chiavi già in ordine di pertinenza (peso decrescente, poi posizione)"""
+    __slots__ = ()
+
+
+def _ranked(postings):
+    """Copia di un dizionario posizione -> peso in ordine di pertinenza"""
+    return RankedPostings(sorted(postings.items(), key=lambda item: (-item[1], item[0])))
+
+
+def _merge_into(merged, postings):
+    """Unisce le posizioni di `postings` in `merged`, tenendo il peso più alto"""
+    for position, weight in postings.items():
+        if merged.get(position, 0) < weight:
+            merged[position] = weight
+
+
+def _field_texts(portfolio):
+    """Testi di un portafoglio per campo; ID e ISIN sono un unico termine"""
+    yield 'id', portfolio.id
+    yield 'name', portfolio.name
+    yield 'description', portfolio.strategy_description
+    for component in portfolio.components:
+        yield 'isin', component.isin
+        yield 'component', component.name
+
+
+class SearchIndex:
+    """Indice invertito e trie dei prefissi di un catalogo compilato"""
+    __slots__ = ('catalog', 'portfolios', 'postings', 'trie', 'merged', '_prefix_cache', '_query_cache')
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.portfolios = tuple(p for section in catalog.values() for p in section)
+
+        # Nomi degli ETF e descrizioni si ripetono tra i portafogli: si raggruppano le
+        # posizioni per testo, così ogni testo distinto si tokenizza e si indicizza una volta
+        positions_by_text = {field: {} for field in FIELD_WEIGHTS}
+        for position, portfolio in enumerate(self.portfolios):
+            for field, text in _field_texts(portfolio):
+                positions_by_text[field].setdefault(text, []).append(position)
+
+        # Termine -> {posizione del portafoglio: peso}. I campi si indicizzano dal meno pesante:
+        # l'ultimo peso scritto per un portafoglio è quello del campo più pesante
+        self.postings = {}
+        prefixable = set()
+        for field in sorted(FIELD_WEIGHTS, key=FIELD_WEIGHTS.get):
+            weight = FIELD_WEIGHTS[field]
+            for text, positions in positions_by_text[field].items():
+                terms = [normalize(text)] if field in ('id', 'isin') else set(tokenize(text))
+                for term in terms:
+                    self.postings.setdefault(term, {}).update(dict.fromkeys(positions, weight))
+                if field in PREFIX_FIELDS:
+                    prefixable.update(terms)
+
+        # Trie: ogni nodo è {carattere: nodo}, con i termini del sottoalbero sotto la chiave ''
+        self.trie = {'': []}
+        for term in sorted(prefixable):
+            node = self.trie
+            for char in term:
+                node = node.setdefault(char, {'': []})
+                node[''].append(term)
+
+        for term, postings in self.postings.items():
+            if len(postings) >= RANKED_POSTINGS:
+                self.postings[term] = _ranked(postings)
+        # Prefisso -> corrispondenze unite dei nodi con molti termini, in ordine di pertinenza
+        self.merged = {}
+        self._precompute(self.trie, '')
+        self._prefix_cache = {}
+        self._query_cache = {}
+
+    def _precompute(self, node, prefix):
+        """
+        Unisce le corrispondenze dei nodi con almeno PRECOMPUTE_FANOUT termini, dai più profondi:
+        un nodo riusa l'unione già calcolata dei figli invece di ripartire dai termini
+        """
+        for char, child in node.items():
+            if char and len(child['']) >= PRECOMPUTE_FANOUT:
+                self._precompute(child, prefix + char)
+        if len(prefix) < MIN_PREFIX:
+            return
+
+        merged = dict(self.postings.get(prefix, {}))
+        for char, child in node.items():
+            if not char:
+                continue
+            child_merged = self.merged.get(prefix + char)
+            if child_merged is not None:
+                _merge_into(merged, child_merged)
+            else:
+                for term in child['']:
+                    _merge_into(merged, self.postings[term])
+        self.merged[prefix] = _ranked(merged)
+
+    def prefix_terms(self, prefix):
+        """Termini di nomi, ID e ISIN che iniziano con il prefisso, in ordine alfabetico"""
+        node = self.trie
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        return node['']
+
+    def matches(self, word):
+        """Posizioni dei portafogli che corrispondono a una parola della query, con il peso"""
+        word = normalize(word)
+        if len(word) < MIN_PREFIX:
+            return self.postings.get(word, {})
+
+        merged = self.merged.get(word)
+        if merged is None:
+            merged = self._prefix_cache.get(word)
+        if merged is None:
+            sources = [self.postings[term] for term in self.prefix_terms(word) if term != word]
+            sources = sorted([self.postings.get(word, {})] + sources, key=len, reverse=True)
+            if len(sources) == 1 or not sources[1]:
+                # Un solo termine con corrispondenze (es. una parola intera): nessuna unione
+                merged = sources[0]
+            else:
+                # Si copia in blocco la lista più lunga e si uniscono le altre
+                merged = dict(sources[0])
+                for postings in sources[1:]:
+                    _merge_into(merged, postings)
+            _remember(self._prefix_cache, word, merged)
+        return merged
+
+    def scores(self, query):
+        """Posizione -> punteggio dei portafogli che contengono tutte le parole della query"""
+        words = tuple(tokenize(query))
+        if not words:
+            return {}
+        scores = self._query_cache.get(words)
+        if scores is None:
+            scores = self._score(words)
+            _remember(self._query_cache, words, scores)
+        return scores
+
+    def count(self, query):
+        """Numero di portafogli che corrispondono alla query"""
+        return len(self.scores(query))
+
+    def search(self, query, limit=None):
+        """Portafogli che contengono tutte le parole della query, dai più pertinenti (al massimo `limit`)"""
+        scores = self.scores(query)
+        if isinstance(scores, RankedPostings):
+            ranked = scores if limit is None else itertools.islice(scores, limit)
+        elif limit is not None:
+            ranked = heapq.nsmallest(limit, scores, key=lambda position: (-scores[position], position))
+        else:
+            ranked = sorted(scores, key=lambda position: (-scores[position], position))
+        return [self.portfolios[position] for position in ranked]
+
+    def _score(self, words):
+        """Punteggi dei portafogli che contengono tutte le parole (somma dei pesi)"""
+        # Si parte dalla parola più selettiva e si interseca con le altre
+        candidates = sorted((self.matches(word) for word in words), key=len)
+        scores = candidates[0]
+        for other in candidates[1:]:
+            common = scores.keys() & other.keys()
+            scores = {position: scores[position] + other[position] for position in common}
+            if not scores:
+                break
+        return scores
+
+
+def _remember(cache, key, value):
+    """Memorizza un risultato, scartando il più vecchio oltre CACHE_SIZE"""
+    with _lock:
+        if len(cache) >= CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+        cache[key] = value
+
+
+def get_search_index(catalog):
+    """Indice del catalogo indicato, ricostruito solo quando cambia il catalogo"""
+    global _last_index
+    index = _last_index
+    if index is None or index.catalog is not catalog:
+        index = SearchIndex(catalog)
+        _last_index = index
+    return index
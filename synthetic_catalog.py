@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Generatore di Cataloghi Sintetici
+Produce cataloghi di dimensione arbitraria nello stesso schema di portfolios_data
+(ID, rischio 1-8, flag ESG, orizzonte come stringa, codici di ribilanciamento, componenti
+con ISIN validi e TER, pesi che sommano a 100), in modo deterministico dato il seed.
+Serve a benchmark, test di carico e scoring batch su cataloghi molto più grandi di quello reale
+
+Uso:
+    python synthetic_catalog.py 24000 --seed 7 --output catalogo_24k.json
+"""
+
+import argparse
+import contextlib
+import json
+import random
+import string
+import sys
+import threading
+import warnings
+
+import catalog
+import engine
+import portfolios_data
+from catalog import SECTIONS, compile_catalog
+from engine import LEVERAGE_RISK
+
+DEFAULT_SEED = 2024
+
+# Serializza le installazioni del catalogo (RLock: install_catalog è chiamata dentro use_catalog)
+_install_lock = threading.RLock()
+
+# Universo di ETF: almeno MIN_ETFS, poi uno ogni PORTFOLIOS_PER_ETF portafogli
+MIN_ETFS = 60
+PORTFOLIOS_PER_ETF = 20
+
+# Ripartizione tra sezioni e livelli di rischio (simile al catalogo reale, leva rara)
+SECTION_WEIGHTS = {'multi': 0.40, 'single': 0.30, 'esg': 0.30}
+RISK_WEIGHTS = {1: 3, 2: 4, 3: 3, 4: 2, 5: 3, 6: 3, 7: 4, 8: 1}
+
+# Quota azionaria obiettivo per livello di rischio (%)
+EQUITY_SHARE = {1: 0, 2: 20, 3: 40, 4: 50, 5: 60, 6: 80, 7: 100, 8: 100}
+
+# Orizzonti minimi ammessi per livello di rischio, nel formato di portfolios_data
+MIN_DURATIONS = {1: ('1..xx', '3'), 2: ('5', '7'), 3: ('7', '10'), 4: ('10',), 5: ('10',),
+                 6: ('10', '15'), 7: ('10', '15'), 8: ('10',)}
+LADDER_DURATION = '1...9'
+
+PROFILE_NAMES = {1: 'Liquidità', 2: 'Conservatore', 3: 'Moderato', 4: 'Bilanciato', 5: 'Dinamico',
+                 6: 'Aggressivo', 7: 'Azionario', 8: 'Leva 2x'}
+
+# Indici per classe di attivo: i nomi seguono le regole di market_assumptions
+ETF_INDICES = {
+    'equity': ('MSCI World', 'MSCI ACWI', 'S&P 500', 'MSCI Europe', 'FTSE All-World',
+               'MSCI World Quality', 'MSCI World Momentum', 'MSCI World Value'),
+    'equity_em': ('MSCI Emerging Markets', 'FTSE Emerging Markets'),
+    'gold': ('Physical Gold',),
+    'bond': ('EUR Corporate Bond', 'EUR Government Bond', 'Global Aggregate Bond'),
+    'short_bond': ('EUR Floating Rate Bond', 'EUR Corporate Bond 0-3yr'),
+    'inflation_linked': ('Euro Inflation Linked Government Bond',),
+    'money_market': ('EUR Overnight Rate Swap',),
+    'leveraged': ('MSCI World (2x) Leveraged',),
+}
+ETF_CLASS_WEIGHTS = {'equity': 35, 'equity_em': 10, 'gold': 5, 'bond': 15, 'short_bond': 10,
+                     'inflation_linked': 8, 'money_market': 7, 'leveraged': 5}
+TER_RANGES = {'equity': (0.07, 0.40), 'equity_em': (0.14, 0.30), 'gold': (0.12, 0.25),
+              'bond': (0.07, 0.25), 'short_bond': (0.07, 0.20), 'inflation_linked': (0.09, 0.25),
+              'money_market': (0.05, 0.15), 'leveraged': (0.35, 0.60), 'multi_asset': (0.22, 0.30)}
+# Classi senza varianti ESG
+NO_ESG_CLASSES = ('gold', 'money_market', 'leveraged')
+DEFENSIVE_CLASSES = ('gold', 'bond', 'short_bond', 'inflation_linked', 'money_market')
+ISSUERS = ('iShares', 'Xtrackers', 'Vanguard', 'Amundi', 'SPDR', 'Invesco', 'HSBC', 'UBS')
+ISIN_COUNTRIES = ('IE', 'LU', 'DE', 'FR')
+
+# Quote azionarie dei fondi multi-asset (stile LifeStrategy) usati come single ETF
+MULTI_ASSET_SHARES = (20, 40, 60, 80)
+
+# Unità di allocazione: i pesi sono multipli di 5
+WEIGHT_STEP = 5
+
+
+def isin_check_digit(body):
+    """Cifra di controllo ISIN (Luhn sulle cifre ottenute convertendo le lettere in 10-35)"""
+    digits = ''.join(str(int(ch, 36)) for ch in body)
+    total = 0
+    for position, digit in enumerate(reversed(digits)):
+        value = int(digit) * (2 if position % 2 == 0 else 1)
+        total += value // 10 + value % 10
+    return str((10 - total % 10) % 10)
+
+
+def _isin(rng, used):
+    """ISIN casuale valido e non ancora usato"""
+    while True:
+        body = rng.choice(ISIN_COUNTRIES) + ''.join(rng.choices(string.ascii_uppercase + string.digits, k=9))
+        isin = body + isin_check_digit(body)
+        if isin not in used:
+            used.add(isin)
+            return isin
+
+
+def _etf(rng, used, asset_class, esg, index=None):
+    """Un ETF sintetico: nome coerente con la classe di attivo, ISIN valido e TER"""
+    issuer = rng.choice(ISSUERS)
+    if index is None:
+        index = rng.choice(ETF_INDICES[asset_class])
+    label = f"{index} ESG" if esg else index
+    low, high = TER_RANGES[asset_class]
+    return {
+        'name': f"{issuer} {label} UCITS ETF {rng.choice(('(Acc)', '(Dist)', '1C'))}",
+        'isin': _isin(rng, used),
+        'ter': f"{rng.uniform(low, high):.2f}",
+        'asset_class': asset_class,
+        'esg': esg,
+    }
+
+
+def generate_etfs(n_etfs, rng):
+    """
+    Universo di ETF sintetici: almeno un ETF per classe (e la sua variante ESG dove esiste)
+    e fondi multi-asset per ogni quota azionaria; il resto estratto con i pesi di ETF_CLASS_WEIGHTS
+    """
+    used = set()
+    etfs = []
+    for asset_class in ETF_INDICES:
+        etfs.append(_etf(rng, used, asset_class, False))
+        if asset_class not in NO_ESG_CLASSES:
+            etfs.append(_etf(rng, used, asset_class, True))
+    for share in MULTI_ASSET_SHARES:
+        for esg in (False, True):
+            etfs.append(_etf(rng, used, 'multi_asset', esg, index=f"LifeStrategy {share}% Equity"))
+
+    classes, weights = zip(*ETF_CLASS_WEIGHTS.items())
+    while len(etfs) < n_etfs:
+        asset_class = rng.choices(classes, weights)[0]
+        etfs.append(_etf(rng, used, asset_class, asset_class not in NO_ESG_CLASSES and rng.random() < 0.3))
+    return etfs
+
+
+def split_weight(total, parts, rng):
+    """Divide `total` (multiplo di WEIGHT_STEP) in `parts` pesi positivi multipli di WEIGHT_STEP"""
+    units = total // WEIGHT_STEP
+    parts = min(parts, units)
+    if parts == 0:
+        return []
+    shares = [1] * parts
+    for _ in range(units - parts):
+        shares[rng.randrange(parts)] += 1
+    return [share * WEIGHT_STEP for share in shares]
+
+
+def _component(etf, percentage):
+    return {'percentage': str(percentage), 'name': etf['name'], 'isin': etf['isin'], 'ter': etf['ter']}
+
+
+def _pick(pools, asset_class, esg, rng, exclude=()):
+    """ETF di una classe (ESG se richiesto), evitando quelli già nel portafoglio se possibile"""
+    pool = pools[asset_class, esg] or pools[asset_class, False]
+    choices = [etf for etf in pool if etf['isin'] not in exclude] or pool
+    return rng.choice(choices)
+
+
+def _single_components(risk_level, esg, pools, rng):
+    """Un solo ETF al 100% (o una bond ladder di ETF alternativi per il rischio 1)"""
+    if risk_level == 1:
+        if rng.random() < 0.1:
+            count = rng.randint(3, 9)
+            ladder = []
+            for _ in range(count):
+                ladder.append(_pick(pools, 'bond', esg, rng, {etf['isin'] for etf in ladder}))
+            return [_component(etf, 100) for etf in ladder], LADDER_DURATION
+        return [_component(_pick(pools, rng.choice(('short_bond', 'money_market')), esg, rng), 100)], None
+    if risk_level >= 7:
+        return [_component(_pick(pools, 'equity', esg, rng), 100)], None
+
+    # Rischio intermedio: fondo multi-asset con la quota azionaria più vicina
+    share = min(MULTI_ASSET_SHARES, key=lambda s: abs(s - EQUITY_SHARE[risk_level]))
+    funds = [etf for etf in pools['multi_asset', esg] or pools['multi_asset', False]
+             if f"{share}% Equity" in etf['name']]
+    return [_component(rng.choice(funds), 100)], None
+
+
+def _multi_components(risk_level, esg, pools, rng):
+    """Più ETF con quota azionaria del livello di rischio e parte difensiva diversificata"""
+    if risk_level == LEVERAGE_RISK:
+        leveraged = _pick(pools, 'leveraged', False, rng)
+        hedge = _pick(pools, rng.choice(('gold', 'bond')), False, rng)
+        return [_component(leveraged, 50), _component(hedge, 50)]
+
+    equity = EQUITY_SHARE[risk_level]
+    n_equity = rng.randint(1, 3) if equity else 0
+    n_defensive = rng.randint(2, 4) if equity < 100 else 0
+    if n_equity + n_defensive < 2:
+        n_equity = 2
+
+    components, held = [], set()
+    for index, weight in enumerate(split_weight(equity, n_equity, rng)):
+        asset_class = 'equity_em' if index > 0 and rng.random() < 0.3 else 'equity'
+        etf = _pick(pools, asset_class, esg, rng, held)
+        held.add(etf['isin'])
+        components.append(_component(etf, weight))
+
+    defensive = rng.sample(DEFENSIVE_CLASSES, min(n_defensive, len(DEFENSIVE_CLASSES)))
+    for asset_class, weight in zip(defensive, split_weight(100 - equity, len(defensive), rng)):
+        etf = _pick(pools, asset_class, esg and asset_class not in NO_ESG_CLASSES, rng, held)
+        held.add(etf['isin'])
+        components.append(_component(etf, weight))
+    return components
+
+
+def generate_catalog(n_portfolios, seed=DEFAULT_SEED, n_etfs=None):
+    """
+    Catalogo grezzo di `n_portfolios` portafogli ({'multi': [...], 'single': [...], 'esg': [...]}),
+    identico a parità di argomenti e compilabile da catalog.compile_catalog senza avvisi
+    """
+    rng = random.Random(seed)
+    if n_etfs is None:
+        n_etfs = max(MIN_ETFS, n_portfolios // PORTFOLIOS_PER_ETF)
+    etfs = generate_etfs(n_etfs, rng)
+    pools = {}
+    for asset_class in list(ETF_INDICES) + ['multi_asset']:
+        for esg in (False, True):
+            pools[asset_class, esg] = [e for e in etfs if e['asset_class'] == asset_class and e['esg'] == esg]
+
+    sections = {section: [] for section in SECTIONS}
+    section_names, section_weights = zip(*SECTION_WEIGHTS.items())
+    risk_levels, risk_weights = zip(*RISK_WEIGHTS.items())
+    for i in range(n_portfolios):
+        section = rng.choices(section_names, section_weights)[0]
+        risk_level = rng.choices(risk_levels, risk_weights)[0]
+        # La leva esiste solo tra i multi-ETF non ESG
+        if risk_level == LEVERAGE_RISK and section != 'multi':
+            risk_level = rng.randint(1, 7)
+        esg = section == 'esg'
+        single = section == 'single' or (esg and rng.random() < 0.4)
+
+        duration = None
+        if single:
+            components, duration = _single_components(risk_level, esg, pools, rng)
+            rebalance = 'NO'
+        else:
+            components = _multi_components(risk_level, esg, pools, rng)
+            rebalance = '3M' if risk_level == LEVERAGE_RISK else '1y'
+        if duration is None:
+            duration = rng.choice(MIN_DURATIONS[risk_level])
+
+        equity = EQUITY_SHARE[risk_level]
+        kind = 'single ETF' if single else 'multi-ETF'
+        sections[section].append({
+            'id': f"SYN{i + 1:06d}",
+            'name': f"{PROFILE_NAMES[risk_level]}{' ESG' if esg else ''} {equity}/{100 - equity} n.{i + 1}",
+            'risk_level': risk_level,
+            'esg': int(esg),
+            'min_duration': duration,
+            'rebalance': rebalance,
+            'strategy_description': (f"Portafoglio sintetico {kind} con circa il {equity}% azionario "
+                                     f"su {len(components)} ETF, generato per i test di scala (seed {seed})."),
+            'components': components,
+            'note': '',
+        })
+    return sections
+
+
+def synthetic_version(n_portfolios, seed=DEFAULT_SEED):
+    """Versione del catalogo sintetico, usata come chiave delle cache al posto di CATALOG_VERSION"""
+    return f"sintetico-{n_portfolios}-{seed}"
+
+
+def _swap_catalog(raw_sections, compiled, version):
+    """
+    Assegna catalogo grezzo, compilato e versione a tutti i moduli che ne tengono un riferimento
+    (incluse le copie fatte all'import, come engine.CATALOG_VERSION)
+    """
+    portfolios_data.MULTI_PORTFOLIOS = raw_sections['multi']
+    portfolios_data.SINGLE_PORTFOLIOS = raw_sections['single']
+    portfolios_data.ESG_PORTFOLIOS = raw_sections['esg']
+    portfolios_data.rebuild_indexes()
+    catalog.CATALOG = compiled
+    catalog.CATALOG_VERSION = version
+    catalog._BY_ID = {p.id: p for section in compiled.values() for p in section}
+    engine.CATALOG_VERSION = version
+
+
+def install_catalog(raw_sections, version):
+    """
+    Sostituisce il catalogo in portfolios_data (con i suoi indici) e il catalogo compilato,
+    così che app, motore e funzioni di supporto lavorino sui dati indicati.
+    Restituisce il catalogo compilato.
+
+    La sostituzione vale per tutto il processo e non è atomica rispetto agli altri thread:
+    va usata in strumenti a thread singolo (benchmark, test di carico, worker di batch_score),
+    mai mentre un server Streamlit sta servendo sessioni. Le installazioni concorrenti
+    sono comunque serializzate
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', catalog.CatalogWarning)
+        compiled = compile_catalog(raw_sections)
+    with _install_lock:
+        _swap_catalog(raw_sections, compiled, version)
+    return compiled
+
+
+def install_synthetic_catalog(n_portfolios, seed=DEFAULT_SEED):
+    """Genera e installa un catalogo sintetico (anche come initializer dei processi worker)"""
+    return install_catalog(generate_catalog(n_portfolios, seed), synthetic_version(n_portfolios, seed))
+
+
+@contextlib.contextmanager
+def use_catalog(raw_sections, version):
+    """
+    Catalogo installato solo per la durata del blocco, poi si ripristina quello precedente.
+    Stessi vincoli di install_catalog; un altro thread che usa use_catalog attende la fine del blocco
+    """
+    with _install_lock:
+        saved_raw = {'multi': portfolios_data.MULTI_PORTFOLIOS, 'single': portfolios_data.SINGLE_PORTFOLIOS,
+                     'esg': portfolios_data.ESG_PORTFOLIOS}
+        saved = (catalog.CATALOG, catalog.CATALOG_VERSION)
+        try:
+            yield install_catalog(raw_sections, version)
+        finally:
+            _swap_catalog(saved_raw, *saved)
+
+
+def parse_args(argv=None):
+    """Argomenti da riga di comando"""
+    parser = argparse.ArgumentParser(description="Generatore di cataloghi sintetici di portafogli")
+    parser.add_argument('portfolios', type=int, help="Numero di portafogli")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help="Seed del generatore")
+    parser.add_argument('--etfs', type=int, default=None, help="Dimensione dell'universo di ETF")
+    parser.add_argument('--output', default=None, help="File JSON di destinazione (default: solo riepilogo)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Genera il catalogo e ne stampa un riepilogo"""
+    args = parse_args(argv)
+    sections = generate_catalog(args.portfolios, args.seed, args.etfs)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(sections, f, ensure_ascii=False)
+
+    compiled = compile_catalog(sections)
+    portfolios = [p for section in compiled.values() for p in section]
+    isins = {c.isin for p in portfolios for c in p.components}
+    print(f"✅ {len(portfolios):,} portafogli ({', '.join(f'{s}: {len(compiled[s]):,}' for s in SECTIONS)}), "
+          f"{len(isins):,} ETF, versione {synthetic_version(args.portfolios, args.seed)}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test Suite per la Cache Condivisa dell'App
+Verifica che un cambio di versione del catalogo ricostruisca il catalogo in cache e
+le tabelle che ne dipendono, e che invalidate_caches svuoti tutto
+"""
+
+import catalog
+from synthetic_catalog import generate_catalog, synthetic_version, use_catalog
+
+
+def _dependent_entries(app, portfolio, version, source=None):
+    """
+    Tabella dei componenti, link e Monte Carlo di un portafoglio dalla cache dell'app,
+    in forma confrontabile. Se non sono in cache vengono calcolati da `source`
+    (default il portafoglio stesso): con un'altra fonte si distingue una lettura da un ricalcolo
+    """
+    source = portfolio if source is None else source
+    table = app.get_component_table(portfolio.id, version, source)
+    links = app.get_links_markdown(portfolio.id, version, source)
+    result = app.get_montecarlo(portfolio.id, version, source)
+    return table.to_csv(), links, result.bands.tobytes()
+
+
+def _portfolios(app, version):
+    """Un portafoglio del catalogo e uno con componenti e orizzonte diversi"""
+    portfolios, _ = app.load_catalog(version)
+    flat = catalog.iter_portfolios(portfolios)
+    first = flat[0]
+    other = next(p for p in flat if p.components != first.components and p.min_years != first.min_years)
+    return portfolios, first, other
+
+
+def test_catalog_version_rebuilds_caches():
+    """Una nuova versione ricarica il catalogo e svuota le cache dipendenti, anche al ritorno alla precedente"""
+    import app
+
+    version = catalog.CATALOG_VERSION
+    portfolios, portfolio, other = _portfolios(app, version)
+    assert portfolios is catalog.get_catalog()
+    entries = _dependent_entries(app, portfolio, version)
+    assert _dependent_entries(app, other, version) != entries
+    # Stessa chiave: le voci arrivano dalla cache anche se la fonte è un altro portafoglio
+    assert _dependent_entries(app, portfolio, version, other) == entries
+
+    with use_catalog(generate_catalog(50, seed=11), synthetic_version(50, seed=11)) as compiled:
+        synthetic, stats = app.load_catalog(catalog.CATALOG_VERSION)
+        assert synthetic is compiled and stats['total_portfolios'] == 50
+        rebuilt = _dependent_entries(app, portfolio, version, other)
+        assert all(a != b for a, b in zip(entries, rebuilt))
+
+    restored, stats = app.load_catalog(version)
+    assert restored is catalog.get_catalog() and restored is not synthetic
+    assert stats['total_portfolios'] == len(catalog.iter_portfolios())
+    print("✅ Cache ricostruite al cambio di versione del catalogo")
+
+
+def test_invalidate_caches():
+    """invalidate_caches svuota il catalogo condiviso e le tabelle per portafoglio"""
+    import app
+
+    version = catalog.CATALOG_VERSION
+    portfolios, portfolio, other = _portfolios(app, version)
+    entries = _dependent_entries(app, portfolio, version)
+
+    app.invalidate_caches()
+    assert app.load_catalog(version)[0] is portfolios
+    rebuilt = _dependent_entries(app, portfolio, version, other)
+    assert all(a != b for a, b in zip(entries, rebuilt))
+    print("✅ Invalidazione esplicita delle cache")
+
+
+def test_tables_returned_as_copies():
+    """Le tabelle in cache arrivano come copie: modificarle non altera le letture successive"""
+    import app
+
+    version = catalog.CATALOG_VERSION
+    _, portfolio, _ = _portfolios(app, version)
+    table = app.get_component_table(portfolio.id, version, portfolio)
+    expected = table.to_csv()
+    table['ISIN'] = 'modificato'
+    assert app.get_component_table(portfolio.id, version, portfolio).to_csv() == expected
+    print("✅ Tabelle dei componenti restituite come copie")
+
+
+def test_montecarlo_shared_read_only():
+    """La simulazione è condivisa senza copie ma le sue bande non sono modificabili"""
+    import app
+
+    version = catalog.CATALOG_VERSION
+    _, portfolio, _ = _portfolios(app, version)
+    result = app.get_montecarlo(portfolio.id, version, portfolio)
+    assert app.get_montecarlo(portfolio.id, version, portfolio) is result
+    try:
+        result.bands[0, 0] = 0
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("bande Monte Carlo modificabili")
+    assert app.get_montecarlo_bands(result).shape == (result.years + 1, len(app.PERCENTILES))
+    print("✅ Simulazione Monte Carlo condivisa in sola lettura")
+
+
+if __name__ == "__main__":
+    test_catalog_version_rebuilds_caches()
+    test_invalidate_caches()
+    test_tables_returned_as_copies()
+    test_montecarlo_shared_read_only()
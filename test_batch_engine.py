@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test Suite per il Motore di Raccomandazione Batch
+Verifica che il calcolo vettoriale coincida con calculate_recommendations
+"""
+
+import itertools
+import os
+import tempfile
+import warnings
+
+import pandas as pd
+
+from answer_table import MAX_TABLE_PORTFOLIOS, N_COMBINATIONS, build_answer_table, get_answer_table, table_version
+from batch_engine import calculate_recommendations_batch, encode_answers
+from engine import WIZARD_QUESTIONS, calculate_recommendations, get_catalog
+from synthetic_catalog import generate_catalog, synthetic_version, use_catalog
+
+
+def _sample_answers(step=97):
+    """Campione deterministico dello spazio delle risposte del wizard"""
+    combos = itertools.product(*WIZARD_QUESTIONS.values())
+    return [combo for i, combo in enumerate(combos) if i % step == 0]
+
+
+def test_batch_matches_single_profile():
+    """Top 3, livelli di rischio e criteri coincidono con il calcolo per singolo profilo"""
+    portfolios = get_catalog()
+    combos = _sample_answers()
+    # Una riga con risposte non riconosciute usa gli stessi default del wizard
+    combos.append(('?',) * len(WIZARD_QUESTIONS))
+    answers = pd.DataFrame(combos, columns=list(WIZARD_QUESTIONS))
+
+    batch = calculate_recommendations_batch(answers, portfolios, chunk_size=500)
+
+    for combo, row in zip(combos, batch.itertuples()):
+        expected = calculate_recommendations(portfolios, *combo)
+        got_ids = [pid for pid in (row.portfolio_1, row.portfolio_2, row.portfolio_3) if pid is not None]
+        assert got_ids == [p.id for p in expected['portfolios']], combo
+        assert row.recommended_risks == expected['recommended_risks'], combo
+        assert row.max_etfs == expected['criteria']['max_etfs'], combo
+        assert row.single_only == expected['criteria']['single_only'], combo
+        assert row.esg_only == expected['criteria']['esg_only'], combo
+
+    print(f"✅ {len(combos)} profili batch identici al calcolo singolo")
+
+
+def test_unknown_answers_encoding():
+    """Risposte sconosciute o mancanti vanno nello slot finale, senza avvisi di deprecazione di pandas"""
+    first = [options[0] for options in WIZARD_QUESTIONS.values()]
+    answers = pd.DataFrame([first, ['?'] * len(WIZARD_QUESTIONS), [None] * len(WIZARD_QUESTIONS)],
+                           columns=list(WIZARD_QUESTIONS))
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        codes = encode_answers(answers)
+    for question, options in WIZARD_QUESTIONS.items():
+        assert codes[question].tolist() == [0, len(options), len(options)], question
+    print("✅ Codifica delle risposte sconosciute")
+
+
+def test_answer_table_lookup():
+    """La tabella precalcolata restituisce gli stessi risultati, anche dopo salvataggio su disco"""
+    portfolios = get_catalog()
+    table = build_answer_table(portfolios)
+    assert table.top.shape[0] == N_COMBINATIONS
+
+    with tempfile.TemporaryDirectory() as table_dir:
+        get_answer_table(portfolios, version='test', table_dir=table_dir)
+        assert os.listdir(table_dir) == ['answer_table_test.npz']
+        loaded = get_answer_table(portfolios, version='test', table_dir=table_dir)
+
+    for combo in _sample_answers(step=1009):
+        answers = dict(zip(WIZARD_QUESTIONS, combo))
+        expected = calculate_recommendations(portfolios, *combo)
+        for source in (table, loaded):
+            result = source.lookup(portfolios, **answers)
+            assert [p.id for p in result['portfolios']] == [p.id for p in expected['portfolios']], combo
+            assert result['recommended_risks'] == expected['recommended_risks'], combo
+            assert result['criteria'] == expected['criteria'], combo
+
+    print("✅ Tabella delle risposte coerente con il calcolo diretto")
+
+
+def test_answer_table_size_limit():
+    """Versione letta dal catalogo installato e, oltre il limite, wizard con calcolo diretto"""
+    from streamlit.testing.v1 import AppTest
+    from wizard_timing import APP_PATH, answer_wizard
+
+    real_version = table_version()
+    n_portfolios = MAX_TABLE_PORTFOLIOS + 1
+    with use_catalog(generate_catalog(n_portfolios, seed=9), synthetic_version(n_portfolios, seed=9)) as large:
+        assert table_version() != real_version
+        try:
+            build_answer_table(large)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("Tabella costruita oltre MAX_TABLE_PORTFOLIOS")
+
+        app = AppTest.from_file(APP_PATH, default_timeout=120).run()
+        answer_wizard(app)
+        assert app.session_state['wizard_results'] is not None
+    assert table_version() == real_version
+    print("✅ Catalogo oltre il limite della tabella: calcolo diretto")
+
+
+if __name__ == "__main__":
+    test_batch_matches_single_profile()
+    test_unknown_answers_encoding()
+    test_answer_table_lookup()
+    test_answer_table_size_limit()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test Suite per lo Scoring Batch da Riga di Comando
+"""
+
+import csv
+import io
+import itertools
+import json
+
+import catalog
+from batch_score import run
+from engine import CATALOG_VERSION, WIZARD_QUESTIONS, calculate_recommendations, get_catalog
+from synthetic_catalog import generate_catalog, synthetic_version, use_catalog
+
+
+def _answers(n):
+    """Primi n profili dello spazio delle risposte, con un ID cliente"""
+    combos = itertools.islice(itertools.product(*WIZARD_QUESTIONS.values()), 0, None, 911)
+    return [{'client_id': f'C{i}', **dict(zip(WIZARD_QUESTIONS, combo))}
+            for i, combo in zip(range(n), combos)]
+
+
+def test_csv_scoring_keeps_input_order():
+    """CSV → CSV con pool di processi: ordine di input e risultati identici al wizard"""
+    rows = _answers(120)
+    source = io.StringIO()
+    writer = csv.DictWriter(source, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    source.seek(0)
+
+    output = io.StringIO()
+    total, _ = run(source, output, 'csv', 'csv', chunk_size=17, workers=2)
+    assert total == len(rows)
+
+    output.seek(0)
+    scored = list(csv.DictReader(output))
+    assert [r['client_id'] for r in scored] == [r['client_id'] for r in rows]
+
+    portfolios = get_catalog()
+    for row in scored:
+        expected = calculate_recommendations(portfolios, *(row[q] for q in WIZARD_QUESTIONS))
+        got = [row[f'portfolio_{rank}'] for rank in (1, 2, 3) if row[f'portfolio_{rank}']]
+        assert got == [p.id for p in expected['portfolios']]
+        assert row['recommended_risks'] == ';'.join(map(str, expected['recommended_risks']))
+
+    print(f"✅ {total} questionari CSV valutati in ordine")
+
+
+def test_jsonl_scoring():
+    """JSONL → JSONL in un solo processo"""
+    rows = _answers(30)
+    source = io.StringIO(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in rows))
+    output = io.StringIO()
+    total, _ = run(source, output, 'jsonl', 'jsonl', chunk_size=8, workers=1)
+
+    scored = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert total == len(scored) == len(rows)
+    assert [r['client_id'] for r in scored] == [r['client_id'] for r in rows]
+    assert all(isinstance(r['recommended_risks'], list) for r in scored)
+
+    print(f"✅ {total} questionari JSONL valutati")
+
+
+def test_synthetic_catalog_scoring():
+    """Con un catalogo sintetico i worker valutano sullo stesso catalogo del processo principale"""
+    rows = _answers(40)
+    source = io.StringIO(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in rows))
+    output = io.StringIO()
+    total, _ = run(source, output, 'jsonl', 'jsonl', chunk_size=10, workers=2, synthetic=(400, 3))
+    assert total == len(rows)
+
+    scored = [json.loads(line) for line in output.getvalue().splitlines()]
+    with use_catalog(generate_catalog(400, 3), synthetic_version(400, 3)) as portfolios:
+        for row in scored:
+            expected = calculate_recommendations(portfolios, *(row[q] for q in WIZARD_QUESTIONS))
+            got = [row[f'portfolio_{rank}'] for rank in (1, 2, 3) if row[f'portfolio_{rank}']]
+            assert got == [p.id for p in expected['portfolios']]
+    assert any(row['portfolio_1'] for row in scored)
+
+    # Il catalogo reale torna attivo nel processo principale
+    assert catalog.CATALOG_VERSION == CATALOG_VERSION
+    print(f"✅ {total} questionari valutati su un catalogo sintetico")
+
+
+if __name__ == "__main__":
+    test_csv_scoring_keeps_input_order()
+    test_jsonl_scoring()
+    test_synthetic_catalog_scoring()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test Suite per i Benchmark
+Verifica i benchmark sulle funzioni e il confronto con i tempi di riferimento
+(senza asserzioni sui tempi, che dipendono dalla macchina)
+"""
+
+import os
+import tempfile
+
+from benchmark import (MACHINE_REFERENCE, MIN_SECONDS, benchmark_functions, compare, read_baseline, run_benchmarks,
+                       time_call, write_baseline)
+from synthetic_catalog import generate_catalog, synthetic_version, use_catalog
+
+
+def test_baseline_comparison():
+    """Regressione solo oltre la soglia, anche per i benchmark sotto il millisecondo"""
+    results = run_benchmarks(sizes=(100,), repeat=1, render=False)
+    assert 'calculate_recommendations[reale]' in results
+    assert 'filter_portfolios[100]' in results and results[MACHINE_REFERENCE] > 0
+
+    with use_catalog(generate_catalog(250), synthetic_version(250)) as compiled:
+        timings = benchmark_functions(compiled, repeat=1)
+        assert set(timings) == {'calculate_recommendations', 'filter_portfolios', 'get_statistics'}
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'baseline.json')
+        write_baseline({'lento': 0.010, 'rapido': 0.0001, 'istantaneo': 0.00001234}, path)
+        baseline = read_baseline(path)
+        assert baseline['istantaneo'] == 0.00001234
+        assert read_baseline(os.path.join(root, 'assente.json')) == {}
+
+    compared = {r.name: r for r in compare({'lento': 0.020, 'rapido': 0.0005, 'nuovo': 1.0}, baseline, 1.25)}
+    assert compared['lento'].regression and abs(compared['lento'].ratio - 2.0) < 1e-9
+    assert compared['rapido'].regression and abs(compared['rapido'].ratio - 5.0) < 1e-9
+    assert not compared['nuovo'].regression and compared['nuovo'].ratio != compared['nuovo'].ratio
+    assert not compare({'lento': 0.012}, baseline, 1.25)[0].regression
+
+    # Su una macchina due volte più lenta nel suo insieme un tempo doppio non è una regressione
+    baseline[MACHINE_REFERENCE] = 0.1
+    slower = {r.name: r for r in compare({MACHINE_REFERENCE: 0.2, 'lento': 0.020}, baseline, 1.25)}
+    assert not slower['lento'].regression and abs(slower['lento'].ratio - 1.0) < 1e-9
+    assert not slower[MACHINE_REFERENCE].regression
+    assert compare({MACHINE_REFERENCE: 0.1, 'lento': 0.020}, baseline, 1.25)[1].regression
+    print("✅ Confronto con i tempi di riferimento")
+
+
+def test_setup_runs_before_each_repeat():
+    """Il setup (es. svuotare le cache degli indici) precede ogni chiamata, fuori misura"""
+    calls = []
+    time_call(lambda: calls.append('misura'), repeat=3, setup=lambda: calls.append('setup'), loops=1)
+    assert calls == ['setup', 'misura'] * 3
+
+    # Senza `loops` le funzioni rapide vengono ripetute per superare la durata minima
+    calls.clear()
+    seconds = time_call(lambda: calls.append('misura'), repeat=3, setup=lambda: calls.append('setup'))
+    assert len(calls) > 6 and calls == ['setup', 'misura'] * (len(calls) // 2)
+    assert seconds < MIN_SECONDS
+    print("✅ Setup prima di ogni chiamata, cicli per le funzioni rapide")
+
+
+if __name__ == "__main__":
+    test_baseline_comparison()
+    test_setup_runs_before_each_repeat()
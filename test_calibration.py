@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test Suite per la Calibrazione dei Livelli di Rischio
+Verifica fasce, report su archivio sintetico, volatilità dalla covarianza condivisa,
+backtest per periodo comune, salvataggio e ricalcolo incrementale
+"""
+
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import calibration
+from calibration import STATUS_ABOVE, STATUS_BELOW, STATUS_MISSING, STATUS_OK, band_status, get_calibration
+from catalog import isin_names, isin_universe, iter_portfolios, target_weights
+from covariance import get_covariance, portfolio_volatilities
+from market_assumptions import etf_moments
+from backtest import run_backtest
+from price_store import PriceStore, append_series, write_store
+
+LATE_ISIN = 'IE00BL25JN58'
+
+
+def _write_store(root, n_days=800, seed=5):
+    """Prezzi sintetici coerenti con le ipotesi di mercato; un ETF ha meno di un anno di storico"""
+    isins = list(isin_universe())
+    dates = pd.bdate_range('2020-01-01', periods=n_days).values.astype('datetime64[D]')
+    mean, cov = etf_moments(isins, isin_names())
+    factor = np.linalg.cholesky(cov / 252 + 1e-12 * np.eye(len(isins)))
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.standard_normal((n_days, len(isins))) @ factor.T + mean / 252, axis=0))
+    prices[:n_days - 100, isins.index(LATE_ISIN)] = np.nan
+    write_store(dates, {isin: prices[:, j] for j, isin in enumerate(isins)}, root)
+    return dates
+
+
+def test_band_status():
+    """Posizione rispetto alla fascia"""
+    assert band_status(0.04, (0.05, 0.15)) == STATUS_BELOW
+    assert band_status(0.10, (0.05, 0.15)) == STATUS_OK
+    assert band_status(0.20, (0.05, 0.15)) == STATUS_ABOVE
+    assert band_status(np.nan, (0.05, 0.15)) == STATUS_MISSING
+    print("✅ Fasce valutate correttamente")
+
+
+def test_report_saved_and_incremental():
+    """Report completo, riletto dal disco e ricalcolato solo per i portafogli aggiornati"""
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as table_dir:
+        dates = _write_store(root)
+        report = get_calibration(root, table_dir)
+
+        assert list(report.index) == [p.id for p in iter_portfolios()]
+        short = [p.id for p in iter_portfolios() if LATE_ISIN in target_weights(p)]
+        assert (report.loc[short, 'volatility_status'] == STATUS_MISSING).all()
+        assert not report.loc[short, 'flagged'].any()
+        complete = report.drop(index=short)
+        assert complete['volatility'].between(0, 1).all()
+        assert (complete['max_drawdown'] <= 0).all()
+        volatilities = portfolio_volatilities(get_covariance(root))
+        np.testing.assert_allclose(complete['volatility'], [volatilities[pid] for pid in complete.index])
+
+        pd.testing.assert_frame_equal(get_calibration(root, table_dir), report)
+
+        # Nuovo prezzo per l'oro: si ricalcolano solo i portafogli che lo contengono
+        gold = 'JE00BN2CJ301'
+        append_series({gold: (np.array([dates[-1] + 7]), [150.0])}, root)
+        computed = []
+        original = calibration.run_backtest
+
+        def tracking(prices, portfolios):
+            computed.extend(p.id for p in iter_portfolios(portfolios))
+            return original(prices, portfolios)
+
+        calibration.run_backtest = tracking
+        try:
+            updated = get_calibration(root, table_dir)
+        finally:
+            calibration.run_backtest = original
+
+        # Rientrano nei backtest solo i portafogli con l'oro e uno storico sufficiente
+        touched = [p.id for p in iter_portfolios() if gold in target_weights(p)]
+        assert sorted(computed) == sorted(pid for pid in touched if pid not in short)
+        unchanged = [pid for pid in report.index if pid not in touched]
+        pd.testing.assert_frame_equal(updated.loc[unchanged], report.loc[unchanged])
+    print("✅ Report di calibrazione salvato e aggiornato in modo incrementale")
+
+
+def test_one_backtest_per_window():
+    """Un backtest per periodo di quotazione comune, con gli stessi drawdown del calcolo per portafoglio"""
+    with tempfile.TemporaryDirectory() as root:
+        _write_store(root)
+        store = PriceStore.open(root)
+        calls = []
+        original = calibration.run_backtest
+
+        def tracking(prices, portfolios):
+            calls.append(len(iter_portfolios(portfolios)))
+            return original(prices, portfolios)
+
+        calibration.run_backtest = tracking
+        try:
+            report = calibration.calibrate(store)
+        finally:
+            calibration.run_backtest = original
+
+        complete = report[report['volatility_status'] != STATUS_MISSING]
+        assert len(calls) == len(set(zip(complete['start'], complete['end']))) < len(complete)
+        assert sum(calls) == len(complete)
+
+        by_id = {p.id: p for p in iter_portfolios()}
+        for portfolio_id, row in complete.iterrows():
+            portfolio = by_id[portfolio_id]
+            prices = store.frame(list(target_weights(portfolio)), row['start'], row['end'])
+            single = run_backtest(prices.astype(np.float64).ffill(), {portfolio.section: (portfolio,)})
+            assert np.isclose(single.metrics.at[portfolio_id, 'max_drawdown'], row['max_drawdown']), portfolio_id
+    print("✅ Drawdown calcolati con un backtest per periodo comune")
+
+
+if __name__ == "__main__":
+    test_band_status()
+    test_report_saved_and_incremental()
+    test_one_backtest_per_window()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test Suite per il Catalogo Compilato dei Portafogli
+"""
+
+import warnings
+
+from catalog import CatalogWarning, compile_catalog, compile_portfolio, get_catalog, iter_portfolios, target_weights
+from portfolios_data import (
+    get_all_portfolios, get_portfolio_by_id, get_portfolios_by_component_count, get_portfolios_by_esg,
+    get_portfolios_by_isin, get_portfolios_by_risk, get_statistics
+)
+
+
+def _raw_portfolio(**overrides):
+    """Portafoglio grezzo minimale per i test"""
+    raw = {
+        'id': 'TEST1',
+        'name': 'Test',
+        'risk_level': 3,
+        'esg': 0,
+        'min_duration': '7',
+        'rebalance': '1y',
+        'strategy_description': 'Test',
+        'components': [
+            {'percentage': '60', 'name': 'ETF A', 'isin': 'IE00BFY0GT14', 'ter': '0.20'},
+            {'percentage': '40', 'name': 'ETF B', 'isin': 'IE00B0M62X26', 'ter': '0,10'},
+        ],
+        'note': ''
+    }
+    raw.update(overrides)
+    return raw
+
+
+def test_catalog_matches_raw_data():
+    """Il catalogo compilato contiene tutti i portafogli con valori numerici coerenti"""
+    raw = get_all_portfolios()
+    catalog = get_catalog()
+
+    for section, portfolios in raw.items():
+        assert [p['id'] for p in portfolios] == [p.id for p in catalog[section]]
+
+    for portfolio in iter_portfolios():
+        assert portfolio.n_components == len(portfolio.components)
+        assert portfolio.is_single == (portfolio.n_components == 1)
+        assert all(isinstance(c.ter, float) for c in portfolio.components)
+
+    print("✅ Catalogo compilato coerente con portfolios_data")
+
+
+def test_derived_fields():
+    """TER ponderato, orizzonte e flag derivati vengono precalcolati correttamente"""
+    portfolio = compile_portfolio(_raw_portfolio(), 'multi')
+    assert abs(portfolio.weighted_ter - (0.20 * 0.6 + 0.10 * 0.4)) < 1e-12
+    assert portfolio.min_years == 7
+    assert not portfolio.is_single and not portfolio.alternatives
+
+    # Bond ladder: ETF alternativi, il TER è quello del singolo ETF scelto
+    ladder = {p.id: p for p in iter_portfolios()}['PORT11b']
+    assert ladder.alternatives
+    assert abs(ladder.weighted_ter - 0.12) < 1e-12
+    assert ladder.min_years == 1
+
+    # TER e pesi descrivono lo stesso ETF: il primo dell'elenco
+    choice = compile_portfolio(_raw_portfolio(components=[
+        {'percentage': '100', 'name': 'A', 'isin': 'A', 'ter': '0.10'},
+        {'percentage': '100', 'name': 'B', 'isin': 'B', 'ter': '0.30'},
+    ]), 'multi')
+    assert choice.alternatives and choice.weighted_ter == 0.10
+    assert target_weights(choice) == {'A': 1.0}
+
+    print("✅ Campi derivati corretti")
+
+
+def test_invalid_data_rejected():
+    """Valori non numerici, livelli fuori scala e ID duplicati bloccano la compilazione"""
+    bad_ter = _raw_portfolio(components=[{'percentage': '100', 'name': 'X', 'isin': 'X', 'ter': 'n/d'}])
+    for raw in (bad_ter, _raw_portfolio(risk_level=9), _raw_portfolio(rebalance='6M')):
+        try:
+            compile_portfolio(raw, 'multi')
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"❌ Dati non validi accettati: {raw}")
+
+    try:
+        compile_catalog({'multi': [_raw_portfolio()], 'single': [_raw_portfolio()], 'esg': []})
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("❌ ID duplicato non rilevato")
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        compile_portfolio(_raw_portfolio(components=[
+            {'percentage': '70', 'name': 'ETF A', 'isin': 'A', 'ter': '0.20'},
+        ]), 'multi')
+    assert any(issubclass(w.category, CatalogWarning) for w in caught)
+
+    print("✅ Dati non validi correttamente rifiutati")
+
+
+def test_portfolios_data_indexes():
+    """Gli indici di portfolios_data restituiscono gli stessi risultati di una scansione lineare"""
+    all_portfolios = [p for section in get_all_portfolios().values() for p in section]
+
+    assert get_portfolio_by_id('PORT8')['risk_level'] == 8
+    assert get_portfolio_by_id('NON_ESISTE') is None
+
+    for risk_level in range(1, 9):
+        assert get_portfolios_by_risk(risk_level) == [p for p in all_portfolios if p['risk_level'] == risk_level]
+    assert get_portfolios_by_esg(True) == [p for p in all_portfolios if p['esg'] == 1]
+    assert get_portfolios_by_esg(False) == [p for p in all_portfolios if p['esg'] == 0]
+    assert get_portfolios_by_component_count(1) == [p for p in all_portfolios if len(p['components']) == 1]
+
+    holders = [p['id'] for p in get_portfolios_by_isin('JE00BN2CJ301')]
+    assert holders == [p['id'] for p in all_portfolios
+                       if any(c['isin'] == 'JE00BN2CJ301' for c in p['components'])]
+
+    stats = get_statistics()
+    assert stats['total_portfolios'] == len(all_portfolios)
+    assert stats['unique_etfs'] == len({c['isin'] for p in all_portfolios for c in p['components']})
+
+    print("✅ Indici di portfolios_data coerenti")
+
+
+if __name__ == "__main__":
+    test_catalog_matches_raw_data()
+    test_derived_fields()
+    test_invalid_data_rejected()
+    test_portfolios_data_indexes()
+    print("\n🎉 TEST CATALOGO COMPLETATI CON SUCCESSO!")
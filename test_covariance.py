@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Test Suite per il Motore di Covarianza
+Confronta la stima vettoriale con pandas e la volatilità batch con il calcolo per portafoglio
+"""
+
+import tempfile
+
+import numpy as np
+
+from catalog import isin_universe, iter_portfolios, target_weights
+from covariance import estimate, get_covariance, portfolio_volatilities, shrink
+from price_store import PriceStore, append_series, write_store
+
+
+def _write_random_store(root, n_days=600, seed=3):
+    """Archivio sintetico con un ETF quotato più tardi e qualche giorno mancante"""
+    isins = list(isin_universe())
+    dates = np.arange('2020-01-01', n_days, dtype='datetime64[D]')
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n_days, len(isins))), axis=0))
+    prices[:200, 0] = np.nan
+    prices[300:303, 1] = np.nan
+    write_store(dates, {isin: prices[:, j] for j, isin in enumerate(isins)}, root)
+    return isins, dates
+
+
+def test_matches_pandas_pairwise_covariance():
+    """Covarianza su coppie complete identica a DataFrame.cov"""
+    with tempfile.TemporaryDirectory() as root:
+        _write_random_store(root)
+        store = PriceStore.open(root)
+        model = estimate(store)
+
+        frame = store.frame(model.isins).astype(np.float64)
+        expected = np.log(frame).diff().cov().to_numpy() * 252
+        np.testing.assert_allclose(model.cov, expected, rtol=1e-9)
+
+        shrunk = shrink(model.cov, 0.5)
+        np.testing.assert_allclose(np.diag(shrunk), np.diag(model.cov))
+        assert np.all(np.abs(shrunk - np.diag(np.diag(shrunk))) <= np.abs(model.cov) + 1e-15)
+    print("✅ Covarianza vettoriale identica a pandas")
+
+
+def test_batch_portfolio_volatility():
+    """Volatilità batch uguale a wᵀ Σ w calcolato portafoglio per portafoglio"""
+    with tempfile.TemporaryDirectory() as root:
+        _write_random_store(root)
+        model = estimate(PriceStore.open(root))
+        volatilities = portfolio_volatilities(model)
+
+        for portfolio in iter_portfolios():
+            weights = target_weights(portfolio)
+            _, cov = model.subset(list(weights))
+            w = np.array(list(weights.values()))
+            assert np.isclose(volatilities[portfolio.id], np.sqrt(w @ cov @ w)), portfolio.id
+    print("✅ Volatilità dei portafogli coerenti")
+
+
+def test_cached_by_store_version():
+    """La stima viene riutilizzata finché l'archivio non cambia"""
+    with tempfile.TemporaryDirectory() as root:
+        isins, dates = _write_random_store(root)
+        first = get_covariance(root)
+        assert get_covariance(root) is first
+
+        new_date = np.array([dates[-1] + 1])
+        append_series({isins[0]: (new_date, [150.0])}, root)
+        second = get_covariance(root)
+        assert second is not first and second.version != first.version
+        assert get_covariance(tempfile.gettempdir() + '/archivio-inesistente') is None
+    print("✅ Covarianza memorizzata per versione dell'archivio")
+
+
+if __name__ == "__main__":
+    test_matches_pandas_pairwise_covariance()
+    test_batch_portfolio_volatility()
+    test_cached_by_store_version()
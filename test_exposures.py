@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test Suite per il Modello di Esposizione
+Verifica la ripartizione degli ETF, il prodotto look-through e la ricerca dei portafogli simili
+"""
+
+import numpy as np
+
+from catalog import get_catalog, iter_portfolios, target_weights
+from exposures import FACTORS, REGIONS, etf_exposure, get_exposure_model
+from synthetic_catalog import generate_catalog, synthetic_version, use_catalog
+
+
+def test_etf_exposure():
+    """LifeStrategy ripartito tra azioni e obbligazioni; le aree coprono la parte investita"""
+    exposure = etf_exposure('Vanguard LifeStrategy 40% Equity UCITS ETF Accumulating')
+    assert abs(exposure['equity'] - 0.4) < 1e-9
+    assert abs(exposure['bond'] - 0.6) < 1e-9
+
+    for name in ('Vanguard LifeStrategy 80% Equity UCITS ETF Accumulating',
+                 'iShares Core MSCI World UCITS ETF', 'Xtrackers II EUR Overnight Rate Swap UCITS ETF'):
+        exposure = etf_exposure(name)
+        invested = sum(exposure[f] for f in FACTORS if f not in REGIONS and f != 'money_market')
+        assert abs(sum(exposure[region] for region in REGIONS) - invested) < 1e-9
+    print("✅ Esposizioni dei singoli ETF")
+
+
+def _dense_product(catalog, model):
+    """Controllo diretto: matrice densa dei pesi per tabella delle esposizioni"""
+    columns = {isin: column for column, isin in enumerate(model.isins)}
+    weights = np.zeros((len(model.ids), len(model.isins)))
+    for row, portfolio in enumerate(iter_portfolios(catalog)):
+        for isin, weight in target_weights(portfolio).items():
+            weights[row, columns[isin]] += weight
+    return weights @ model.table
+
+
+def test_look_through_matches_dense_product():
+    """Prodotto sparso identico a quello denso, sul catalogo reale e su uno sintetico"""
+    model = get_exposure_model(get_catalog())
+    assert np.allclose(model.matrix, _dense_product(get_catalog(), model))
+    assert model.exposure('PORT13')['equity'] == model.column('equity')[model.ids.index('PORT13')]
+
+    with use_catalog(generate_catalog(1_000), synthetic_version(1_000)) as compiled:
+        synthetic = get_exposure_model(compiled)
+        assert synthetic is not model
+        assert synthetic is get_exposure_model(compiled)
+        assert np.allclose(synthetic.matrix, _dense_product(compiled, synthetic))
+    print("✅ Look-through identico al prodotto denso")
+
+
+def test_similar_portfolios():
+    """Il portafoglio stesso è escluso e i simili sono ordinati per distanza"""
+    model = get_exposure_model(get_catalog())
+    similar = model.similar('PORT15', limit=5)
+    assert len(similar) == 5
+    assert all(other.id != 'PORT15' for other, _ in similar)
+    distances = [distance for _, distance in similar]
+    assert distances == sorted(distances)
+
+    try:
+        model.similar('PORTX')
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("❌ Portafoglio inesistente accettato")
+    print("✅ Portafogli simili per esposizione")
+
+
+if __name__ == "__main__":
+    test_etf_exposure()
+    test_look_through_matches_dense_product()
+    test_similar_portfolios()
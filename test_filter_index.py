@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test Suite per l'Indice a Bitset dei Filtri
+Verifica che i filtri con i bitset coincidano con il controllo portafoglio per portafoglio
+e che l'indice e i risultati vengano riutilizzati
+"""
+
+import random
+
+from catalog import get_catalog
+from engine import filter_portfolios
+from filter_index import FilterIndex, get_filter_index, iter_bits
+from synthetic_catalog import generate_catalog, synthetic_version, use_catalog
+
+
+def _scan(portfolios, risk_filter, esg_filter, single_only, rebalance_filter=None):
+    """Filtro di riferimento: controllo diretto di ogni portafoglio"""
+    return {
+        section: [p for p in portfolio_list
+                  if p.risk_level in risk_filter
+                  and (not esg_filter or p.esg == 1)
+                  and (not single_only or p.is_single)
+                  and (rebalance_filter is None or p.rebalance in rebalance_filter)]
+        for section, portfolio_list in portfolios.items()
+    }
+
+
+def test_matches_scan():
+    """Stessi portafogli, nello stesso ordine, sul catalogo reale e su uno sintetico"""
+    rng = random.Random(7)
+    with use_catalog(generate_catalog(3_000), synthetic_version(3_000)) as synthetic:
+        for portfolios in (get_catalog(), synthetic):
+            for _ in range(40):
+                risk_filter = rng.sample(range(1, 9), rng.randint(0, 8))
+                esg_filter, single_only = rng.random() < 0.5, rng.random() < 0.5
+                rebalance_filter = rng.choice([None, ['NO'], ['1y', '3M']])
+                assert filter_portfolios(portfolios, risk_filter, esg_filter, single_only, rebalance_filter) \
+                    == _scan(portfolios, risk_filter, esg_filter, single_only, rebalance_filter)
+    print("✅ Filtri con bitset identici al controllo diretto")
+
+
+def test_index_and_result_reuse():
+    """L'indice si ricostruisce solo al cambio di catalogo; i risultati sono memorizzati per filtri"""
+    portfolios = get_catalog()
+    index = get_filter_index(portfolios)
+    assert get_filter_index(portfolios) is index
+    assert index.filter([1, 2], True, False) is index.filter((2, 1), True, False)
+
+    result = filter_portfolios(portfolios, [1, 2], False, False)
+    result['multi'].clear()
+    assert filter_portfolios(portfolios, [1, 2], False, False)['multi']
+
+    empty = FilterIndex({'multi': (), 'single': (), 'esg': ()})
+    assert empty.filter(range(1, 9)) == {'multi': (), 'single': (), 'esg': ()}
+    assert list(iter_bits(0b101001)) == [0, 3, 5] and list(iter_bits(0)) == []
+    print("✅ Indice e risultati riutilizzati")
+
+
+if __name__ == "__main__":
+    test_matches_scan()
+    test_index_and_result_reuse()
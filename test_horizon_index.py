@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test Suite per gli Intervalli di Orizzonte
+Verifica il parsing di min_duration, le ricerche per sovrapposizione e il filtro del wizard
+"""
+
+import itertools
+import math
+import random
+
+from catalog import get_catalog, iter_portfolios, parse_horizon
+from engine import HORIZON_OPTIONS, HORIZON_YEARS, WIZARD_QUESTIONS, calculate_recommendations
+from horizon_index import HorizonIndex, get_horizon_index
+from synthetic_catalog import generate_catalog, synthetic_version, use_catalog
+
+
+def test_parse_horizon():
+    """Numeri singoli e intervalli aperti verso l'alto, intervalli chiusi con estremi inclusi"""
+    assert parse_horizon('10') == (10, math.inf)
+    assert parse_horizon('1..xx') == (1, math.inf)
+    assert parse_horizon('1...9') == (1, 9)
+    assert parse_horizon('3-7') == (3, 7)
+
+    for label in ('', 'dieci', '9...1'):
+        try:
+            parse_horizon(label, 'PORTX')
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"❌ Orizzonte '{label}' accettato")
+
+    ladder = {p.id: p for p in iter_portfolios()}['PORT11b']
+    assert (ladder.min_years, ladder.max_years) == (1, 9)
+    print("✅ Parsing degli orizzonti")
+
+
+def test_overlap_matches_scan():
+    """Stessi portafogli del confronto diretto tra intervalli, anche su un catalogo sintetico"""
+    rng = random.Random(5)
+    with use_catalog(generate_catalog(1_500), synthetic_version(1_500)) as synthetic:
+        for portfolios in (get_catalog(), synthetic):
+            index = HorizonIndex(portfolios)
+            flat = iter_portfolios(portfolios)
+            queries = list(HORIZON_YEARS.values()) + [(0, 0), (100, math.inf)]
+            queries += [tuple(sorted(rng.sample(range(0, 20), 2))) for _ in range(20)]
+            for low, high in queries:
+                expected = bytes(p.min_years <= high and p.max_years >= low for p in flat)
+                assert index.compatible(low, high) == expected
+
+    assert get_horizon_index(get_catalog()) is get_horizon_index(get_catalog())
+    print("✅ Ricerche per sovrapposizione identiche al confronto diretto")
+
+
+def test_wizard_respects_horizon():
+    """Il wizard non propone portafogli con un orizzonte incompatibile con quello dell'utente"""
+    catalog = get_catalog()
+    short = HORIZON_OPTIONS[0]
+    for answers in itertools.islice(itertools.product(*WIZARD_QUESTIONS.values()), 0, None, 97):
+        answers = list(answers)
+        low, high = HORIZON_YEARS[answers[1]]
+        for portfolio in calculate_recommendations(catalog, *answers)['portfolios']:
+            assert portfolio.min_years <= high and portfolio.max_years >= low
+
+        answers[1] = short
+        for portfolio in calculate_recommendations(catalog, *answers)['portfolios']:
+            assert portfolio.min_years <= 3, f"❌ {portfolio.id} proposto per meno di 3 anni"
+    print("✅ Il wizard rispetta l'orizzonte dell'utente")
+
+
+if __name__ == "__main__":
+    test_parse_horizon()
+    test_overlap_matches_scan()
+    test_wizard_respects_horizon()
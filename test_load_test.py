@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test Suite per il Test di Carico
+Verifica il conteggio della memoria di sessione, i percentili e una breve esecuzione
+con una sessione wizard e una di esplorazione (senza asserzioni sui tempi), anche da riga
+di comando su un catalogo sintetico
+"""
+
+import contextlib
+import io
+import sys
+
+import catalog
+from load_test import (EXPLORE_MODE, TIMEOUT, deep_sizeof, main, percentile, run_load_test, state_group,
+                       summarize_latencies, summarize_memory)
+from synthetic_catalog import generate_catalog, synthetic_version, use_catalog
+from wizard_timing import APP_PATH
+
+
+def test_deep_sizeof_skips_shared_catalog():
+    """I portafogli del catalogo condiviso non contano nella memoria della sessione"""
+    portfolios = [p for section in catalog.get_catalog().values() for p in section]
+    assert deep_sizeof(portfolios) == sys.getsizeof(portfolios)
+
+    nested = {'criteria': {'note': 'x' * 10_000}}
+    assert deep_sizeof(nested) > 10_000
+    assert state_group('open_all_PORT16') == 'open_*' and state_group('wizard_results') == 'wizard_results'
+    print("✅ Memoria di sessione senza il catalogo condiviso")
+
+
+def test_percentiles():
+    """Percentili con interpolazione lineare"""
+    values = [0.001 * i for i in range(1, 101)]
+    assert abs(percentile(values, 50) - 0.0505) < 1e-9
+    assert percentile(values, 100) == 0.1 and percentile([0.2], 99) == 0.2
+    print("✅ Percentili delle latenze")
+
+
+def test_short_load_run():
+    """Una sessione per modalità: interazioni registrate e wizard_results nella memoria"""
+    result = run_load_test(sessions=2, concurrency=2, wizard_share=0.5, seed=3, explore_steps_count=2)
+    kinds = {entry['kind'] for entry in result['memory']}
+    assert len(result['memory']) == 2
+
+    interactions = {row['interaction'] for row in summarize_latencies(result['latencies'])}
+    assert 'initial_load' in interactions
+    if 'wizard' in kinds:
+        assert {'wizard_answer', 'wizard_submit'} <= interactions
+        wizard = next(entry for entry in result['memory'] if entry['kind'] == 'wizard')
+        assert wizard['keys']['wizard_results'] > 0
+    if 'explore' in kinds:
+        assert 'explore_mode' in interactions
+
+    by_key, by_kind = summarize_memory(result['memory'])
+    assert set(by_kind) == kinds and 'wizard_completed' in by_key
+    print("✅ Breve test di carico")
+
+
+def test_synthetic_cli():
+    """Da riga di comando con --synthetic: sessioni solo wizard e solo esplorazione, poi catalogo ripristinato"""
+    original = catalog.CATALOG_VERSION
+    for share in ('1.0', '0.0'):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(io.StringIO()):
+            code = main(['--sessions', '2', '--concurrency', '2', '--synthetic', '200', '--seed', '4',
+                         '--wizard-share', share, '--explore-steps', '4'])
+        assert code == 0
+        assert f"Catalogo {synthetic_version(200, 4)}" in output.getvalue()
+        assert ('wizard_submit' in output.getvalue()) == (share == '1.0')
+    assert catalog.CATALOG_VERSION == original
+    print("✅ Test di carico sintetico da riga di comando")
+
+
+def test_synthetic_explore_views():
+    """Con un catalogo sintetico ogni vista di esplorazione, frontiera e corpo dei portafogli inclusi, si apre senza errori"""
+    from streamlit.testing.v1 import AppTest
+
+    with use_catalog(generate_catalog(200, seed=4), synthetic_version(200, seed=4)):
+        app = AppTest.from_file(APP_PATH, default_timeout=TIMEOUT).run()
+        app.sidebar.radio[0].set_value(EXPLORE_MODE).run()
+        for view in app.sidebar.radio[1].options:
+            app.sidebar.radio[1].set_value(view).run()
+            assert not app.exception, (view, app.exception)
+            if app.main.toggle:
+                app.main.toggle[0].set_value(True).run()
+                assert not app.exception, (view, app.exception)
+    print("✅ Viste di esplorazione sul catalogo sintetico")
+
+
+if __name__ == "__main__":
+    test_deep_sizeof_skips_shared_catalog()
+    test_percentiles()
+    test_short_load_run()
+    test_synthetic_cli()
+    test_synthetic_explore_views()
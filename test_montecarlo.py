@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test Suite per la Simulazione Monte Carlo
+Verifica riproducibilità, indipendenza dalla dimensione dei blocchi e casi deterministici
+"""
+
+import numpy as np
+
+from catalog import compile_catalog, get_portfolio, iter_portfolios
+from montecarlo import simulate_paths, simulate_portfolio
+from synthetic_catalog import generate_catalog
+
+
+def test_paths_reproducible_across_chunk_sizes():
+    """Stesso seed, stessi scenari, qualunque sia la dimensione dei blocchi"""
+    mean = np.array([0.07, 0.03])
+    cov = np.array([[0.0256, 0.0013], [0.0013, 0.0030]])
+    small = simulate_paths([0.6, 0.4], mean, cov, years=5, n_paths=5_000, chunk_size=700, seed=1)
+    large = simulate_paths([0.6, 0.4], mean, cov, years=5, n_paths=5_000, chunk_size=5_000, seed=1)
+    np.testing.assert_allclose(small, large, rtol=1e-6)
+
+    other = simulate_paths([0.6, 0.4], mean, cov, years=5, n_paths=5_000, seed=2)
+    assert not np.allclose(small, other)
+    print("✅ Scenari riproducibili e indipendenti dai blocchi")
+
+
+def test_deterministic_without_volatility():
+    """Senza volatilità il capitale cresce esattamente al rendimento atteso"""
+    mean = np.array([0.05, 0.02])
+    for rebalanced in (True, False):
+        wealth = simulate_paths([0.5, 0.5], mean, np.zeros((2, 2)), years=3, rebalanced=rebalanced,
+                                n_paths=10)
+        expected = 0.5 * 1.05 ** np.arange(4) + 0.5 * 1.02 ** np.arange(4)
+        if rebalanced:
+            expected = 1.035 ** np.arange(4)
+        np.testing.assert_allclose(wealth, np.tile(expected, (10, 1)), rtol=1e-6)
+    print("✅ Casi deterministici corretti per ribilanciamento e buy-and-hold")
+
+
+def test_portfolio_outcomes():
+    """Orizzonte dal catalogo, bande ordinate e rischio di perdita crescente con il rischio"""
+    cautious = simulate_portfolio(get_portfolio('PORT2a'), n_paths=20_000)
+    leveraged = simulate_portfolio(get_portfolio('PORT8'), n_paths=20_000)
+
+    assert cautious.years == 5 and leveraged.years == 10
+    assert cautious.bands.shape == (5, 6)
+    assert np.all(np.diff(cautious.bands, axis=0) >= 0)
+    assert 0 < cautious.probability_of_loss < leveraged.probability_of_loss < 1
+    print("✅ Bande e probabilità di perdita coerenti con il profilo di rischio")
+
+
+def test_portfolio_outside_catalog():
+    """I nomi degli ETF vengono dal portafoglio stesso: funziona anche fuori dal catalogo installato"""
+    portfolios = iter_portfolios(compile_catalog(generate_catalog(30, seed=3)))
+    for portfolio in portfolios[:5]:
+        result = simulate_portfolio(portfolio, n_paths=1_000)
+        assert result.years == max(portfolio.min_years, 1)
+        assert 0 <= result.probability_of_loss <= 1
+    print("✅ Simulazione indipendente dal catalogo installato")
+
+
+if __name__ == "__main__":
+    test_paths_reproducible_across_chunk_sizes()
+    test_deterministic_without_volatility()
+    test_portfolio_outcomes()
+    test_portfolio_outside_catalog()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test Suite per l'Ottimizzatore della Frontiera Efficiente
+Verifica proiezione, condizioni di ottimalità e posizione dei portafogli modello
+"""
+
+import tempfile
+
+import numpy as np
+
+from catalog import compile_catalog, isin_names, isin_universe
+from market_assumptions import etf_moments
+from optimizer import (SOURCE_ASSUMPTIONS, efficient_frontier, portfolio_positions, project_capped_simplex,
+                       solve_mean_variance, universe_moments)
+from synthetic_catalog import generate_catalog
+
+
+def _kkt_violation(weights, gradient, cap, tol=1e-6):
+    """
+    Massima violazione delle condizioni KKT per min gᵀw con 0 <= w <= cap e somma 1:
+    esiste un livello comune ν con g = ν sui pesi liberi, g >= ν sui nulli e g <= ν su quelli al massimo
+    """
+    free = (weights > tol) & (weights < cap - tol)
+    at_zero = weights <= tol
+    at_cap = weights >= cap - tol
+    low = max(gradient[at_cap].max(initial=-np.inf), gradient[free].max(initial=-np.inf))
+    high = min(gradient[at_zero].min(initial=np.inf), gradient[free].min(initial=np.inf))
+    spread = np.ptp(gradient[free]) if free.any() else 0.0
+    return max(low - high, spread, 0.0)
+
+
+def test_projection():
+    """Le righe proiettate rispettano i vincoli e sono punti fissi della proiezione"""
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(50, 12)) * 3
+    for cap in (1.0, 0.25, 1 / 12):
+        projected = project_capped_simplex(values, cap)
+        assert np.allclose(projected.sum(axis=1), 1)
+        assert projected.min() >= 0 and projected.max() <= cap + 1e-12
+        assert np.allclose(project_capped_simplex(projected, cap), projected)
+    print("✅ Proiezione sul simplesso con pesi massimi corretta")
+
+
+def test_solutions_are_optimal():
+    """Ogni punto risolto soddisfa le condizioni KKT del proprio problema"""
+    isins = isin_universe()
+    mean, cov = etf_moments(isins, isin_names())
+    aversions = np.array([0.5, 5.0, 50.0, np.inf])
+    for cap in (1.0, 0.2):
+        weights = solve_mean_variance(mean, cov, aversions, cap)
+        for w, aversion in zip(weights, aversions):
+            gradient = cov @ w if np.isinf(aversion) else aversion * (cov @ w) - mean
+            assert _kkt_violation(w, gradient, cap) < 1e-5, (cap, aversion)
+    print("✅ Soluzioni ottime per tutte le avversioni al rischio")
+
+
+def test_frontier_and_positions():
+    """Frontiera crescente, vincoli rispettati e portafogli modello non oltre la frontiera"""
+    isins = isin_universe()
+    mean, cov = etf_moments(isins, isin_names())
+    frontier = efficient_frontier(mean, cov, isins, cap=0.3)
+
+    assert np.all(np.diff(frontier.volatilities) >= -1e-12)
+    assert np.all(np.diff(frontier.returns) >= -1e-9)
+    assert frontier.weights.max() <= 0.3 + 1e-9
+    assert frontier.volatilities[frontier.min_variance] == frontier.volatilities.min()
+    assert abs(sum(frontier.allocation(frontier.max_sharpe).values()) - 1) < 1e-3
+
+    unconstrained = efficient_frontier(mean, cov, isins, cap=1.0)
+    positions = portfolio_positions(unconstrained, mean, cov)
+    assert len(positions) > 0
+    assert (positions['gap'] > -1e-6).all()
+    print("✅ Frontiera efficiente e posizioni dei portafogli coerenti")
+
+
+def test_universe_of_other_catalog():
+    """Senza archivio prezzi l'universo e i nomi vengono dal catalogo indicato, non da quello installato"""
+    portfolios = compile_catalog(generate_catalog(40, seed=5))
+    with tempfile.TemporaryDirectory() as root:
+        isins, mean, cov, source = universe_moments(portfolios, root=root)
+    assert source == SOURCE_ASSUMPTIONS and isins == isin_universe(portfolios)
+    assert mean.shape == (len(isins),) and cov.shape == (len(isins), len(isins))
+
+    frontier = efficient_frontier(mean, cov, isins, cap=0.5)
+    assert len(portfolio_positions(frontier, mean, cov, portfolios)) > 0
+    print("✅ Frontiera su un catalogo diverso da quello installato")
+
+
+if __name__ == "__main__":
+    test_projection()
+    test_solutions_are_optimal()
+    test_frontier_and_positions()
+    test_universe_of_other_catalog()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Test Suite per l'Importazione dei Prezzi
+Verifica validazione, deduplicazione, scrittura a lotti, aggiunte incrementali e portafogli da ricalcolare
+"""
+
+import io
+import os
+import tempfile
+
+import numpy as np
+
+import price_import
+from portfolios_data import get_portfolios_by_isin
+from price_import import import_prices
+from price_store import PriceStore
+
+WORLD = 'IE00BFY0GT14'
+GOLD = 'JE00BN2CJ301'
+
+LONG_EXPORT = """date,isin,price
+2024-01-02,IE00BFY0GT14,100.5
+2024-01-02,JE00BN2CJ301,20.1
+2024-01-03,IE00BFY0GT14,101.0
+2024-01-03,JE00BN2CJ301,n/d
+2024-13-01,IE00BFY0GT14,99.0
+2024-01-03,XX123,10.0
+2024-01-04,IE00BFY0GT14,101.5
+2024-01-04,IE00BFY0GT14,101.7
+2024-01-15,JE00BN2CJ301,20.4
+"""
+
+WIDE_UPDATE = """date,IE00BFY0GT14
+2024-01-05,102.0
+2024-01-08,102.4
+"""
+
+
+def test_long_export_validated():
+    """Righe non valide scartate, duplicati risolti con l'ultima riga, buchi segnalati"""
+    with tempfile.TemporaryDirectory() as root:
+        report = import_prices([io.StringIO(LONG_EXPORT)], root=root, chunk_size=3)
+
+        assert report.rows_read == 9
+        assert report.invalid_rows == 3
+        assert report.duplicates == 1
+        assert report.rows_appended == 5
+        assert report.gaps == ((GOLD, '2024-01-02', '2024-01-15'),)
+
+        store = PriceStore.open(root)
+        world = store.frame([WORLD])[WORLD]
+        assert world.loc['2024-01-04'] == np.float32(101.7)
+        assert store.series(WORLD).dtype == np.float32
+    print("✅ Export validato e compattato")
+
+
+def test_incremental_append():
+    """Solo le date nuove vengono aggiunte e solo i portafogli interessati vanno ricalcolati"""
+    with tempfile.TemporaryDirectory() as root:
+        import_prices([io.StringIO(LONG_EXPORT)], root=root)
+        before = PriceStore.open(root)
+        gold_version = before.data_version([GOLD])
+
+        path = os.path.join(root, 'update.csv')
+        with open(path, 'w') as f:
+            f.write(WIDE_UPDATE)
+        report = import_prices([path, io.StringIO(LONG_EXPORT)], root=root)
+
+        assert report.rows_appended == 2
+        assert report.rows_existing == 6
+        assert report.updated_isins == (WORLD,)
+        assert set(report.stale_portfolios) == {p['id'] for p in get_portfolios_by_isin(WORLD)}
+
+        after = PriceStore.open(root)
+        assert after.data_version([GOLD]) == gold_version
+        assert after.data_version([WORLD]) != before.data_version([WORLD])
+        assert after.column(WORLD, '2024-01-05', '2024-01-08').tolist() == [np.float32(102.0), np.float32(102.4)]
+
+        # Reimportare lo stesso file non cambia la versione dell'archivio
+        again = import_prices([path], root=root)
+        assert again.rows_appended == 0 and again.version == after.version
+    print("✅ Aggiunte incrementali e portafogli da ricalcolare corretti")
+
+
+def test_flush_by_row_budget():
+    """Scritture a lotti: stesso archivio e stesso report di un'unica scrittura finale"""
+    with tempfile.TemporaryDirectory() as single_root, tempfile.TemporaryDirectory() as batched_root:
+        single = import_prices([io.StringIO(LONG_EXPORT)], root=single_root, chunk_size=3)
+
+        flushed = []
+        original = price_import.append_series
+
+        def tracking(updates, root):
+            flushed.append(sum(len(dates) for dates, _ in updates.values()))
+            return original(updates, root)
+
+        price_import.append_series = tracking
+        try:
+            batched = import_prices([io.StringIO(LONG_EXPORT)], root=batched_root, chunk_size=3, flush_rows=1)
+        finally:
+            price_import.append_series = original
+
+        # Un lotto per ogni blocco con righe nuove (il secondo è tutto scartato), più la chiamata finale vuota
+        assert flushed == [3, 2, 0]
+        for field in ('rows_read', 'rows_appended', 'rows_existing', 'invalid_rows', 'duplicates',
+                      'gaps', 'updated_isins', 'stale_portfolios'):
+            assert getattr(batched, field) == getattr(single, field), field
+
+        expected, actual = PriceStore.open(single_root), PriceStore.open(batched_root)
+        assert actual.dates.tolist() == expected.dates.tolist()
+        for isin in (WORLD, GOLD):
+            np.testing.assert_array_equal(actual.column(isin), expected.column(isin))
+    print("✅ Scrittura a lotti equivalente a quella finale")
+
+
+if __name__ == "__main__":
+    test_long_export_validated()
+    test_flush_by_row_budget()
+    test_incremental_append()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Test Suite per l'Archivio Prezzi
+Verifica scrittura, lettura in memory mapping, allineamento e versioni
+"""
+
+import pickle
+import tempfile
+
+import numpy as np
+
+from price_store import PriceStore, append_series, open_store, store_version, write_store
+
+DATES = np.arange('2024-01-01', '2024-01-11', dtype='datetime64[D]')
+
+
+def test_roundtrip_and_alignment():
+    """Le serie tornano identiche, allineate all'indice condiviso e senza copie"""
+    with tempfile.TemporaryDirectory() as root:
+        assert open_store(root) is None and store_version(root) is None
+        write_store(DATES, {'IE00BFY0GT14': np.linspace(100, 109, 10), 'JE00BN2CJ301': [50, 51, 52]}, root)
+        store = PriceStore.open(root)
+
+        assert store.isins == ('IE00BFY0GT14', 'JE00BN2CJ301')
+        world = store.column('IE00BFY0GT14', '2024-01-03', '2024-01-05')
+        assert isinstance(world, np.memmap)
+        assert world.tolist() == [102, 103, 104]
+
+        gold = store.column('JE00BN2CJ301')
+        assert gold[:3].tolist() == [50, 51, 52] and np.isnan(gold[3:]).all()
+
+        frame = store.frame(start='2024-01-09')
+        assert list(frame.index.strftime('%m-%d')) == ['01-09', '01-10']
+        assert frame['JE00BN2CJ301'].isna().all()
+
+        try:
+            store.series('IE00BK5BQT80')
+        except KeyError:
+            pass
+        else:
+            raise AssertionError("❌ ISIN assente restituito dall'archivio")
+    print("✅ Serie lette in memory mapping e allineate alle date")
+
+
+def test_versions_and_readers():
+    """Ogni scrittura cambia versione; i lettori aperti restano sulla loro versione"""
+    with tempfile.TemporaryDirectory() as root:
+        write_store(DATES, {'IE00BFY0GT14': np.ones(10)}, root)
+        old = PriceStore.open(root)
+        old.series('IE00BFY0GT14')
+
+        write_store(DATES, {'IE00BFY0GT14': np.full(10, 2.0)}, root)
+        assert store_version(root) != old.version
+        assert old.column('IE00BFY0GT14').tolist() == [1.0] * 10
+
+        # Nei worker l'archivio viene riaperto dal percorso, alla versione corrente
+        reopened = pickle.loads(pickle.dumps(old))
+        assert reopened.column('IE00BFY0GT14').tolist() == [2.0] * 10
+    print("✅ Versioni e lettori concorrenti gestiti correttamente")
+
+
+def test_append_in_place():
+    """Le nuove date vengono aggiunte in coda senza toccare le serie non aggiornate"""
+    with tempfile.TemporaryDirectory() as root:
+        write_store(DATES, {'IE00BFY0GT14': np.ones(10), 'JE00BN2CJ301': np.ones(10)}, root)
+        old = PriceStore.open(root)
+        new_dates = np.array(['2024-01-12', '2024-01-15'], dtype='datetime64[D]')
+        append_series({'IE00BFY0GT14': (new_dates, [3.0, 4.0])}, root)
+
+        store = PriceStore.open(root)
+        assert len(store.dates) == 12 and len(old.dates) == 10
+        assert store.column('IE00BFY0GT14', '2024-01-11').tolist() == [3.0, 4.0]
+        assert np.isnan(store.column('JE00BN2CJ301')[10:]).all()
+        assert store.revision('JE00BN2CJ301') == old.revision('JE00BN2CJ301')
+        assert store.revision('IE00BFY0GT14') > old.revision('IE00BFY0GT14')
+        assert old.column('IE00BFY0GT14').tolist() == [1.0] * 10
+
+        try:
+            append_series({'IE00BFY0GT14': (new_dates[:1], [5.0])}, root)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("❌ Prezzi esistenti sovrascritti da un'aggiunta")
+    print("✅ Aggiunte in coda senza riscrivere l'archivio")
+
+
+def test_invalid_input():
+    """Date non ordinate, ISIN non validi e serie troppo lunghe vengono rifiutati"""
+    with tempfile.TemporaryDirectory() as root:
+        invalid = (
+            (DATES[::-1], {}),
+            (DATES, {'../etc': np.ones(10)}),
+            (DATES, {'IE00BFY0GT14': np.ones(11)}),
+        )
+        for dates, series in invalid:
+            try:
+                write_store(dates, series, root)
+            except ValueError:
+                pass
+            else:
+                raise AssertionError(f"❌ Dati non validi accettati: {list(series)}")
+    print("✅ Dati non validi rifiutati")
+
+
+if __name__ == "__main__":
+    test_roundtrip_and_alignment()
+    test_versions_and_readers()
+    test_append_in_place()
+    test_invalid_input()
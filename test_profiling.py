@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test Suite per la Profilazione delle Esecuzioni
+Verifica fasi, picchi di memoria annidati, esecuzioni sovrapposte, log JSONL, dump cProfile, rilascio di
+tracemalloc e token del pannello di debug
+"""
+
+import os
+import tempfile
+import time
+import tracemalloc
+
+from profiling import (DEBUG_TOKEN_ENV, RerunProfiler, active_profiler, append_log, debug_token_matches, phase,
+                       profile_rerun, read_log, summarize_log)
+
+
+def test_phases_and_log():
+    """Fasi misurate e sommate per nome, record aggiunto al log JSONL"""
+    with tempfile.TemporaryDirectory() as root:
+        log_path = os.path.join(root, 'profile.jsonl')
+        with profile_rerun('app', log_path=log_path) as profiler:
+            with phase('data_load'):
+                time.sleep(0.01)
+            for _ in range(2):
+                with phase('sidebar'):
+                    pass
+        record = profiler.record
+        assert active_profiler() is None
+        assert list(record['phases']) == ['data_load', 'sidebar']
+        assert record['phases']['data_load']['seconds'] >= 0.01
+        assert record['phases']['sidebar']['calls'] == 2
+        assert record['total_seconds'] >= record['phases']['data_load']['seconds']
+        assert 'profile' not in record
+
+        with profile_rerun('wizard', log_path=log_path):
+            with phase('wizard_scoring'):
+                pass
+        records = read_log(log_path)
+        assert [r['label'] for r in records] == ['app', 'wizard']
+        assert records[0] == record
+
+        summary = summarize_log(records)
+        assert {row['phase'] for row in summary} == {'data_load', 'sidebar', 'wizard_scoring'}
+        assert summary[0]['phase'] == 'data_load'
+    print("✅ Fasi misurate e registrate nel log")
+
+
+def test_nested_peak_and_reentrant_run():
+    """Il picco di una fase annidata vale anche per quella esterna; un'esecuzione annidata confluisce nell'attiva"""
+    with tempfile.TemporaryDirectory() as root:
+        log_path = os.path.join(root, 'profile.jsonl')
+        with profile_rerun('app', log_path=log_path) as outer:
+            with phase('wizard'):
+                with profile_rerun('wizard', log_path=log_path) as inner:
+                    assert inner is outer
+                    with phase('wizard_scoring'):
+                        block = bytearray(4 * 1024 * 1024)
+                        del block
+        phases = outer.record['phases']
+        assert phases['wizard_scoring']['process_peak_kb'] >= 4096
+        assert phases['wizard']['process_peak_kb'] >= phases['wizard_scoring']['process_peak_kb']
+        assert len(read_log(log_path)) == 1
+    print("✅ Picchi annidati ed esecuzioni rientranti")
+
+
+def test_overlapping_runs_counted():
+    """Il picco è del processo: ogni record riporta quante esecuzioni profilate si sono sovrapposte"""
+    with tempfile.TemporaryDirectory() as root:
+        first = RerunProfiler('prima')
+        second = RerunProfiler('seconda')
+        second.finish(root)
+        first.finish(root)
+        alone = RerunProfiler('sola')
+        alone.finish(root)
+        assert first.record['overlapping_runs'] == 1 and second.record['overlapping_runs'] == 1
+        assert alone.record['overlapping_runs'] == 0
+        assert 'process_traced_kb' in alone.record
+
+    # I record scritti prima dell'etichetta di processo restano leggibili
+    old = {'phases': {'sidebar': {'seconds': 0.01, 'peak_kb': 12.0, 'calls': 1}}}
+    assert summarize_log([old])[0]['process_peak_kb'] == 12.0
+    print("✅ Esecuzioni profilate sovrapposte conteggiate")
+
+
+def test_disabled_and_cprofile():
+    """Senza esecuzione attiva le fasi non costano nulla; con profile=True si salva il dump"""
+    with phase('fuori'):
+        pass
+    with profile_rerun('app', enabled=False) as profiler:
+        assert profiler is None
+        assert active_profiler() is None
+
+    with tempfile.TemporaryDirectory() as root:
+        log_path = os.path.join(root, 'profile.jsonl')
+        with profile_rerun('app', profile=True, log_path=log_path) as profiler:
+            with phase('footer'):
+                sorted(range(10_000), key=lambda x: -x)
+        record = profiler.record
+        assert os.path.exists(record['profile'])
+        assert record['top_functions'] and len(record['top_functions'][0]) == 4
+    print("✅ Fasi senza costi fuori dalle esecuzioni profilate e dump cProfile")
+
+
+def test_tracing_released_and_log_rotation():
+    """tracemalloc si ferma con l'ultima esecuzione che l'ha avviato; il log ruota oltre la soglia"""
+    assert not tracemalloc.is_tracing()
+    with tempfile.TemporaryDirectory() as root:
+        log_path = os.path.join(root, 'profile.jsonl')
+        with profile_rerun('app', log_path=log_path):
+            assert tracemalloc.is_tracing()
+        assert not tracemalloc.is_tracing()
+
+        for label in ('a', 'b', 'c'):
+            append_log({'label': label, 'phases': {}}, log_path, max_bytes=10)
+        assert [r['label'] for r in read_log(log_path)] == ['c']
+        assert [r['label'] for r in read_log(log_path + '.1')] == ['b']
+    print("✅ tracemalloc rilasciato e log ruotato")
+
+
+def test_debug_token():
+    """Il parametro ?debug attiva il pannello solo con il token configurato"""
+    saved = os.environ.pop(DEBUG_TOKEN_ENV, None)
+    try:
+        assert not debug_token_matches('1') and not debug_token_matches(None)
+        os.environ[DEBUG_TOKEN_ENV] = 's3greto'
+        assert debug_token_matches('s3greto')
+        assert not debug_token_matches('1') and not debug_token_matches('')
+    finally:
+        os.environ.pop(DEBUG_TOKEN_ENV, None)
+        if saved is not None:
+            os.environ[DEBUG_TOKEN_ENV] = saved
+    print("✅ Pannello di debug protetto da token")
+
+
+if __name__ == "__main__":
+    test_phases_and_log()
+    test_nested_peak_and_reentrant_run()
+    test_overlapping_runs_counted()
+    test_disabled_and_cprofile()
+    test_tracing_released_and_log_rotation()
+    test_debug_token()
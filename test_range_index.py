@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test Suite per l'Indice per Intervalli
+Verifica quote per classe di attivo, ricerche per intervallo e combinazione con gli altri filtri
+"""
+
+import random
+
+from catalog import get_catalog, get_portfolio
+from engine import filter_portfolios
+from range_index import COLUMNS, catalog_columns, get_range_index
+from synthetic_catalog import generate_catalog, synthetic_version, use_catalog
+
+
+def test_asset_shares():
+    """Quote coerenti con la composizione: azionario puro, leva e componenti alternativi"""
+    portfolios = [p for section in get_catalog().values() for p in section]
+    columns = catalog_columns(get_catalog())
+    shares = columns['equity'] + columns['bond'] + columns['gold']
+    for column in ('equity', 'bond', 'gold'):
+        assert (columns[column] >= 0).all()
+    for portfolio, total, equity in zip(portfolios, shares, columns['equity']):
+        if portfolio.risk_level != 8:
+            assert total <= 100 + 1e-6
+        else:
+            assert equity > 100
+    print("✅ Quote per classe di attivo")
+
+
+def test_range_queries_match_scan():
+    """Intervalli combinati con rischio ed ESG: stessi portafogli del controllo diretto"""
+    rng = random.Random(3)
+    with use_catalog(generate_catalog(2_000), synthetic_version(2_000)) as compiled:
+        index = get_range_index(compiled)
+        portfolios = [p for section in compiled.values() for p in section]
+        columns = catalog_columns(compiled)
+        values = [{column: columns[column][i] for column in COLUMNS} for i in range(len(portfolios))]
+
+        for _ in range(30):
+            column = rng.choice(COLUMNS)
+            low, high = sorted(rng.uniform(*index.bounds(column)) for _ in range(2))
+            ranges = [(column, low, None), ('ter', None, rng.uniform(*index.bounds('ter')))]
+            risk_filter = rng.sample(range(1, 9), 5)
+            expected = [p for p, v in zip(portfolios, values)
+                        if p.risk_level in risk_filter and p.esg == 1
+                        and v[column] >= low - 1e-6 and v['ter'] <= ranges[1][2] + 1e-6]
+            filtered = filter_portfolios(compiled, risk_filter, True, False, ranges=ranges)
+            assert [p for section in filtered.values() for p in section] == expected
+
+            positions = index.positions(column, low, high)
+            assert all(low <= index.values[column][i] <= high for i in positions)
+            assert len(positions) == sum(low <= v <= high for v in index.values[column])
+    print("✅ Ricerche per intervallo identiche al controllo diretto")
+
+
+def test_slider_bounds_are_inclusive():
+    """Un portafoglio con TER esattamente uguale al massimo resta incluso"""
+    portfolio = get_portfolio('PORT2a')
+    filtered = filter_portfolios(get_catalog(), [portfolio.risk_level], False, False,
+                                 ranges=[('ter', None, round(portfolio.weighted_ter, 6))])
+    assert portfolio in filtered[portfolio.section]
+    print("✅ Estremi degli intervalli inclusi")
+
+
+def _uniform_catalog(ter):
+    """Catalogo grezzo in cui tutti i portafogli hanno stesso TER, 100% azionario e stesso orizzonte"""
+    component = {'percentage': '100', 'name': 'iShares Core MSCI World', 'isin': 'IE00B4L5Y983', 'ter': ter}
+    sections = {'multi': [], 'single': [], 'esg': []}
+    for i, section in enumerate(sections):
+        sections[section].append({
+            'id': f'UNI{i + 1}', 'name': f'Uniforme {i + 1}', 'risk_level': 7, 'esg': int(section == 'esg'),
+            'min_duration': '10', 'rebalance': 'NO', 'strategy_description': 'Test', 'components': [component],
+        })
+    return sections
+
+
+def test_sidebar_with_single_values():
+    """Con un solo valore per colonna (anche TER nullo) gli slider non compaiono e la sidebar non fallisce"""
+    from streamlit.testing.v1 import AppTest
+    from load_test import EXPLORE_MODE
+    from wizard_timing import APP_PATH
+
+    for ter in ('0.20', '0'):
+        with use_catalog(_uniform_catalog(ter), f'uniforme-{ter}'):
+            app = AppTest.from_file(APP_PATH, default_timeout=120).run()
+            app.sidebar.radio[0].set_value(EXPLORE_MODE).run()
+            assert not app.exception, (ter, app.exception)
+            assert len(app.sidebar.slider) == 0
+    print("✅ Sidebar senza slider su un catalogo a valori unici")
+
+
+if __name__ == "__main__":
+    test_asset_shares()
+    test_range_queries_match_scan()
+    test_slider_bounds_are_inclusive()
+    test_sidebar_with_single_values()
@@ -1,9 +1,16 @@
 #!/usr/bin/env python3
 """
 Test Suite per Verifica Correzione Hard Limits Tolleranza al Rischio
-Versione: 3.2
+Versione: 3.3 - Le tabelle sono importate dal motore, non più copiate da app.py
 """
 
+import subprocess
+import sys
+
+from engine import (
+    RISK_TOLERANCE_HARD_CAPS, calculate_recommendations, get_catalog, get_risk_category
+)
+
 def test_risk_tolerance_caps():
     """
     Testa che i cap di rischio basati sulla tolleranza funzionino correttamente
@@ -12,14 +19,8 @@ def test_risk_tolerance_caps():
     print("🧪 Test Suite - Hard Limits Tolleranza al Rischio")
     print("=" * 60)
     
-    # Definizione caps (deve matchare app.py)
-    risk_tolerance_hard_caps = {
-        "😰 Venderei immediatamente - Non sopporto le perdite": 2,
-        "😟 Sarei molto preoccupato - Probabilmente venderei": 3,
-        "😐 Sarei preoccupato ma manterrei - Capisco la volatilità": 5,
-        "😊 Lo vedrei come opportunità - Comprerei di più se possibile": 7,
-        "🚀 Sono tranquillo - È normale, compro ancora": 7
-    }
+    # Definizione caps (dal motore condiviso con app.py)
+    risk_tolerance_hard_caps = RISK_TOLERANCE_HARD_CAPS
     
     # TEST 1: Bassa tolleranza blocca rischio alto
     print("\n📋 TEST 1: Bassa Tolleranza Emotiva")
@@ -217,17 +218,63 @@ def test_real_world_scenarios():
         print(f"Motivazione: {scenario['rationale']}")
 
 
+def test_engine_caps_on_real_catalog():
+    """
+    Testa che calculate_recommendations rispetti i cap sul catalogo reale
+    """
+
+    print("\n\n🔒 Cap sul Catalogo Reale")
+    print("=" * 60)
+
+    portfolios = get_catalog()
+    for tolerance, max_allowed in RISK_TOLERANCE_HARD_CAPS.items():
+        results = calculate_recommendations(
+            portfolios,
+            "Meno di 30 anni - Inizio carriera",
+            "Più di 15 anni - Molto lungo termine",
+            "Crescita patrimonio - Aumentare il capitale nel tempo",
+            "Parte minore (meno del 20%)",
+            "Esperto - Investo regolarmente e comprendo i mercati",
+            tolerance,
+            "Reddito stabile e sicuro - Posso investire regolarmente",
+            "No, non è importante - Focus solo su rendimento/rischio",
+            "Alta - Mi piace monitorare e gestire attivamente"
+        )
+        levels = [p.risk_level for p in results['portfolios']]
+        print(f"{tolerance} → rischi suggeriti {results['recommended_risks']}, portafogli {levels}")
+        assert max(results['recommended_risks']) <= max_allowed
+        assert all(level <= max_allowed for level in levels), f"❌ Cap violato per {tolerance}"
+
+    assert [get_risk_category(r) for r in (1, 2, 3, 5, 6, 7, 8)] == [
+        'Basso', 'Basso', 'Medio', 'Medio', 'Alto', 'Alto', 'Molto Alto'
+    ]
+    print("✅ Cap rispettati dal motore su tutto il catalogo")
+
+
+def test_engine_is_streamlit_free():
+    """
+    Testa che il motore sia importabile senza streamlit, pandas né numpy
+    """
+
+    code = "import sys, engine; print(sorted({'streamlit', 'pandas', 'numpy'} & set(sys.modules)))"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "[]", f"❌ Il motore importa: {output.stdout.strip()}"
+    print("✅ Motore importabile senza streamlit, pandas e numpy")
+
+
 if __name__ == "__main__":
     print("\n🚀 Avvio Test Suite Completa")
     print("=" * 60)
     print("Test degli hard limits per tolleranza al rischio")
-    print("Versione: 3.2 (Critical Fix)")
+    print("Versione: 3.3 (Motore condiviso)")
     print("=" * 60)
     
     # Esegui tutti i test
     if test_risk_tolerance_caps():
         test_portfolios_mapping()
         test_real_world_scenarios()
+        test_engine_caps_on_real_catalog()
+        test_engine_is_streamlit_free()
         
         print("\n\n🎉 SUITE COMPLETA TERMINATA CON SUCCESSO!")
         print("=" * 60)
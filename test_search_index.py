@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test Suite per l'Indice di Ricerca
+Verifica ricerca per parole intere, prefissi di nomi e ISIN, accenti, ordinamento
+e riutilizzo dell'indice
+"""
+
+import search_index
+from catalog import get_catalog, iter_portfolios
+from search_index import MIN_PREFIX, RankedPostings, SearchIndex, get_search_index, normalize, tokenize
+from synthetic_catalog import generate_catalog, synthetic_version, use_catalog
+
+
+def _holding(isin):
+    """Portafogli che contengono un ISIN, nell'ordine del catalogo"""
+    return [p for p in iter_portfolios() if any(c.isin == isin for c in p.components)]
+
+
+def test_isin_and_name_search():
+    """ISIN completo o parziale, ID, nomi di ETF e parole della descrizione"""
+    index = get_search_index(get_catalog())
+    isin = iter_portfolios()[0].components[0].isin
+    expected = {p.id for p in _holding(isin)}
+    assert {p.id for p in index.search(isin)} == expected
+    assert {p.id for p in index.search(isin[:7].lower())} >= expected
+
+    target = iter_portfolios()[5]
+    assert index.search(target.id)[0] is target
+
+    # Tutte le parole devono comparire: aggiungerne una restringe i risultati
+    world = index.search('msci world')
+    assert world and set(world) <= set(index.search('msci'))
+    for portfolio in world:
+        text = normalize(' '.join([portfolio.name, portfolio.strategy_description]
+                                  + [c.name for c in portfolio.components]))
+        assert 'msci' in text and 'world' in text
+
+    assert index.search('liquidità') == index.search('LIQUIDITA')
+    assert index.search('') == [] and index.search('zzzzqqq') == []
+    assert len(index.search('msci', limit=3)) == min(3, len(index.search('msci')))
+    print("✅ Ricerca per ISIN, ID, nomi e descrizioni")
+
+
+def test_ranking_and_prefix_rules():
+    """I nomi pesano più delle descrizioni; i prefissi valgono solo da MIN_PREFIX caratteri"""
+    with use_catalog(generate_catalog(500), synthetic_version(500)) as compiled:
+        index = SearchIndex(compiled)
+        assert index.search('syn000001')[0].id == 'SYN000001'
+        assert len(index.search('syn00001')) == 10
+        # Sotto MIN_PREFIX caratteri conta solo la parola intera
+        assert len(index.search('syn'[:MIN_PREFIX])) == 500
+        assert len(index.search('syn'[:MIN_PREFIX - 1])) < 500
+
+        name_word = tokenize(index.portfolios[0].name)[0]
+        ranked = index.search(name_word)
+        in_name = [name_word in tokenize(p.name) for p in ranked]
+        assert in_name == sorted(in_name, reverse=True)
+
+    assert get_search_index(get_catalog()) is get_search_index(get_catalog())
+    print("✅ Ordinamento e prefissi")
+
+
+def test_precomputed_prefixes_match_plain_merge():
+    """Prefissi e liste precalcolate danno gli stessi risultati, nello stesso ordine, dell'unione al volo"""
+    saved = (search_index.PRECOMPUTE_FANOUT, search_index.RANKED_POSTINGS)
+    with use_catalog(generate_catalog(1_000, seed=6), synthetic_version(1_000, seed=6)) as compiled:
+        try:
+            search_index.PRECOMPUTE_FANOUT = search_index.RANKED_POSTINGS = 10 ** 9
+            plain = SearchIndex(compiled)
+            search_index.PRECOMPUTE_FANOUT, search_index.RANKED_POSTINGS = 4, 16
+            fast = SearchIndex(compiled)
+        finally:
+            search_index.PRECOMPUTE_FANOUT, search_index.RANKED_POSTINGS = saved
+        assert fast.merged and not plain.merged
+
+        queries = ['i', 'ie', 'lu', 'ms', 'msci', 'msci wor', 'ishares core', 'syn0001', 'eur bond', 'dinamico 60']
+        for query in queries:
+            assert fast.count(query) == plain.count(query), query
+            expected = plain.search(query)
+            assert fast.search(query) == expected, query
+            for limit in (1, 10, 200):
+                assert fast.search(query, limit=limit) == expected[:limit], (query, limit)
+                assert plain.search(query, limit=limit) == expected[:limit], (query, limit)
+        assert isinstance(fast.scores('ie'), RankedPostings)
+    print("✅ Prefissi precalcolati coerenti con l'unione al volo")
+
+
+if __name__ == "__main__":
+    test_isin_and_name_search()
+    test_ranking_and_prefix_rules()
+    test_precomputed_prefixes_match_plain_merge()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test Suite per il Generatore di Cataloghi Sintetici
+Verifica schema, determinismo, validità degli ISIN e installazione temporanea del catalogo
+"""
+
+import random
+import re
+import warnings
+
+import catalog
+import engine
+import portfolios_data
+from answer_table import table_version
+from catalog import REBALANCE_CODES, compile_catalog
+from engine import LEVERAGE_RISK, WIZARD_QUESTIONS, calculate_recommendations
+from synthetic_catalog import (
+    generate_catalog, install_catalog, isin_check_digit, split_weight, synthetic_version, use_catalog
+)
+
+_ISIN_PATTERN = re.compile(r'^[A-Z]{2}[A-Z0-9]{9}[0-9]$')
+
+
+def test_schema_and_weights():
+    """Stesso schema di portfolios_data, pesi che sommano a 100 e catalogo compilabile senza avvisi"""
+    raw = generate_catalog(2_000, seed=11)
+    portfolios = [p for section in raw.values() for p in section]
+    assert len(portfolios) == 2_000
+    assert len({p['id'] for p in portfolios}) == 2_000
+    real_keys = set(portfolios_data.MULTI_PORTFOLIOS[0])
+    assert all(set(p) == real_keys for p in portfolios)
+
+    for p in portfolios:
+        assert p['risk_level'] in range(1, 9) and p['esg'] in (0, 1) and p['rebalance'] in REBALANCE_CODES
+        assert isinstance(p['min_duration'], str)
+        weights = [int(c['percentage']) for c in p['components']]
+        assert sum(weights) == 100 or set(weights) == {100}
+        for c in p['components']:
+            assert _ISIN_PATTERN.match(c['isin']) and isin_check_digit(c['isin'][:-1]) == c['isin'][-1]
+            assert 0 < float(c['ter']) < 1
+    assert all(p['esg'] == 1 for p in raw['esg'])
+    assert all(p['risk_level'] != LEVERAGE_RISK for p in raw['single'] + raw['esg'])
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        compiled = compile_catalog(raw)
+    assert sum(len(section) for section in compiled.values()) == 2_000
+    print("✅ Schema, pesi e ISIN dei portafogli sintetici")
+
+
+def test_deterministic_by_seed():
+    """Stesso seed, stesso catalogo; seed diverso, catalogo diverso"""
+    assert generate_catalog(300, seed=5) == generate_catalog(300, seed=5)
+    assert generate_catalog(300, seed=5) != generate_catalog(300, seed=6)
+    assert synthetic_version(300, 5) != synthetic_version(300, 6)
+
+    rng = random.Random(1)
+    for total in (0, 5, 40, 100):
+        weights = split_weight(total, 3, rng)
+        assert sum(weights) == total and all(w > 0 and w % 5 == 0 for w in weights)
+    assert isin_check_digit('US037833100') == '5'
+    print("✅ Generazione deterministica")
+
+
+def test_use_catalog_restores_real_catalog():
+    """Il catalogo sintetico è attivo solo nel blocco e funziona con il motore"""
+    real_version = catalog.CATALOG_VERSION
+    real_total = portfolios_data.get_statistics()['total_portfolios']
+    real_table = table_version()
+    raw = generate_catalog(500)
+
+    with use_catalog(raw, synthetic_version(500)) as compiled:
+        assert catalog.get_catalog() is compiled
+        assert catalog.CATALOG_VERSION == synthetic_version(500)
+        # Anche le copie e i valori derivati dalla versione seguono il catalogo installato
+        assert engine.CATALOG_VERSION == synthetic_version(500)
+        assert table_version() != real_table
+        assert portfolios_data.get_statistics()['total_portfolios'] == 500
+        assert catalog.get_portfolio('SYN000001') is not None
+        answers = [options[len(options) // 2] for options in WIZARD_QUESTIONS.values()]
+        assert calculate_recommendations(compiled, *answers)['portfolios']
+
+    assert catalog.CATALOG_VERSION == engine.CATALOG_VERSION == real_version
+    assert table_version() == real_table
+    assert portfolios_data.get_statistics()['total_portfolios'] == real_total
+    assert catalog.get_portfolio('SYN000001') is None
+
+    # install_catalog è permanente: lo si annulla reinstallando il catalogo reale
+    saved = catalog.CATALOG
+    with use_catalog(portfolios_data.get_all_portfolios(), real_version):
+        install_catalog(raw, synthetic_version(500))
+        assert catalog.get_portfolio('SYN000001') is not None
+    assert catalog.CATALOG is saved
+    print("✅ Catalogo sintetico installato e ripristinato")
+
+
+if __name__ == "__main__":
+    test_schema_and_weights()
+    test_deterministic_by_seed()
+    test_use_catalog_restores_real_catalog()
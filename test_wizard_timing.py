@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Test Suite per il Wizard come Fragment
+Verifica che il percorso completo del questionario funzioni sia nell'app intera
+sia eseguendo il solo fragment, e che "Ricomincia" azzeri i risultati
+"""
+
+from streamlit.testing.v1 import AppTest
+
+from wizard_timing import APP_PATH, TIMEOUT, _WIZARD_ONLY, answer_wizard
+
+
+def test_full_app_wizard_and_reset():
+    """Risultati mostrati dopo il calcolo e azzerati dal bottone Ricomincia"""
+    app = AppTest.from_file(APP_PATH, default_timeout=TIMEOUT).run()
+    timings = answer_wizard(app)
+    assert len(timings) == len(app.main.radio) + 1
+    assert app.session_state.wizard_completed
+    assert [button.label for button in app.main.button][-1] == "🔄 Ricomincia il Questionario"
+
+    app.main.button[-1].click().run()
+    assert not app.exception
+    assert not app.session_state.wizard_completed
+    assert app.session_state.wizard_results is None
+    assert len(app.main.button) == 1
+    print("✅ Wizard completo e reset nell'app intera")
+
+
+def test_fragment_runs_alone():
+    """Il solo fragment del wizard basta per arrivare ai risultati"""
+    app = AppTest.from_string(_WIZARD_ONLY, default_timeout=TIMEOUT).run()
+    answer_wizard(app)
+    assert app.session_state.wizard_completed
+    assert app.session_state.wizard_results['portfolios']
+    print("✅ Fragment del wizard eseguibile da solo")
+
+
+if __name__ == "__main__":
+    test_full_app_wizard_and_reset()
+    test_fragment_runs_alone()
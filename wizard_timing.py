@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tempo Server per Interazione nel Wizard
+Confronta, con lo stesso percorso di risposte, la riesecuzione completa dell'app
+(caricamento dati, sidebar, wizard, sezione educativa, footer) con la riesecuzione
+del solo fragment del wizard, che è ciò che Streamlit esegue quando si risponde a una domanda
+
+Uso:
+    python wizard_timing.py --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from streamlit.testing.v1 import AppTest
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(APP_DIR, 'app.py')
+
+DEFAULT_REPEAT = 3
+TIMEOUT = 120
+
+# Script che esegue solo il corpo del fragment, con lo stesso catalogo condiviso dell'app
+_WIZARD_ONLY = f'''
+import sys
+sys.path.insert(0, {APP_DIR!r})
+from app import CATALOG_VERSION, load_catalog, portfolio_wizard
+portfolios, _ = load_catalog(CATALOG_VERSION)
+portfolio_wizard(portfolios)
+'''
+
+
+def answer_wizard(app):
+    """
+    Risponde a tutte le domande (prima opzione) e calcola i risultati.
+    Restituisce la durata di ogni riesecuzione, in secondi
+    """
+    timings = []
+    for index in range(len(app.main.radio)):
+        radio = app.main.radio[index]
+        radio.set_value(radio.options[0])
+        started = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    app.main.button[0].click().run()
+    timings.append(time.perf_counter() - started)
+    if app.exception:
+        raise RuntimeError(app.exception[0].value)
+    return timings
+
+
+def measure(repeat=DEFAULT_REPEAT):
+    """Tempi per interazione (mediana su tutte le ripetizioni): app completa e solo wizard"""
+    full, fragment = [], []
+    for _ in range(repeat):
+        full.extend(answer_wizard(AppTest.from_file(APP_PATH, default_timeout=TIMEOUT).run()))
+        fragment.extend(answer_wizard(AppTest.from_string(_WIZARD_ONLY, default_timeout=TIMEOUT).run()))
+    return statistics.median(full), statistics.median(fragment)
+
+
+def main(argv=None):
+    """Stampa il confronto tra riesecuzione completa e del solo fragment"""
+    parser = argparse.ArgumentParser(description="Tempo server per interazione nel wizard")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Questionari completi per modalità")
+    args = parser.parse_args(argv)
+
+    full, fragment = measure(args.repeat)
+    print(f"Riesecuzione completa:  {full * 1000:8.1f} ms per interazione")
+    print(f"Solo fragment wizard:   {fragment * 1000:8.1f} ms per interazione")
+    print(f"Risparmio:              {(full - fragment) * 1000:8.1f} ms ({1 - fragment / full:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())